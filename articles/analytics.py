@@ -0,0 +1,380 @@
+"""
+Article engagement analytics.
+
+The read path only appends a small event to a Redis list. A periodic job
+(``flush_events``) drains the list, rolls events up into the monthly
+partitioned ``ArticleHourlyStats`` / ``ArticleDailyStats`` tables, applies the
+aggregated ``Article.views`` increments and reading-history upserts in one
+transaction. Analytics queries only ever read the rollups.
+
+View events carry a reader key (the user id, or a salted hash of the
+anonymous reader's session or IP and user agent) which is folded into the
+per-day HyperLogLog sketch in ``ArticleDailyStats.readers``.
+"""
+import hashlib
+import uuid
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from articles.cache import invalidate_articles
+from articles.enums import AnalyticsRange
+from articles.hll import HyperLogLog
+from articles.models import (
+    AnalyticsFlush,
+    Article,
+    ArticleDailyStats,
+    ArticleHourlyStats,
+    UserArticlesVisitHistory,
+)
+from backend.redis_client import get_redis
+from users.models import CustomUser
+
+EVENTS_KEY = "analytics:events"
+PROCESSING_KEY = "analytics:events:processing"
+FLUSH_LOCK_KEY = "analytics:flush-lock"
+FLUSH_ID_KEY = "analytics:events:processing:id"
+FLUSH_ID_RETENTION = timedelta(days=1)
+_READERS_MEMO_ATTR = "_analytics_readers_memo"
+
+VIEW = "view"
+LIKE = "like"
+COMMENT = "comment"
+SAVE = "save"
+KINDS = (VIEW, LIKE, COMMENT, SAVE)
+
+COUNTER_COLUMNS = {VIEW: "views", LIKE: "likes", COMMENT: "comments", SAVE: "saves"}
+
+# Range -> (length, served from the hourly rollup)
+RANGES = {
+    AnalyticsRange.LAST_24_HOURS: (timedelta(hours=24), True),
+    AnalyticsRange.LAST_7_DAYS: (timedelta(days=7), False),
+    AnalyticsRange.LAST_30_DAYS: (timedelta(days=30), False),
+    AnalyticsRange.LAST_90_DAYS: (timedelta(days=90), False),
+}
+
+
+def record_event(kind, article_id, user_id=None, reader=""):
+    """Append an engagement event to the buffer. Returns False if Redis is unavailable."""
+    event = f"{kind}|{article_id}|{user_id or ''}|{int(timezone.now().timestamp())}|{reader}"
+    try:
+        get_redis().rpush(EVENTS_KEY, event)
+        return True
+    except Exception as e:
+        print(f"Failed to buffer {kind} event for article {article_id}: {str(e)}")
+        return False
+
+
+def reader_key(request):
+    """Stable, non-reversible identifier of the reader behind a request."""
+    if request.user.is_authenticated:
+        return f"u:{request.user.id}"
+    session_key = getattr(getattr(request, "session", None), "session_key", None)
+    if session_key:
+        source = f"s:{session_key}"
+    else:
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+        ip = forwarded.split(",")[0].strip() or request.META.get("REMOTE_ADDR", "")
+        source = f"ip:{ip}|{request.META.get('HTTP_USER_AGENT', '')}"
+    digest = hashlib.sha256(f"{settings.SECRET_KEY}|{source}".encode()).hexdigest()[:24]
+    return f"a:{digest}"
+
+
+def record_view(article, request):
+    """Count a view (and the reader's visit) without writing to Postgres on the request path."""
+    user = request.user
+    user_id = user.id if user.is_authenticated else None
+    if record_event(VIEW, article.id, user_id, reader_key(request)):
+        return
+
+    # Buffer is down: fall back to direct, row-level updates
+    Article.objects.filter(pk=article.pk).update(views=F("views") + 1)
+    if user_id:
+        visit, created = UserArticlesVisitHistory.objects.get_or_create(user_id=user_id, article=article)
+        if not created:
+            UserArticlesVisitHistory.objects.filter(pk=visit.pk).update(
+                visit_count=F("visit_count") + 1, last_visited=timezone.now()
+            )
+
+
+def _parse(raw):
+    # Events buffered before reader keys existed have four fields
+    kind, article_id, user_id, ts, *rest = raw.decode().split("|", 4)
+    reader = rest[0] if rest else (f"u:{user_id}" if user_id else "")
+    return kind, int(article_id), int(user_id) if user_id else None, int(ts), reader
+
+
+def _upsert(table, bucket_column, rows):
+    """rows: {(article_id, bucket): Counter(kind -> n)}"""
+    if not rows:
+        return
+    columns = [COUNTER_COLUMNS[kind] for kind in KINDS]
+    values, params = [], []
+    for (article_id, bucket), counts in rows.items():
+        values.append("(%s, %s" + ", %s" * len(columns) + ")")
+        params.extend([article_id, bucket, *[counts[kind] for kind in KINDS]])
+    updates = ", ".join(f"{c} = {table}.{c} + EXCLUDED.{c}" for c in columns)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (article_id, {bucket_column}, {', '.join(columns)}) "
+            f"VALUES {', '.join(values)} "
+            f"ON CONFLICT (article_id, {bucket_column}) DO UPDATE SET {updates}",
+            params,
+        )
+
+
+def _merge_readers(readers):
+    """Fold the batch's sketches into the stored daily sketches (rows exist after the upsert)."""
+    if not readers:
+        return
+    table = ArticleDailyStats._meta.db_table
+    keys = list(readers)
+    condition = " OR ".join(["(article_id = %s AND day = %s)"] * len(keys))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT article_id, day, readers FROM {table} WHERE {condition} FOR UPDATE",
+            [x for key in keys for x in key],
+        )
+        for article_id, day, stored in cursor.fetchall():
+            if stored:
+                readers[(article_id, day)].merge(bytes(stored))
+        cursor.execute(
+            f"UPDATE {table} SET readers = v.readers "
+            f"FROM (VALUES {', '.join(['(%s, %s::date, %s::bytea)'] * len(keys))}) AS v(article_id, day, readers) "
+            f"WHERE {table}.article_id = v.article_id AND {table}.day = v.day",
+            [x for key in keys for x in (*key, readers[key].to_bytes())],
+        )
+
+
+def _apply(events):
+    article_ids = {event[1] for event in events}
+    user_ids = {event[2] for event in events if event[2]}
+    live_articles = set(Article.objects.filter(id__in=article_ids).values_list("id", flat=True))
+    live_users = set(CustomUser.objects.filter(id__in=user_ids).values_list("id", flat=True))
+
+    hourly = defaultdict(Counter)
+    daily = defaultdict(Counter)
+    views = Counter()
+    visits = {}
+    readers = defaultdict(HyperLogLog)
+    for kind, article_id, user_id, ts, reader in events:
+        if article_id not in live_articles or kind not in COUNTER_COLUMNS:
+            continue
+        at = datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+        hourly[(article_id, at.replace(minute=0, second=0, microsecond=0))][kind] += 1
+        daily[(article_id, at.date())][kind] += 1
+        if kind == VIEW:
+            views[article_id] += 1
+            if reader:
+                readers[(article_id, at.date())].add(reader)
+            if user_id in live_users:
+                count, last = visits.get((user_id, article_id), (0, at))
+                visits[(user_id, article_id)] = (count + 1, max(last, at))
+
+    _upsert(ArticleHourlyStats._meta.db_table, "hour", hourly)
+    _upsert(ArticleDailyStats._meta.db_table, "day", daily)
+    _merge_readers(readers)
+
+    with connection.cursor() as cursor:
+        if views:
+            article_table = Article._meta.db_table
+            cursor.execute(
+                f"UPDATE {article_table} SET views = {article_table}.views + v.n "
+                f"FROM (VALUES {', '.join(['(%s, %s)'] * len(views))}) AS v(id, n) "
+                f"WHERE {article_table}.id = v.id",
+                [x for pair in views.items() for x in pair],
+            )
+            invalidate_articles(views)
+        if visits:
+            history_table = UserArticlesVisitHistory._meta.db_table
+            cursor.execute(
+                f"INSERT INTO {history_table} (user_id, article_id, visit_count, last_visited) "
+                f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(visits))} "
+                f"ON CONFLICT (user_id, article_id) DO UPDATE SET "
+                f"visit_count = {history_table}.visit_count + EXCLUDED.visit_count, "
+                f"last_visited = GREATEST({history_table}.last_visited, EXCLUDED.last_visited)",
+                [x for (user_id, article_id), (count, last) in visits.items() for x in (user_id, article_id, count, last)],
+            )
+
+
+def flush_events():
+    """Drain the event buffer into the rollup tables. Returns the number of events applied."""
+    redis = get_redis()
+    lock = redis.lock(FLUSH_LOCK_KEY, timeout=10 * 60)
+    if not lock.acquire(blocking=False):
+        return 0  # Another flush is running
+    try:
+        # Work on a renamed copy so new events keep flowing into EVENTS_KEY.
+        # A leftover processing list from a failed run is retried first.
+        if not redis.exists(PROCESSING_KEY):
+            if not redis.exists(EVENTS_KEY):
+                return 0
+            redis.renamenx(EVENTS_KEY, PROCESSING_KEY)
+        # Identifies this processing list; recorded with the rollups so a
+        # crash after the commit doesn't apply the list again on retry
+        redis.set(FLUSH_ID_KEY, uuid.uuid4().hex, nx=True)
+        flush_id = redis.get(FLUSH_ID_KEY).decode()
+
+        batch_size = settings.ANALYTICS_FLUSH_BATCH_SIZE
+        total = redis.llen(PROCESSING_KEY)
+        with transaction.atomic():
+            _, new = AnalyticsFlush.objects.get_or_create(flush_id=flush_id)
+            if new:
+                for start in range(0, total, batch_size):
+                    raw = redis.lrange(PROCESSING_KEY, start, start + batch_size - 1)
+                    _apply([_parse(item) for item in raw])
+            AnalyticsFlush.objects.filter(flushed_at__lt=timezone.now() - FLUSH_ID_RETENTION).delete()
+        redis.delete(PROCESSING_KEY, FLUSH_ID_KEY)
+        return total if new else 0
+    finally:
+        lock.release()
+
+
+def _month_start(day, offset=0):
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _partition_name(table, month):
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def _create_partition(cursor, table, bucket_column, month):
+    name = _partition_name(table, month)
+    bounds = [f"{month.isoformat()} 00:00+00", f"{_month_start(month, 1).isoformat()} 00:00+00"]
+    default = f"{table}_default"
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    if cursor.fetchone()[0]:
+        return name
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {bucket_column} >= %s AND {bucket_column} < %s)", bounds
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", bounds)
+        return name
+    # The month's rows went to the DEFAULT partition (e.g. the job missed the
+    # month boundary); Postgres refuses the new partition until they move
+    cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+    cursor.execute(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", bounds)
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {default} WHERE {bucket_column} >= %s AND {bucket_column} < %s RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        bounds,
+    )
+    cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+    return name
+
+
+def maintain_partitions(months_ahead=2):
+    """
+    Create the monthly partitions for the current and upcoming months and drop
+    hourly partitions past their retention. Rows landing outside any monthly
+    partition go to the DEFAULT partition, and move to their month's
+    partition when it is created.
+    """
+    today = timezone.now().date()
+    created = []
+    with connection.cursor() as cursor:
+        for model, bucket_column in ((ArticleHourlyStats, "hour"), (ArticleDailyStats, "day")):
+            table = model._meta.db_table
+            for offset in range(months_ahead + 1):
+                month = _month_start(today, offset)
+                try:
+                    with transaction.atomic():
+                        created.append(_create_partition(cursor, table, bucket_column, month))
+                except Exception as e:
+                    print(f"Failed to create partition {_partition_name(table, month)}: {str(e)}")
+
+        table = ArticleHourlyStats._meta.db_table
+        cutoff = _month_start(today, -settings.ANALYTICS_HOURLY_RETENTION_MONTHS)
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s AND child.relname < %s AND child.relname <> %s",
+            [table, _partition_name(table, cutoff), f"{table}_default"],
+        )
+        for (name,) in cursor.fetchall():
+            cursor.execute(f"DROP TABLE IF EXISTS {name}")
+    return created
+
+
+def _readers_memo(request):
+    if request is None:
+        return None
+    memo = getattr(request, _READERS_MEMO_ATTR, None)
+    if memo is None:
+        memo = {"listed": set(), "counts": {}}  # counts: {(article id, days): readers}
+        setattr(request, _READERS_MEMO_ATTR, memo)
+    return memo
+
+
+def prime_readers(request, articles):
+    """
+    Note a page of articles about to be resolved, so the first
+    ``unique_readers`` call of the request reads the sketches of all of them
+    in one query. Queries nothing by itself.
+    """
+    memo = _readers_memo(request)
+    if memo is not None:
+        memo["listed"].update(article.id for article in articles)
+
+
+def unique_readers(article_id, days=30, request=None):
+    """Approximate distinct readers of an article over the last ``days`` days."""
+    memo = _readers_memo(request)
+    if memo is not None and (article_id, days) in memo["counts"]:
+        return memo["counts"][(article_id, days)]
+
+    article_ids = {article_id}
+    if memo is not None:
+        article_ids |= {listed for listed in memo["listed"] if (listed, days) not in memo["counts"]}
+    since = timezone.now().date() - timedelta(days=days - 1)
+    sketches = defaultdict(HyperLogLog)
+    stored = ArticleDailyStats.objects.filter(
+        article_id__in=article_ids, day__gte=since, readers__isnull=False
+    ).values_list("article_id", "readers")
+    for listed, readers in stored.iterator():
+        sketches[listed].merge(bytes(readers))
+    counts = {listed: sketches[listed].count() for listed in article_ids}
+    if memo is not None:
+        memo["counts"].update(((listed, days), count) for listed, count in counts.items())
+    return counts[article_id]
+
+
+def range_start(analytics_range):
+    """Return ``(since, hourly)`` for an AnalyticsRange."""
+    length, hourly = RANGES[analytics_range]
+    now = timezone.now()
+    if hourly:
+        return (now - length).replace(minute=0, second=0, microsecond=0), True
+    return (now - length).date(), False
+
+
+def author_analytics(author, since, hourly, article_id=None):
+    """
+    Engagement totals for the author's articles per bucket since ``since``,
+    read from the hourly or daily rollups only.
+    """
+    if hourly:
+        qs = ArticleHourlyStats.objects.filter(article__author=author, hour__gte=since)
+        bucket = "hour"
+    else:
+        qs = ArticleDailyStats.objects.filter(article__author=author, day__gte=since)
+        bucket = "day"
+    if article_id:
+        qs = qs.filter(article_id=article_id)
+    return list(
+        qs.values(bucket)
+        .annotate(
+            total_views=Sum("views"),
+            total_likes=Sum("likes"),
+            total_comments=Sum("comments"),
+            total_saves=Sum("saves"),
+        )
+        .order_by(bucket)
+    )
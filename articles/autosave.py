@@ -0,0 +1,111 @@
+"""
+Buffered article draft autosaves (see backend.autosave).
+
+Title and content updates of a draft are kept in the autosave buffer and
+written by the flush-draft-autosaves job, or right away when the draft is
+published or its editor closed.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from articles.models import ArticleDraft, ArticleDraftRevision
+from backend import autosave
+from backend.revisions import record_many as record_revisions
+
+DRAFT = "draft"
+FIELDS = ("title", "content")
+
+
+def overlay(draft):
+    """Apply an unflushed autosave to the draft (looked up once per instance)"""
+    if not getattr(draft, "_autosave_overlaid", False):
+        autosave.overlay(DRAFT, draft, FIELDS)
+        draft._autosave_overlaid = True
+    return draft
+
+
+def buffer_changes(draft, title=None, content=None, patch=None):
+    """
+    Buffer a draft autosave: a new ``title``, and either the full ``content``
+    or a ``patch`` (ContentPatchInput) applied to the latest content. Updates
+    the instance and returns True, or returns False if the buffer is
+    unavailable and the draft must be saved directly.
+    """
+    def change(current):
+        fields = {}
+        if title:
+            fields["title"] = title
+        if patch is not None:
+            fields["content"] = patch.apply(current.get("content") or "")
+        elif content:
+            fields["content"] = content
+        return fields
+
+    if patch is None:
+        fields = change({})
+        if fields and not autosave.save(DRAFT, draft.pk, **fields):
+            return False
+    else:
+        current = autosave.edit(
+            DRAFT,
+            draft.pk,
+            load=lambda: {
+                "content": ArticleDraft.objects.values_list("content", flat=True).get(pk=draft.pk) or ""
+            },
+            change=change,
+        )
+        if current is None:
+            return False
+        fields = {name: current[name] for name in FIELDS if name in current}
+    for name, value in fields.items():
+        setattr(draft, name, value)
+    return True
+
+
+def take_changes(draft):
+    """
+    Lock the draft's row and return it with the latest buffered title and
+    content applied, before saving it directly. Must run in a transaction.
+    """
+    draft = ArticleDraft.objects.select_for_update().get(pk=draft.pk)
+    for name, value in (autosave.take(DRAFT, draft.pk) or {}).items():
+        setattr(draft, name, value)
+    draft._autosave_overlaid = True
+    return draft
+
+
+def flush_draft(draft):
+    """Write the draft's buffered autosave now, e.g. before publishing"""
+    with transaction.atomic():
+        buffered = autosave.take(DRAFT, draft.pk)
+        if buffered:
+            for name, value in buffered.items():
+                setattr(draft, name, value)
+            draft.save(update_fields=[*buffered, "updated_at"])
+    draft._autosave_overlaid = True
+    return draft
+
+
+def write_drafts(docs):
+    """Write buffered drafts ({draft id: fields}), one statement per set of changed fields"""
+    existing = set(ArticleDraft.objects.filter(pk__in=docs).values_list("id", flat=True))
+    groups = defaultdict(list)
+    now = timezone.now()
+    for pk, fields in docs.items():
+        if pk in existing:
+            groups[tuple(sorted(fields))].append(ArticleDraft(pk=pk, updated_at=now, **fields))
+    with transaction.atomic():
+        for names, drafts in groups.items():
+            ArticleDraft.objects.bulk_update(drafts, [*names, "updated_at"], batch_size=500)
+        record_revisions(
+            ArticleDraftRevision,
+            {pk: fields["content"] for pk, fields in docs.items() if pk in existing and fields.get("content")},
+        )
+    return len(existing)
+
+
+def flush_drafts():
+    """Write every buffered draft autosave. Returns the drafts written."""
+    return autosave.flush(DRAFT, write_drafts)
@@ -0,0 +1,108 @@
+"""
+Read-through cache of single articles for the ``article`` query.
+
+Each entry is an Article with its author and its like, save and comment
+counts, fetched in one query and kept in the two-tier cache (see
+backend.cache). Viral articles are then read from process memory, and a
+miss under load costs one query rather than one per request.
+
+Entries are invalidated once the transaction changing them commits: by
+article saves (including publishing a draft) and deletions, likes, saves
+to collections, new or deleted comments, author profile changes (see
+articles.signals) and the analytics flush updating view counts.
+Invalidating an article moves it to a new generation, which is part of its
+cache key, so a fill that read the row before the commit stores it under a
+key no one reads anymore. Other processes see the new generation within
+ARTICLE_CACHE_LOCAL_TIMEOUT seconds.
+"""
+import copy
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from articles.models import Article, ArticleComment, ArticleLike, CollectionItem
+from backend.cache import LocalLRU, TwoTierCache
+
+_cache = TwoTierCache(
+    "article",
+    settings.ARTICLE_CACHE_LOCAL_ENTRIES,
+    settings.ARTICLE_CACHE_TIMEOUT,
+    local_timeout=settings.ARTICLE_CACHE_LOCAL_TIMEOUT,
+)
+_generations = LocalLRU(settings.ARTICLE_CACHE_LOCAL_ENTRIES, ttl=settings.ARTICLE_CACHE_LOCAL_TIMEOUT)
+# Outlives every entry written under the generation it replaced
+GENERATION_TIMEOUT = 2 * settings.ARTICLE_CACHE_TIMEOUT
+
+
+def _count(queryset):
+    # Correlated COUNT(*) of ``queryset`` rows of the outer article
+    counts = queryset.filter(article=OuterRef("pk")).order_by().values("article").annotate(n=Count("*")).values("n")
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def load_article(article_id):
+    """The article with its author and counts (likes_total, saves_total, ...) in one query"""
+    return (
+        Article.objects.select_related("author")
+        # Only related articles need the vector, which is loaded on demand
+        .defer("embedding")
+        .annotate(
+            likes_total=_count(ArticleLike.objects.all()),
+            saves_total=_count(CollectionItem.objects.all()),
+            comments_total=_count(ArticleComment.objects.filter(parent=None)),
+            all_comments_total=_count(ArticleComment.objects.all()),
+        )
+        .get(pk=article_id)
+    )
+
+
+def _generation_key(article_id):
+    return f"article:generation:{article_id}"
+
+
+def _generation(article_id):
+    generation = _generations.get(article_id)
+    if generation is None:
+        try:
+            generation = cache.get(_generation_key(article_id), "0")
+        except Exception as e:
+            print(f"Failed to read article generation {article_id}: {str(e)}")
+            return "0"
+        _generations.set(article_id, generation)
+    return generation
+
+
+def get_article(article_id):
+    """
+    The article through the cache; raises Article.DoesNotExist. Each caller
+    gets its own copy of the cached instance.
+    """
+    try:
+        article_id = int(article_id)
+    except (TypeError, ValueError):
+        raise Article.DoesNotExist(f"Invalid article id {article_id!r}")
+    key = f"{article_id}:{_generation(article_id)}"
+    article = _cache.get_or_set(key, lambda: load_article(article_id))
+    return copy.copy(article)
+
+
+def _new_generations(article_ids):
+    for article_id in article_ids:
+        _generations.delete(article_id)
+    try:
+        cache.set_many(
+            {_generation_key(article_id): uuid.uuid4().hex for article_id in article_ids}, GENERATION_TIMEOUT
+        )
+    except Exception as e:
+        print(f"Failed to invalidate articles {article_ids[:5]}: {str(e)}")
+
+
+def invalidate_articles(article_ids):
+    """Move the articles to a new cache generation once the current transaction commits"""
+    article_ids = [article_id for article_id in article_ids if article_id is not None]
+    if article_ids:
+        transaction.on_commit(lambda: _new_generations(article_ids))
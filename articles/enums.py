@@ -6,3 +6,19 @@ import strawberry
 class ArticleSortBy(Enum):
     LATEST = "latest"
     POPULAR = "popular"
+    TRENDING = "trending"
+
+
+@strawberry.enum
+class TrendingWindow(Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+@strawberry.enum
+class AnalyticsRange(Enum):
+    LAST_24_HOURS = "last_24_hours"
+    LAST_7_DAYS = "last_7_days"
+    LAST_30_DAYS = "last_30_days"
+    LAST_90_DAYS = "last_90_days"
@@ -0,0 +1,127 @@
+"""
+Home feed of articles from followed authors.
+
+Timelines are materialized as ``FeedEntry`` rows when an article is published
+(fan-out-on-write, see ``articles.tasks.fan_out_article``). Authors with more
+than ``FEED_FANOUT_MAX_FOLLOWERS`` followers are skipped by the fan-out and
+their recent articles are merged in when the feed is read, as are articles
+that were never fanned out (``Article.fanned_out``), e.g. published while
+their author was above the threshold. A feed page always costs a fixed number
+of indexed queries regardless of how many authors the reader follows.
+"""
+import base64
+import heapq
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q, Subquery
+
+from articles.models import Article, FeedEntry
+from users.models import Follow
+
+
+def enqueue_fan_out(article):
+    """Queue the fan-out task, never failing the publish if the broker is down."""
+    from articles.tasks import fan_out_article
+
+    try:
+        fan_out_article.delay(article.id)
+    except Exception as e:
+        print(f"Failed to queue feed fan-out for article {article.id}: {str(e)}")
+
+
+def is_fan_out_author(author_id):
+    """Whether the author's articles are written into follower timelines."""
+    from users.follow_graph import get_counts
+
+    followers, _ = get_counts([author_id])[author_id]
+    return followers <= settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def backfill_feed(user_id, author_id):
+    """Copy the author's latest articles into a follower's timeline."""
+    if not is_fan_out_author(author_id):
+        return 0
+    recent = Article.objects.filter(
+        author_id=author_id, status=Article.PUBLISHED, published_at__isnull=False
+    ).order_by("-published_at").values_list("id", "published_at")[: settings.FEED_BACKFILL_ARTICLES]
+    entries = [
+        FeedEntry(user_id=user_id, article_id=article_id, author_id=author_id, published_at=published_at)
+        for article_id, published_at in recent
+    ]
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
+
+
+def encode_cursor(published_at, article_id):
+    raw = f"{published_at.isoformat()}|{article_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        published_at, article_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(published_at), int(article_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid feed cursor")
+
+
+def _after(after, time_field, id_field):
+    published_at, article_id = after
+    return Q(**{f"{time_field}__lt": published_at}) | Q(
+        **{time_field: published_at, f"{id_field}__lt": article_id}
+    )
+
+
+def _pulled(articles, first, after):
+    # (published_at, id) of the newest published ``articles`` after the cursor
+    articles = articles.filter(status=Article.PUBLISHED, published_at__isnull=False)
+    if after:
+        articles = articles.filter(_after(after, "published_at", "id"))
+    return articles.order_by("-published_at", "-id").values_list("published_at", "id")[: first + 1]
+
+
+def home_feed(user, first=20, after=None, defer=()):
+    """
+    Return ``(articles, end_cursor, has_next_page)`` for the user's home feed,
+    newest first. ``after`` is a cursor returned by a previous call and
+    ``defer`` names Article columns the caller doesn't need.
+    """
+    after = decode_cursor(after) if after else None
+
+    # Fanned-out timeline
+    pushed = FeedEntry.objects.filter(user=user, article__status=Article.PUBLISHED)
+    if after:
+        pushed = pushed.filter(_after(after, "published_at", "article_id"))
+    pushed = pushed.order_by("-published_at", "-article_id").values_list(
+        "published_at", "article_id"
+    )[: first + 1]
+
+    # Followed authors that are too big to fan out
+    big_authors = Follow.objects.filter(
+        user=user,
+        following__follow_stats__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).values("following_id")
+    pulled = _pulled(Article.objects.filter(author__in=Subquery(big_authors)), first, after)
+    # Articles of any followed author that were never fanned out, e.g.
+    # published while the author was too big
+    followed = Follow.objects.filter(user=user).values("following_id")
+    unpushed = _pulled(Article.objects.filter(author__in=Subquery(followed), fanned_out=False), first, after)
+
+    page = []
+    seen = set()
+    for published_at, article_id in heapq.merge(list(pushed), list(pulled), list(unpushed), reverse=True):
+        if article_id in seen:
+            continue
+        seen.add(article_id)
+        page.append((published_at, article_id))
+        if len(page) > first:
+            break
+
+    has_next_page = len(page) > first
+    page = page[:first]
+    articles = Article.objects.select_related("author").defer(*defer).in_bulk(
+        [article_id for _, article_id in page]
+    )
+    end_cursor = encode_cursor(*page[-1]) if page else None
+    return [articles[article_id] for _, article_id in page if article_id in articles], end_cursor, has_next_page
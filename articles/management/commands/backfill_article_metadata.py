@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from articles.models import Article
+from backend.reading import backfill
+
+
+class Command(BaseCommand):
+    help = "Compute the table of contents, word count and reading time of existing articles (safe to re-run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        updated = backfill(Article.objects.all(), batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Updated the reading metadata of {updated} articles"))
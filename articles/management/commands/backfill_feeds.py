@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from articles.feed import backfill_feed
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = "Seed home feeds from existing follows (recent articles of every followed author)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", help="Only rebuild this user's feed")
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.all()
+        if options["username"]:
+            follows = follows.filter(user__username=options["username"])
+
+        written = 0
+        for user_id, author_id in follows.values_list("user_id", "following_id").iterator(chunk_size=1000):
+            written += backfill_feed(user_id, author_id)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} feed entries"))
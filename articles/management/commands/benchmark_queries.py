@@ -0,0 +1,110 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from strawberry.django.context import StrawberryDjangoContext
+
+from backend.schema import schema
+from notebook.models import Notebook
+from users.models import CustomUser
+
+SIDEBAR = """
+query($slug: String!) {
+  sidebarPages(notebookSlug: $slug) {
+    id title path hasChildren
+    children { id title path hasChildren children { id title path hasChildren } }
+  }
+}
+"""
+
+SIDEBAR_WITH_CONTENT = """
+query($slug: String!) {
+  sidebarPages(notebookSlug: $slug) {
+    id title path content
+    children { id title path content children { id title path content } }
+  }
+}
+"""
+
+OUTLINE = """
+query($slug: String!) {
+  notebookOutline(slug: $slug) { version pages { id title path children { id title path children { id title path } } } }
+}
+"""
+
+FEED = """
+query {
+  feed(first: 20) { articles { id title slug views author { username } } endCursor hasNextPage }
+}
+"""
+
+FEED_WITH_CONTENT = """
+query {
+  feed(first: 20) { articles { id title slug views content author { username } } endCursor hasNextPage }
+}
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the sidebar and home feed GraphQL queries and report the SQL queries "
+        "issued and the bytes of row data they returned"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notebook", help="Slug of the notebook to render the sidebar for")
+        parser.add_argument("--username", help="User whose home feed is loaded")
+
+    def handle(self, *args, **options):
+        user = AnonymousUser()
+        if options["username"]:
+            try:
+                user = CustomUser.objects.get(username=options["username"])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"User '{options['username']}' not found")
+
+        runs = []
+        if options["notebook"]:
+            if not Notebook.objects.filter(slug=options["notebook"]).exists():
+                raise CommandError(f"Notebook '{options['notebook']}' not found")
+            variables = {"slug": options["notebook"]}
+            runs += [
+                ("sidebar", SIDEBAR, variables),
+                ("sidebar + content", SIDEBAR_WITH_CONTENT, variables),
+                ("outline", OUTLINE, variables),
+            ]
+        if user.is_authenticated:
+            runs += [("feed", FEED, None), ("feed + content", FEED_WITH_CONTENT, None)]
+        if not runs:
+            raise CommandError("Pass --notebook and/or --username")
+
+        self.stdout.write(f"{'query':<20}{'sql queries':>12}{'row bytes':>14}{'ms':>10}")
+        for name, query, variables in runs:
+            queries, row_bytes, elapsed = self.measure(query, variables, user)
+            self.stdout.write(f"{name:<20}{queries:>12}{row_bytes:>14}{elapsed:>10.1f}")
+
+    def measure(self, query, variables, user):
+        request = RequestFactory().post("/graphql/")
+        request.user = user
+        context = StrawberryDjangoContext(request=request, response=None)
+
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            result = schema.execute_sync(query, variable_values=variables, context_value=context)
+            elapsed = (time.perf_counter() - started) * 1000
+        if result.errors:
+            raise CommandError(str(result.errors[0]))
+
+        # Re-run every SELECT to measure the size of the rows it returned
+        row_bytes = 0
+        with connection.cursor() as cursor:
+            for executed in captured.captured_queries:
+                sql = executed["sql"]
+                if not sql.lstrip().upper().startswith("SELECT"):
+                    continue
+                cursor.execute(f"SELECT COALESCE(SUM(pg_column_size(q.*)), 0) FROM ({sql}) AS q")
+                row_bytes += cursor.fetchone()[0]
+        return len(captured.captured_queries), row_bytes, elapsed
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from articles.models import CollectionItem
+from backend.ordering import rebalance_all
+
+
+class Command(BaseCommand):
+    help = "Renumber collection item orders to evenly spaced keys within every collection"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", type=int, help="Only rebalance the collection with this id")
+
+    def handle(self, *args, **options):
+        items = CollectionItem.objects.all()
+        if options["collection"]:
+            items = items.filter(collection_id=options["collection"])
+
+        written = rebalance_all(items, "order", ["collection_id"])
+        self.stdout.write(self.style.SUCCESS(f"Rebalanced {written} collection items"))
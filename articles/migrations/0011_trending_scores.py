@@ -0,0 +1,43 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0010_home_feed'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='articlecomment',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='articlelike',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='collectionitem',
+            name='date_added',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='ArticleTrendingScore',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='articles.article')),
+                ('day_score', models.FloatField()),
+                ('week_score', models.FloatField()),
+                ('month_score', models.FloatField()),
+                ('views_checkpoint', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-day_score'], name='articles_trending_day_idx'), models.Index(fields=['-week_score'], name='articles_trending_week_idx'), models.Index(fields=['-month_score'], name='articles_trending_month_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Both rollup tables are range-partitioned by month on their time bucket, which
+# Django can't express, so the tables are created by hand while the migration
+# state still describes them as regular models. Postgres requires the partition
+# key in every unique constraint, hence the (id, bucket) primary key. Partitions
+# for upcoming months are created by articles.analytics.maintain_partitions.
+def partitioned_table_sql(table, bucket, bucket_type):
+    return f"""
+    CREATE SEQUENCE {table}_id_seq;
+    CREATE TABLE {table} (
+        id bigint NOT NULL DEFAULT nextval('{table}_id_seq'),
+        {bucket} {bucket_type} NOT NULL,
+        views integer NOT NULL DEFAULT 0 CHECK (views >= 0),
+        likes integer NOT NULL DEFAULT 0 CHECK (likes >= 0),
+        comments integer NOT NULL DEFAULT 0 CHECK (comments >= 0),
+        saves integer NOT NULL DEFAULT 0 CHECK (saves >= 0),
+        article_id bigint NOT NULL REFERENCES articles_article (id) DEFERRABLE INITIALLY DEFERRED,
+        PRIMARY KEY (id, {bucket}),
+        UNIQUE (article_id, {bucket})
+    ) PARTITION BY RANGE ({bucket});
+    ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id;
+    CREATE TABLE {table}_default PARTITION OF {table} DEFAULT;
+    DO $$
+    DECLARE
+        month date;
+    BEGIN
+        FOR offset_months IN 0..2 LOOP
+            month := date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => offset_months);
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS {table}_y%sm%s PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+                to_char(month, 'YYYY'), to_char(month, 'MM'),
+                month::text || ' 00:00+00', (month + interval '1 month')::date::text || ' 00:00+00'
+            );
+        END LOOP;
+    END $$;
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0011_trending_scores'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    partitioned_table_sql("articles_articledailystats", "day", "date"),
+                    "DROP TABLE articles_articledailystats;",
+                ),
+                migrations.RunSQL(
+                    partitioned_table_sql("articles_articlehourlystats", "hour", "timestamp with time zone"),
+                    "DROP TABLE articles_articlehourlystats;",
+                ),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='ArticleDailyStats',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('day', models.DateField()),
+                        ('views', models.PositiveIntegerField(default=0)),
+                        ('likes', models.PositiveIntegerField(default=0)),
+                        ('comments', models.PositiveIntegerField(default=0)),
+                        ('saves', models.PositiveIntegerField(default=0)),
+                        ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='articles.article')),
+                    ],
+                    options={
+                        'unique_together': {('article', 'day')},
+                    },
+                ),
+                migrations.CreateModel(
+                    name='ArticleHourlyStats',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('hour', models.DateTimeField()),
+                        ('views', models.PositiveIntegerField(default=0)),
+                        ('likes', models.PositiveIntegerField(default=0)),
+                        ('comments', models.PositiveIntegerField(default=0)),
+                        ('saves', models.PositiveIntegerField(default=0)),
+                        ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='articles.article')),
+                    ],
+                    options={
+                        'unique_together': {('article', 'hour')},
+                    },
+                ),
+            ],
+        ),
+    ]
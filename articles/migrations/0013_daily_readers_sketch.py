@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0012_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articledailystats',
+            name='readers',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:05
+
+from django.db import migrations
+
+
+# Spread existing item orders to multiples of 1024 (backend.ordering.GAP),
+# keeping items that never had an order in the order they were added
+SPREAD_ORDERS = """
+UPDATE articles_collectionitem
+SET "order" = ranked.position * 1024
+FROM (
+    SELECT id, row_number() OVER (PARTITION BY collection_id ORDER BY "order", date_added, id) AS position
+    FROM articles_collectionitem
+) AS ranked
+WHERE articles_collectionitem.id = ranked.id AND articles_collectionitem."order" <> ranked.position * 1024;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0013_daily_readers_sketch'),
+    ]
+
+    operations = [
+        migrations.RunSQL(SPREAD_ORDERS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0014_sparse_collection_order'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleDraftRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('is_keyframe', models.BooleanField(default=False)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('draft', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='articles.articledraft')),
+            ],
+            options={
+                'ordering': ['number'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='articledraftrevision',
+            constraint=models.UniqueConstraint(fields=('draft', 'number'), name='articles_draft_revision_number_uniq'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0016_article_reading_metadata'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0003_follow_graph'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='fanned_out',
+            field=models.BooleanField(default=False),
+        ),
+        # Articles already in feeds, or of authors nobody followed, were fanned
+        # out; the rest were skipped and stay merged in at read time
+        migrations.RunSQL(
+            'UPDATE "articles_article" a SET "fanned_out" = true '
+            'WHERE EXISTS (SELECT 1 FROM "articles_feedentry" f WHERE f."article_id" = a."id") '
+            'OR NOT EXISTS (SELECT 1 FROM "users_follow" u WHERE u."following_id" = a."author_id")',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(condition=models.Q(('fanned_out', False), ('status', 'PU')), fields=['author', '-published_at'], name='articles_not_fanned_out_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 import random
 import string
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 import uuid
@@ -8,6 +9,9 @@ from taggit.managers import TaggableManager
 from taggit.models import GenericUUIDTaggedItemBase, TaggedItemBase
 from django.utils.text import slugify
 from users.models import CustomUser
+from backend import ordering
+from backend.reading import ReadingMetadata
+from backend.revisions import Revision, record as record_revision
 from pgvector.django import VectorField
 from PIL import Image
 from io import BytesIO
@@ -17,7 +21,7 @@ import sys
 # Create your models here.
 
 
-class Article(models.Model):
+class Article(ReadingMetadata):
     DRAFT = "DR"
     PUBLISHED = "PU"
     STATUS_CHOICES = [
@@ -35,6 +39,21 @@ class Article(models.Model):
     status = models.CharField(max_length=2, choices=STATUS_CHOICES, default=DRAFT)
     slug = models.SlugField(max_length=255, unique=True, null=True, blank=True)
     views = models.PositiveIntegerField(default=0)
+    published_at = models.DateTimeField(null=True, blank=True)  # Set on first publish
+    # Written into follower timelines; the others are merged in when feeds
+    # are read (see articles.feed)
+    fanned_out = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Fan-out-on-read for authors with too many followers to fan out to
+            models.Index(fields=["author", "-published_at"], name="articles_author_published_idx"),
+            models.Index(
+                fields=["author", "-published_at"],
+                name="articles_not_fanned_out_idx",
+                condition=models.Q(fanned_out=False, status="PU"),
+            ),
+        ]
 
     def __str__(self):
         if self.title:
@@ -94,17 +113,33 @@ class Article(models.Model):
 
         return combined_text.strip()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets save() tell whether the content changed without re-reading it
+        instance._stored_content = instance.__dict__.get("content", cls._stored_content_unknown)
+        return instance
+
+    _stored_content_unknown = object()
+
     def save(self, *args, **kwargs):
+        if "content" in self.__dict__ and self.content != getattr(
+            self, "_stored_content", self._stored_content_unknown
+        ):
+            self.update_reading_metadata()
         if not self.id:
             super().save(*args, **kwargs)
         self.slug = self.generate_unique_slug()
         super().save()
+        self._stored_content = self.__dict__.get("content", self._stored_content_unknown)
 
     def toggleLike(self, user):
+        """Like or unlike the article; returns True if it is now liked."""
         if ArticleLike.objects.filter(article=self, user=user).exists():
             self.unlike(user)
-        else:
-            self.like(user)
+            return False
+        self.like(user)
+        return True
 
     def like(self, user):
         ArticleLike.objects.get_or_create(article=self, user=user)
@@ -136,7 +171,7 @@ class Article(models.Model):
 class ArticleLike(models.Model):
     article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name="likes")
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="article_likes")
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     user_agent = models.CharField(max_length=255, null=True, blank=True)
 
     class Meta:
@@ -186,10 +221,15 @@ class ArticleDraft(models.Model):
             return image_field  # Return original if compression fails
 
     def save(self, *args, **kwargs):
-        # Compress image if it exists and is being uploaded
-        if self.image:
+        # Compress the image only when a new one is being uploaded; a stored
+        # image would otherwise be downloaded and recompressed on every save
+        if self.image and not self.image._committed:
             self.image = self.compress_image(self.image)
         super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if self.content and (update_fields is None or "content" in update_fields):
+            # Skipped when the content matches the latest revision
+            record_revision(ArticleDraftRevision, self.pk, self.content)
 
     def publish(self):
         """Publish the draft article, copying content and image without duplication"""
@@ -232,7 +272,16 @@ class ArticleDraft(models.Model):
         
         # Set status to published
         article.status = Article.PUBLISHED
+        if article.published_at is None:
+            article.published_at = timezone.now()
         article.save()
+
+        # Push the article into the followers' home feeds once committed
+        from articles.feed import enqueue_fan_out
+        transaction.on_commit(lambda: enqueue_fan_out(article))
+        # Readers then get contentHtml from the cache
+        from backend.rendering import prerender
+        transaction.on_commit(lambda: prerender(article.content))
         
         # Return whether embedding generation is needed
         return needs_embedding
@@ -243,6 +292,18 @@ class ArticleDraft(models.Model):
         return "Untitled"
     
 
+class ArticleDraftRevision(Revision):
+    """A stored version of a draft's content (see backend.revisions)"""
+    draft = models.ForeignKey(ArticleDraft, on_delete=models.CASCADE, related_name="revisions")
+
+    owner_field = "draft"
+
+    class Meta(Revision.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=["draft", "number"], name="articles_draft_revision_number_uniq"),
+        ]
+
+
 class ImageAttachment(models.Model):
     article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name="image_attachments")
     image = models.ImageField(upload_to="attachments/")
@@ -277,7 +338,7 @@ class ArticleComment(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     content = models.TextField()
     likes = models.ManyToManyField(CustomUser, related_name="comment_likes", blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     parent = models.ForeignKey("self", on_delete=models.CASCADE, null=True, blank=True)
     is_pinned = models.BooleanField(default=False)
 
@@ -318,12 +379,143 @@ class CollectionItem(models.Model):
     article = models.ForeignKey(Article, on_delete=models.CASCADE)
     order = models.PositiveIntegerField(default=0)
     date_added = models.DateTimeField(
-        auto_now_add=True
+        auto_now_add=True, db_index=True
     )  # Track when the item was added
 
     class Meta:
         unique_together = ("collection", "article")
+        # Sparse order keys (see backend.ordering); a reorder rewrites only the moved item
         ordering = ["order"]  # Order by the order field
 
+    def get_siblings(self):
+        siblings = CollectionItem.objects.filter(collection_id=self.collection_id)
+        if self.pk:
+            siblings = siblings.exclude(pk=self.pk)
+        return siblings
+
+    def reorder_after(self, target_item_id=None):
+        """Move this item after the target item, or to the beginning if target_item_id is None"""
+        try:
+            self.order = ordering.move_key(self.get_siblings(), "order", after_id=target_item_id)
+        except CollectionItem.DoesNotExist:
+            raise ValueError("Target item not found in the same collection")
+        self.save(update_fields=["order"])
+
+    def reorder_before(self, target_item_id):
+        """Move this item before the target item"""
+        try:
+            self.order = ordering.move_key(self.get_siblings(), "order", before_id=target_item_id)
+        except CollectionItem.DoesNotExist:
+            raise ValueError("Target item not found in the same collection")
+        self.save(update_fields=["order"])
+
+    def save(self, *args, **kwargs):
+        if self.pk is None and self.order == 0:
+            # New items go to the end of the collection
+            self.order = ordering.append_key(self.get_siblings(), "order")
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.collection.name} - {self.article.title}"
+
+
+class FeedEntry(models.Model):
+    """
+    One article in a user's home timeline, written by the fan-out task when the
+    author publishes. Authors with more than ``FEED_FANOUT_MAX_FOLLOWERS``
+    followers are not fanned out; their articles are merged in at read time.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="feed_entries")
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name="feed_entries")
+    author = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="+")
+    published_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("user", "article")
+        indexes = [
+            models.Index(fields=["user", "-published_at", "-article"], name="articles_feed_timeline_idx"),
+            models.Index(fields=["author", "user"], name="articles_feed_author_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id} in {self.user_id}'s feed"
+
+
+class ArticleTrendingScore(models.Model):
+    """
+    Time-decayed engagement per article, maintained by articles.trending.
+
+    Scores are stored as log2 of the engagement decayed to a fixed reference
+    time, one column per window half-life. Ordering by a column is the same
+    as ordering by the current decayed score, so rows only change when an
+    article gets new engagement and ranking is an index scan.
+    """
+    article = models.OneToOneField(Article, primary_key=True, on_delete=models.CASCADE, related_name="trending")
+    day_score = models.FloatField()
+    week_score = models.FloatField()
+    month_score = models.FloatField()
+    views_checkpoint = models.PositiveIntegerField(default=0)  # Article.views already counted
+    computed_at = models.DateTimeField(db_index=True)  # Last time engagement was added
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-day_score"], name="articles_trending_day_idx"),
+            models.Index(fields=["-week_score"], name="articles_trending_week_idx"),
+            models.Index(fields=["-month_score"], name="articles_trending_month_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id}: {self.week_score:.2f}"
+
+
+class ArticleHourlyStats(models.Model):
+    """
+    Per-article engagement rolled up per hour from the analytics event buffer
+    (see articles.analytics). The table is range-partitioned by month on
+    ``hour`` in the database, so its primary key is really (id, hour).
+    """
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name="+")
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+    likes = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    saves = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("article", "hour")
+
+    def __str__(self):
+        return f"{self.article_id} @ {self.hour:%Y-%m-%d %H:00}: {self.views} views"
+
+
+class ArticleDailyStats(models.Model):
+    """
+    Daily counterpart of ArticleHourlyStats, range-partitioned by month on
+    ``day``. ``readers`` is a HyperLogLog sketch (articles.hll) of the distinct
+    readers that day; sketches of several days merge into the range's count.
+    """
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name="+")
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    likes = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    saves = models.PositiveIntegerField(default=0)
+    readers = models.BinaryField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("article", "day")
+
+    def __str__(self):
+        return f"{self.article_id} @ {self.day}: {self.views} views"
+
+
+class AnalyticsFlush(models.Model):
+    """
+    A drained batch of analytics events (see articles.analytics.flush_events),
+    recorded in the transaction applying it so a retry never applies it twice
+    """
+    flush_id = models.CharField(max_length=32, unique=True)
+    flushed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.flush_id
@@ -6,19 +6,29 @@ from strawberry.file_uploads import Upload
 import strawberry
 from enum import Enum
 
-from articles.enums import ArticleSortBy
+from articles.enums import AnalyticsRange, ArticleSortBy, TrendingWindow
+from articles import analytics
+from articles import cache as article_cache
+from articles import autosave as draft_autosave
+from articles.types.analytics import AnalyticsPoint, AuthorAnalytics
 from articles.types.article_comments import CommentType
-from articles.types.collection import CollectionType
-from .types.article import ArticleType
+from articles.types.collection import CollectionType, CollectionItemType
+from articles.types.feed import FeedConnection
+from articles.feed import home_feed
+from articles.trending import order_by_trending, trending_articles
+from .types.article import ARTICLE_HEAVY_FIELDS, ArticleType
+from backend.resolver_cache import cached_field
+from backend.selection import defer_unselected, unselected
+from backend.types import ContentPatchInput
 from articles.models import (
     Article,
     ArticleComment,
-    UserArticlesVisitHistory,
     Collection,
     CollectionItem,
     ArticleDraft,
 )
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from articles.types.draft_article import ArticleDraftType
 from articles.utils import create_embedding_generation_cloud_task
 from graphql import GraphQLError
@@ -89,33 +99,29 @@ class Query:
         # Apply sorting based on sort_by parameter
         if sort_by == ArticleSortBy.POPULAR:
             qs = qs.order_by("-views", "-created_at")  # Most views first, then latest
+        elif sort_by == ArticleSortBy.TRENDING:
+            qs = order_by_trending(qs)  # Decayed recent engagement, see articles.trending
         elif sort_by == ArticleSortBy.LATEST:
             qs = qs.order_by("-created_at")  # Most recent first
         else:
             # Default sorting (latest)
             qs = qs.order_by("-created_at")
         
-        return qs
+        articles = list(defer_unselected(qs, info, ARTICLE_HEAVY_FIELDS))
+        analytics.prime_readers(info.context.request, articles)
+        return articles
 
     # TO:DO = Need to fix the only published article can be accesses
     @strawberry.field
     def article(self, info, slug: str) -> ArticleType:
         id = slug.split("-")[-1]
 
-        article = Article.objects.get(id=id)
+        # With its author and counts, from the cache (see articles.cache)
+        article = article_cache.get_article(id)
 
-        # Save the user visit history
-        if info.context.request.user.is_authenticated:
-            visit, created = UserArticlesVisitHistory.objects.get_or_create(
-                user=info.context.request.user, article=article
-            )
-            if not created:
-                visit.visit_count += 1
-                visit.save()
-
-        # Increment the article views
-        article.views += 1
-        article.save()
+        # The view count and the user visit history are applied in batches by
+        # the analytics flush job instead of on every read
+        analytics.record_view(article, info.context.request)
 
         return article
 
@@ -148,11 +154,86 @@ class Query:
         ).order_by("-updated_at")
         return DraftArticleList(articles=drafts)  # ✅ Return wrapped list
 
+    @strawberry.field
+    def trending_articles(
+        self,
+        info: Info,
+        window: TrendingWindow = TrendingWindow.WEEK,
+        number: int = 20,
+        page: int = 1,
+    ) -> List[ArticleType]:
+        if page < 1:
+            raise Exception("Invalid page number. Page number must be greater than 0.")
+        articles = trending_articles(
+            window, min(number, 100), page, defer=unselected(info, ARTICLE_HEAVY_FIELDS)
+        )
+        analytics.prime_readers(info.context.request, articles)
+        return articles
+
+    @strawberry.field
+    def feed(
+        self, info: Info, first: int = 20, after: Optional[str] = None
+    ) -> FeedConnection:
+        """Published articles from the authors the current user follows, newest first"""
+        user = info.context.request.user
+        if not user.is_authenticated:
+            raise GraphQLError("You must be logged in", extensions={"code": "UNAUTHENTICATED"})
+        try:
+            articles, end_cursor, has_next_page = home_feed(
+                user, min(first, 100), after, defer=unselected(info, ARTICLE_HEAVY_FIELDS, path=("articles",))
+            )
+        except ValueError as e:
+            raise GraphQLError(str(e), extensions={"code": "BAD_REQUEST"})
+        analytics.prime_readers(info.context.request, articles)
+        return FeedConnection(articles=articles, end_cursor=end_cursor, has_next_page=has_next_page)
+
+    @strawberry.field
+    def author_analytics(
+        self,
+        info: Info,
+        range: AnalyticsRange = AnalyticsRange.LAST_7_DAYS,
+        article_slug: Optional[str] = None,
+    ) -> AuthorAnalytics:
+        """Engagement on the current user's articles, read from the hourly/daily rollups"""
+        user = info.context.request.user
+        if not user.is_authenticated:
+            raise GraphQLError("You must be logged in", extensions={"code": "UNAUTHENTICATED"})
+
+        article_id = None
+        if article_slug:
+            article = Article.objects.filter(id=article_slug.split("-")[-1], author=user).only("id").first()
+            if article is None:
+                raise GraphQLError("Article doesn't exist.", extensions={"code": "NOT_FOUND"})
+            article_id = article.id
+
+        since, hourly = analytics.range_start(range)
+        rows = analytics.author_analytics(user, since, hourly, article_id)
+        bucket = "hour" if hourly else "day"
+        points = [
+            AnalyticsPoint(
+                bucket=row[bucket].isoformat(),
+                views=row["total_views"],
+                likes=row["total_likes"],
+                comments=row["total_comments"],
+                saves=row["total_saves"],
+            )
+            for row in rows
+        ]
+        return AuthorAnalytics(
+            range=range,
+            points=points,
+            total_views=sum(point.views for point in points),
+            total_likes=sum(point.likes for point in points),
+            total_comments=sum(point.comments for point in points),
+            total_saves=sum(point.saves for point in points),
+        )
+
     @strawberry.field
     def collection(self, info, id: int) -> CollectionType:
         return Collection.objects.get(id=id)
 
     @strawberry.field
+    @cached_field(ttl=30, stale=5 * 60)
     def collections(
         self,
         info: Info,
@@ -200,21 +281,42 @@ class Mutation:
         slug: str,
         title: Optional[str] = None,
         content: Optional[str] = None,
+        content_patch: Optional[ContentPatchInput] = None,
     ) -> ArticleType:
         if not info.context.request.user.is_authenticated:
             raise Exception("You must be logged")
+        if content and content_patch is not None:
+            raise GraphQLError("Cannot specify both content and content_patch", extensions={"code": "BAD_REQUEST"})
         article = Article.objects.get(slug=slug)
         draftArticle = article.draft
         # Check if the user is the owner of the article
         if article.author != info.context.request.user:
             raise Exception("You Can't update Someone else's article")
-        if title:
-            draftArticle.title = title
-        if content:
-            draftArticle.content = content
-        draftArticle.save()
+        # Autosaves are coalesced in the buffer and written periodically
+        if draft_autosave.buffer_changes(draftArticle, title, content, content_patch):
+            return article
+        # The buffer is unavailable: save directly, starting from the latest draft
+        with transaction.atomic():
+            draftArticle = draft_autosave.take_changes(draftArticle)
+            if title:
+                draftArticle.title = title
+            if content_patch is not None:
+                draftArticle.content = content_patch.apply(draftArticle.content or "")
+            elif content:
+                draftArticle.content = content
+            draftArticle.save(update_fields=["title", "content", "updated_at"])
         return article
 
+    @strawberry.mutation
+    def close_article_draft(self, info: Info, slug: str) -> ArticleDraftType:
+        """Write a draft's buffered autosave now, when its editor is closed"""
+        if not info.context.request.user.is_authenticated:
+            raise Exception("You must be logged")
+        article = Article.objects.get(slug=slug)
+        if article.author != info.context.request.user:
+            raise Exception("You Can't update Someone else's article")
+        return draft_autosave.flush_draft(article.draft)
+
     @strawberry.mutation
     def publish_article(self, info: Info, slug: str) -> str:
         try:
@@ -222,7 +324,7 @@ class Mutation:
             if info.context.request.user != article.author:
                 raise Exception("You Can't Publish Other Article")
 
-            draft_article = article.draft
+            draft_article = draft_autosave.flush_draft(article.draft)
             
             # Use the new publish method which returns if embedding is needed
             needs_embedding = draft_article.publish()
@@ -262,7 +364,7 @@ class Mutation:
             article.save()
         else:
             # Use the new publish method
-            draft_article = article.draft
+            draft_article = draft_autosave.flush_draft(article.draft)
             needs_embedding = draft_article.publish()
             
             # Generate embedding if content changed
@@ -312,6 +414,7 @@ class Mutation:
             content=content,
             parent=parent,
         )
+        analytics.record_event(analytics.COMMENT, article.id, user.id)
         return comment
 
     @strawberry.mutation
@@ -371,7 +474,8 @@ class Mutation:
             raise Exception("You must be logged")
 
         article = Article.objects.get(slug=slug)
-        article.toggleLike(info.context.request.user)
+        if article.toggleLike(info.context.request.user):
+            analytics.record_event(analytics.LIKE, article.id, info.context.request.user.id)
         return article
 
     @strawberry.mutation
@@ -455,6 +559,7 @@ class Mutation:
             if not created:
                 collection_item.delete()
                 return False
+            analytics.record_event(analytics.SAVE, article.id, info.context.request.user.id)
             return True
         except ObjectDoesNotExist:
             raise Exception("Collection or Article does not exist")
@@ -478,3 +583,33 @@ class Mutation:
             return True
         except ObjectDoesNotExist:
             raise Exception("Collection or Article does not exist")
+
+    @strawberry.mutation
+    def reorder_collection_item(
+        self,
+        info,
+        item_id: int,
+        insert_after_item_id: Optional[int] = None,
+        insert_before_item_id: Optional[int] = None,
+    ) -> CollectionItemType:
+        if not info.context.request.user.is_authenticated:
+            raise Exception("You must be logged")
+        if insert_after_item_id is not None and insert_before_item_id is not None:
+            raise Exception("Cannot specify both insert_after_item_id and insert_before_item_id")
+
+        try:
+            item = CollectionItem.objects.select_related("collection").get(id=item_id)
+        except ObjectDoesNotExist:
+            raise Exception("Collection item does not exist")
+        if item.collection.user != info.context.request.user:
+            raise Exception("You can't modify Someone else's collection")
+
+        try:
+            if insert_before_item_id is not None:
+                item.reorder_before(insert_before_item_id)
+            else:
+                # No target moves the item to the beginning
+                item.reorder_after(insert_after_item_id)
+        except ValueError as e:
+            raise GraphQLError(str(e))
+        return item
@@ -0,0 +1,46 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from articles import feed
+from articles.cache import invalidate_articles
+from articles.models import Article, ArticleComment, ArticleLike, CollectionItem, FeedEntry
+from users.models import CustomUser, Follow
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill_feed(instance.user_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    FeedEntry.objects.filter(author_id=instance.following_id, user_id=instance.user_id).delete()
+
+
+# Cached articles (see articles.cache)
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def article_changed(sender, instance, **kwargs):
+    invalidate_articles([instance.pk])
+
+
+@receiver(post_save, sender=ArticleLike)
+@receiver(post_delete, sender=ArticleLike)
+@receiver(post_save, sender=ArticleComment)
+@receiver(post_delete, sender=ArticleComment)
+@receiver(post_save, sender=CollectionItem)
+@receiver(post_delete, sender=CollectionItem)
+def article_counts_changed(sender, instance, created=True, **kwargs):
+    # Only additions and removals change the counts
+    if created:
+        invalidate_articles([instance.article_id])
+
+
+@receiver(post_save, sender=CustomUser)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Logins only touch last_login, which cached articles don't show
+    if created or (update_fields is not None and set(update_fields) <= {"last_login"}):
+        return
+    invalidate_articles(list(Article.objects.filter(author_id=instance.pk).values_list("id", flat=True)))
@@ -8,4 +8,85 @@ def add(x, y):
         print("Processing...")
         time.sleep(1)  # Sleep for 1 second in each iteration
     print(f"Adding {x} and {y}")
-    return x + y
\ No newline at end of file
+    return x + y
+
+@shared_task
+def fan_out_article(article_id):
+    """Write a newly published article into every follower's home feed."""
+    from django.conf import settings
+    from articles.feed import is_fan_out_author
+    from articles.models import Article, FeedEntry
+    from users.models import Follow
+
+    article = Article.objects.filter(id=article_id, status=Article.PUBLISHED).only(
+        "id", "author_id", "published_at"
+    ).first()
+    if article is None or article.published_at is None:
+        return 0
+    if not is_fan_out_author(article.author_id):
+        # Merged in at read time, see articles.feed.home_feed
+        return 0
+
+    follower_ids = Follow.objects.filter(following_id=article.author_id).values_list(
+        "user_id", flat=True
+    ).iterator(chunk_size=settings.FEED_FANOUT_BATCH_SIZE)
+
+    written = 0
+    batch = []
+    for follower_id in follower_ids:
+        batch.append(FeedEntry(
+            user_id=follower_id,
+            article_id=article.id,
+            author_id=article.author_id,
+            published_at=article.published_at,
+        ))
+        if len(batch) >= settings.FEED_FANOUT_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            written += len(batch)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        written += len(batch)
+    Article.objects.filter(id=article.id).update(fanned_out=True)
+    return written
+
+
+@shared_task
+def update_trending_scores():
+    """Periodic job (see CELERY_BEAT_SCHEDULE) folding new engagement into trending scores."""
+    from articles import trending
+
+    return trending.update_trending_scores()
+
+
+@shared_task
+def flush_analytics_events():
+    """Periodic job rolling buffered engagement events up into the analytics tables."""
+    from articles import analytics
+
+    return analytics.flush_events()
+
+
+@shared_task
+def maintain_analytics_partitions():
+    """Periodic job creating upcoming monthly analytics partitions and dropping expired ones."""
+    from articles import analytics
+
+    return analytics.maintain_partitions()
+
+
+@shared_task
+def flush_draft_autosaves():
+    """Periodic job writing buffered article draft autosaves to the database."""
+    from articles.autosave import flush_drafts
+
+    return flush_drafts()
+
+
+@shared_task
+def thin_draft_revisions():
+    """Periodic job thinning old article draft revisions down to the retention policy."""
+    from articles.models import ArticleDraftRevision
+    from backend import revisions
+
+    return revisions.thin(ArticleDraftRevision)
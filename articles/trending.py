@@ -0,0 +1,185 @@
+"""
+Time-decayed trending scores.
+
+Every engagement event (view, like, save, comment) contributes
+``weight * 0.5 ** (age / half_life)`` to an article's score. Instead of
+decaying every row on every run, scores are kept decayed to a fixed reference
+time (``EPOCH``) in log2 space: an event at time ``t`` adds
+``log2(weight) + (t - EPOCH) / half_life``, combined with log-add-exp. Relative
+order between articles is identical to ordering by the current decayed score,
+so a periodic job only rewrites rows that got new engagement and ranking is a
+plain index scan on ``ArticleTrendingScore``.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from articles.enums import TrendingWindow
+from articles.models import (
+    Article,
+    ArticleComment,
+    ArticleLike,
+    ArticleTrendingScore,
+    CollectionItem,
+)
+
+# Reference time stored scores are decayed to. Changing it requires
+# recomputing every row.
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+HALF_LIVES = {
+    TrendingWindow.DAY: timedelta(hours=6),
+    TrendingWindow.WEEK: timedelta(days=2),
+    TrendingWindow.MONTH: timedelta(days=7),
+}
+
+WINDOW_LENGTHS = {
+    TrendingWindow.DAY: timedelta(days=1),
+    TrendingWindow.WEEK: timedelta(days=7),
+    TrendingWindow.MONTH: timedelta(days=30),
+}
+
+SCORE_FIELDS = {
+    TrendingWindow.DAY: "day_score",
+    TrendingWindow.WEEK: "week_score",
+    TrendingWindow.MONTH: "month_score",
+}
+
+WEIGHTS = {
+    "view": 1.0,
+    "like": 4.0,
+    "comment": 5.0,
+    "save": 6.0,
+}
+
+# How far back the very first run looks for likes, saves and comments
+FIRST_RUN_LOOKBACK = timedelta(days=30)
+# Re-scan a little before the last run in case it committed late; events are
+# still only counted once per article thanks to ``computed_at``.
+RUN_OVERLAP = timedelta(hours=1)
+
+NO_SCORE = float("-inf")
+
+
+def _log_add(a, b):
+    if a == NO_SCORE:
+        return b
+    if b == NO_SCORE:
+        return a
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def _contribution(at, weight, half_life):
+    return math.log2(weight) + (at - EPOCH) / half_life
+
+
+def update_trending_scores(now=None):
+    """Fold engagement since the last run into the stored scores. Returns the rows written."""
+    now = now or timezone.now()
+    last_run = ArticleTrendingScore.objects.aggregate(last=Max("computed_at"))["last"]
+    since = last_run - RUN_OVERLAP if last_run else now - FIRST_RUN_LOOKBACK
+
+    events = defaultdict(list)
+    sources = (
+        (ArticleLike, "created_at", "like"),
+        (CollectionItem, "date_added", "save"),
+        (ArticleComment, "created_at", "comment"),
+    )
+    for model, time_field, kind in sources:
+        rows = model.objects.filter(
+            **{f"{time_field}__gt": since, "article__status": Article.PUBLISHED}
+        ).values_list("article_id", time_field)
+        for article_id, at in rows:
+            events[article_id].append((at, WEIGHTS[kind]))
+
+    # Views only exist as a cumulative counter, so count what was added since
+    # the article's checkpoint and attribute it to this run.
+    views = dict(
+        Article.objects.filter(status=Article.PUBLISHED)
+        .filter(
+            Q(trending__isnull=True, views__gt=0)
+            | Q(views__gt=F("trending__views_checkpoint"))
+        )
+        .values_list("id", "views")
+    )
+
+    candidate_ids = set(events) | set(views)
+    if not candidate_ids:
+        return 0
+
+    with transaction.atomic():
+        existing = ArticleTrendingScore.objects.select_for_update().in_bulk(candidate_ids)
+        published_at = dict(
+            Article.objects.filter(id__in=candidate_ids - existing.keys()).values_list("id", "published_at")
+        )
+        created, updated = [], []
+        for article_id in candidate_ids:
+            row = existing.get(article_id)
+            if row is None:
+                row = ArticleTrendingScore(
+                    article_id=article_id,
+                    day_score=NO_SCORE,
+                    week_score=NO_SCORE,
+                    month_score=NO_SCORE,
+                    views_checkpoint=0,
+                )
+                counted_until = since
+                # Lifetime views of older articles are not "recent" engagement
+                if published_at.get(article_id) and published_at[article_id] <= since:
+                    row.views_checkpoint = views.get(article_id, 0)
+                created.append(row)
+            else:
+                counted_until = row.computed_at
+
+            contributions = [(at, weight) for at, weight in events[article_id] if at > counted_until]
+            current_views = views.get(article_id, row.views_checkpoint)
+            if current_views > row.views_checkpoint:
+                contributions.append((now, WEIGHTS["view"] * (current_views - row.views_checkpoint)))
+            if article_id in existing:
+                if not contributions:
+                    continue  # Only matched by the overlap window
+                updated.append(row)
+
+            for window, field in SCORE_FIELDS.items():
+                score = getattr(row, field)
+                for at, weight in contributions:
+                    score = _log_add(score, _contribution(at, weight, HALF_LIVES[window]))
+                setattr(row, field, score)
+            row.views_checkpoint = current_views
+            row.computed_at = now
+
+        ArticleTrendingScore.objects.bulk_create(created, batch_size=1000)
+        ArticleTrendingScore.objects.bulk_update(
+            updated,
+            ["day_score", "week_score", "month_score", "views_checkpoint", "computed_at"],
+            batch_size=1000,
+        )
+    return len(created) + len(updated)
+
+
+def trending_articles(window=TrendingWindow.WEEK, number=20, page=1, defer=()):
+    """Published articles ranked by decayed engagement within the window, without the ``defer``red columns."""
+    field = SCORE_FIELDS[window]
+    start = (page - 1) * number
+    rows = (
+        ArticleTrendingScore.objects.filter(
+            article__status=Article.PUBLISHED,
+            computed_at__gte=timezone.now() - WINDOW_LENGTHS[window],
+            **{f"{field}__gt": NO_SCORE},
+        )
+        .select_related("article__author")
+        .defer(*[f"article__{field}" for field in defer])
+        .order_by(f"-{field}")[start:start + number]
+    )
+    return [row.article for row in rows]
+
+
+def order_by_trending(qs, window=TrendingWindow.WEEK):
+    """Order an Article queryset by trending score, untracked articles last."""
+    field = SCORE_FIELDS[window]
+    return qs.order_by(F(f"trending__{field}").desc(nulls_last=True), "-created_at")
@@ -0,0 +1,23 @@
+import strawberry
+from typing import List
+
+from articles.enums import AnalyticsRange
+
+
+@strawberry.type
+class AnalyticsPoint:
+    bucket: str  # ISO hour or day
+    views: int
+    likes: int
+    comments: int
+    saves: int
+
+
+@strawberry.type
+class AuthorAnalytics:
+    range: AnalyticsRange
+    points: List[AnalyticsPoint]
+    total_views: int
+    total_likes: int
+    total_comments: int
+    total_saves: int
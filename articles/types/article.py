@@ -2,12 +2,30 @@ import strawberry
 import strawberry_django
 from users.types.user import UserType
 from articles.models import Article
+from articles.analytics import prime_readers, unique_readers
 from typing import List, Optional
 from strawberry.types import Info
 from .article_comments import CommentType
+from backend.rendering import render_html
+from backend.resolver_cache import cached_field
+from backend.selection import defer_unselected
+from backend.types import TocEntryType, toc_entries
 
 # from django.contrib.auth.models import
 
+# Columns list resolvers only load when one of these fields is selected
+# (see backend.selection)
+ARTICLE_HEAVY_FIELDS = {
+    "content": ("content", "contentHtml"),
+    "embedding": ("relatedArticles",),
+    "toc": ("toc",),
+}
+
+
+@cached_field(ttl=5 * 60, stale=60 * 60, heavy_fields=ARTICLE_HEAVY_FIELDS)
+def _related_articles(article, info):
+    return defer_unselected(article.related(), info, ARTICLE_HEAVY_FIELDS)
+
 
 @strawberry_django.type(Article)
 class ArticleType:
@@ -20,6 +38,20 @@ class ArticleType:
     updated_at: str
     author: UserType
     status: str
+    word_count: int
+    reading_time: int  # Minutes
+
+    @strawberry.field
+    def content_html(self) -> str | None:
+        """The content rendered to sanitized HTML, prerendered when published"""
+        if self.content is None:
+            return None
+        return render_html(self.content)
+
+    @strawberry.field
+    def toc(self) -> List[TocEntryType]:
+        """Headings of the content, stored when it is published"""
+        return toc_entries(self.toc)
 
     @strawberry.field
     def thumbnail(self, info: Info) -> str:
@@ -36,16 +68,28 @@ class ArticleType:
 
     @strawberry.field
     def related_articles(self, info: Info) -> List["ArticleType"]:
-        return self.related()
+        articles = _related_articles(self, info)
+        prime_readers(info.context.request, articles)
+        return articles
 
     @strawberry.field
     def likes_count(self, info: Info) -> int:
+        # Counts come with articles read through articles.cache
+        if hasattr(self, "likes_total"):
+            return self.likes_total
         return self.get_likes_count()
 
     @strawberry.field
     def saves_count(self, info: Info) -> int:
+        if hasattr(self, "saves_total"):
+            return self.saves_total
         return self.get_save_count()
 
+    @strawberry.field
+    def unique_readers(self, info: Info, days: int = 30) -> int:
+        """Approximate distinct readers (signed in or anonymous) over the last ``days`` days"""
+        return unique_readers(self.id, min(max(days, 1), 365), request=info.context.request)
+
     @strawberry.field
     def is_liked(self, info: Info) -> bool:
         currentUser = info.context.request.user
@@ -73,10 +117,14 @@ class ArticleType:
 
     @strawberry.field
     def comments_count(self, info: Info) -> int:
+        if hasattr(self, "comments_total"):
+            return self.comments_total
         return self.comments.filter(parent=None).count()
 
     @strawberry.field
     def total_comments_count(self, info: Info) -> int:
+        if hasattr(self, "all_comments_total"):
+            return self.all_comments_total
         return self.comments.count()
 
     @strawberry.field
@@ -1,17 +1,41 @@
 import strawberry
 import strawberry_django
-from typing import Optional
+from typing import List, Optional
 from strawberry.types import Info
-from articles.models import ArticleDraft
+from articles.autosave import overlay
+from articles.models import ArticleDraft, ArticleDraftRevision
 from articles.types.article import ArticleType
+from backend.patches import content_hash
+from backend.types import RevisionType, revision_type, revision_types
 
 @strawberry_django.type(ArticleDraft)
 class ArticleDraftType:
     article: ArticleType
-    title: str | None
-    content: str | None
     updated_at: Optional[str]
 
+    # Title and content include the latest buffered autosave (see articles.autosave)
+    @strawberry.field
+    def title(self, info: Info) -> str | None:
+        return overlay(self).title
+
+    @strawberry.field
+    def content(self, info: Info) -> str | None:
+        return overlay(self).content
+
+    @strawberry.field
+    def content_hash(self, info: Info) -> str:
+        """Base revision hash for contentPatch updates"""
+        return content_hash(overlay(self).content)
+
+    @strawberry.field
+    def revisions(self, info: Info, first: int = 50, before: Optional[int] = None) -> List[RevisionType]:
+        """Saved revisions, newest first; page with ``before`` set to the last number"""
+        return revision_types(ArticleDraftRevision, self.pk, first, before)
+
+    @strawberry.field
+    def revision(self, info: Info, number: int) -> Optional[RevisionType]:
+        return revision_type(ArticleDraftRevision, self.pk, number)
+
     @strawberry.field
     def image_url(self, info: Info) -> str:
         return self.image.url if self.image else ""
\ No newline at end of file
@@ -0,0 +1,11 @@
+import strawberry
+from typing import List, Optional
+
+from articles.types.article import ArticleType
+
+
+@strawberry.type
+class FeedConnection:
+    articles: List[ArticleType]
+    end_cursor: Optional[str]
+    has_next_page: bool
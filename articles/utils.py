@@ -1,10 +1,6 @@
 from articles.models import Article
-from google.cloud import tasks_v2
-import json
-import os
-import base64
-from datetime import datetime, timedelta
-from django.conf import settings
+from backend.cloud_tasks import create_embedding_task
+from datetime import datetime
 
 def get_article_from_slug(slug):
     """
@@ -27,18 +23,6 @@ def create_embedding_generation_cloud_task(article: Article):
     Returns:
         dict: Response from Cloud Tasks API
     """
-    # Initialize the Cloud Tasks client
-    client = tasks_v2.CloudTasksClient()
-    
-    # Configuration from Django settings
-    project_id = settings.GOOGLE_CLOUD_PROJECT
-    queue_name = settings.CLOUD_TASKS_QUEUE
-    location = settings.CLOUD_TASKS_LOCATION
-    endpoint_url = settings.TASK_ENDPOINT_URL
-    
-    # Construct the fully qualified queue name
-    parent = client.queue_path(project_id, location, queue_name)
-    
     # Use the model's method to get properly formatted text for embedding
     combined_text = article.get_embedding_text()
     
@@ -53,37 +37,14 @@ def create_embedding_generation_cloud_task(article: Article):
         }
     }
     
-    # Create the task with base64 encoded body
-    task = {
-        'http_request': {
-            'http_method': tasks_v2.HttpMethod.POST,
-            'url': endpoint_url,
-            'headers': {
-                'Content-Type': 'application/json',
-                'User-Agent': 'Google-Cloud-Tasks-Embedding',
-                'Authorization': f'Bearer {settings.CLOUD_TASKS_AUTH_TOKEN}' if hasattr(settings, 'CLOUD_TASKS_AUTH_TOKEN') else None
-            },
-            'body': base64.b64encode(json.dumps(payload).encode('utf-8'))
-        }
-    }
-    
-    # Remove Authorization header if not set
-    if task['http_request']['headers']['Authorization'] is None:
-        del task['http_request']['headers']['Authorization']
-    
     try:
         # Create the task
-        response = client.create_task(
-            request={
-                'parent': parent,
-                'task': task
-            }
-        )
+        task_name = create_embedding_task(payload)
         
         return {
             'success': True,
-            'task_name': response.name,
-            'message': f'Embedding task created successfully: {response.name}',
+            'task_name': task_name,
+            'message': f'Embedding task created successfully: {task_name}',
             'article_id': article.id
         }
         
@@ -94,4 +55,3 @@ def create_embedding_generation_cloud_task(article: Article):
             'message': f'Failed to create embedding task: {str(e)}',
             'article_id': article.id
         }
-    
\ No newline at end of file
@@ -17,6 +17,7 @@ from rest_framework.decorators import api_view
 from rest_framework.authentication import SessionAuthentication
 from articles.models import Article
 from .utils import get_article_from_slug
+from articles.analytics import LIKE, record_event
 from django.views.decorators.csrf import csrf_exempt
 
 
@@ -83,7 +84,8 @@ class ArticleView(APIView):
         if request.FILES.get("image"):
             image = request.FILES["image"]
             draft_article.image = image
-            draft_article.save()
+            # Title and content may have newer buffered autosaves
+            draft_article.save(update_fields=["image", "updated_at"])
             return Response(
                 {"message": "Image uploaded successfully"},
                 status=status.HTTP_200_OK,
@@ -139,7 +141,8 @@ class LikeArticle(APIView):
     def get(self, request):
         slug = request.query_params.get("slug")
         article = Article.objects.get(slug=slug)
-        article.toggleLike(request.user)
+        if article.toggleLike(request.user):
+            record_event(LIKE, article.id, request.user.id)
         return Response({"message": "Toggled like"})
 
 
@@ -270,7 +273,9 @@ def manageArticleThumbnail(request, slug):
 
         # Update the draft with the new image
         draft.image = request.FILES["image"]
-        draft.save()  # This will trigger compress_image method
+        # This will trigger compress_image method; title and content may have
+        # newer buffered autosaves
+        draft.save(update_fields=["image", "updated_at"])
         
         return JsonResponse({
             "message": "Thumbnail uploaded successfully",
@@ -282,7 +287,7 @@ def manageArticleThumbnail(request, slug):
         if draft.image:
             draft.image.delete(save=False)  # Delete file from storage
             draft.image = None
-            draft.save()
+            draft.save(update_fields=["image", "updated_at"])
             return JsonResponse({"message": "Thumbnail deleted successfully"}, status=200)
         else:
             return JsonResponse({"error": "No thumbnail to delete"}, status=400)
@@ -0,0 +1,229 @@
+"""
+Autosave coalescing buffer.
+
+Editors autosave every few seconds. Instead of writing every autosave to
+Postgres, the latest field values of a document are kept in a Redis hash
+(``autosave:doc:<kind>:<id>``) and the document is added to a per-kind dirty
+set. A periodic task writes all dirty documents with one batched statement
+per run (at most every AUTOSAVE_FLUSH_INTERVAL seconds); publishing or
+closing a document flushes it right away. Reads overlay the buffered values,
+so clients always see their latest autosave.
+
+Every buffered write bumps the hash's ``rev``; a flush only clears a buffer
+whose ``rev`` is still the one it wrote, so autosaves that land during a
+flush are kept for the next one. Redis must persist (AOF) for the buffer to
+survive restarts; when Redis is unavailable callers write through to the
+database.
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from backend.redis_client import get_redis
+
+FLUSH_LOCK_KEY = "autosave:flush-lock:{kind}"
+
+# Clears the buffers whose rev is unchanged since they were read for a flush
+# ("" for buffers that were already gone). KEYS: the document hashes, then the
+# dirty set; ARGV: their revs, then their members
+CLEAR_FLUSHED = """
+local dirty = KEYS[#KEYS]
+local n = #KEYS - 1
+local cleared = 0
+for i = 1, n do
+    local rev = redis.call('HGET', KEYS[i], 'rev')
+    if rev == ARGV[i] or (not rev and ARGV[i] == '') then
+        redis.call('DEL', KEYS[i])
+        redis.call('ZREM', dirty, ARGV[n + i])
+        cleared = cleared + 1
+    end
+end
+return cleared
+"""
+
+
+def _dirty_key(kind):
+    return f"autosave:dirty:{kind}"
+
+
+def _doc_key(kind, pk):
+    return f"autosave:doc:{kind}:{pk}"
+
+
+def _decode(raw):
+    if not raw:
+        return None
+    fields = {key.decode(): value.decode() for key, value in raw.items()}
+    fields.pop("rev", None)
+    return fields
+
+
+def save(kind, pk, **fields):
+    """
+    Buffer the latest values of some fields of a document. Returns False if
+    the buffer is unavailable, in which case the caller should save directly.
+    """
+    redis = get_redis()
+    try:
+        pipe = redis.pipeline()
+        pipe.hset(_doc_key(kind, pk), mapping=fields)
+        pipe.hincrby(_doc_key(kind, pk), "rev", 1)
+        # Keeps the time of the oldest unflushed autosave
+        pipe.zadd(_dirty_key(kind), {str(pk): time.time()}, nx=True)
+        pipe.execute()
+        return True
+    except Exception as e:
+        print(f"Failed to buffer autosave of {kind} {pk}: {str(e)}")
+        return False
+
+
+def edit(kind, pk, load, change):
+    """
+    Read-modify-write a buffered document under a per-document lock.
+    ``load()`` returns the stored field values when nothing is buffered and
+    ``change(fields)`` returns the fields to update. Returns the new values,
+    or None if the buffer is unavailable.
+    """
+    try:
+        lock = _lock_document(get_redis(), kind, pk)
+        if lock is None:
+            return None
+    except Exception as e:
+        print(f"Failed to lock autosave of {kind} {pk}: {str(e)}")
+        return None
+    try:
+        current = {**load(), **(get(kind, pk) or {})}
+        updates = change(current)
+        if not save(kind, pk, **updates):
+            return None
+        return {**current, **updates}
+    finally:
+        _release(lock)
+
+
+def get(kind, pk):
+    """Buffered field values of a document, or None"""
+    try:
+        return _decode(get_redis().hgetall(_doc_key(kind, pk)))
+    except Exception as e:
+        print(f"Failed to read autosave of {kind} {pk}: {str(e)}")
+        return None
+
+
+def dirty(kind):
+    """Primary keys (as strings) of the documents of ``kind`` with unflushed changes"""
+    return [member.decode() for member in get_redis().zrange(_dirty_key(kind), 0, -1)]
+
+
+def overlay(kind, instance, fields):
+    """Apply buffered values of ``fields`` to a model instance (in place) and return it"""
+    buffered = get(kind, instance.pk)
+    if buffered:
+        for name in fields:
+            if name in buffered:
+                setattr(instance, name, buffered[name])
+    return instance
+
+
+def _lock_document(redis, kind, pk):
+    # Serializes read-modify-write edits of one document with take()
+    lock = redis.lock(f"autosave:lock:{kind}:{pk}", timeout=10, blocking_timeout=5)
+    return lock if lock.acquire() else None
+
+
+def _lock_flush(redis, kind):
+    # Held while a batch is read, written and cleared, so a document is never
+    # taken or rewritten while an older copy of it is being flushed
+    lock = redis.lock(FLUSH_LOCK_KEY.format(kind=kind), timeout=60, blocking_timeout=30)
+    return lock if lock.acquire() else None
+
+
+def _release(lock):
+    try:
+        lock.release()
+    except Exception:
+        pass  # Expired
+
+
+def take(kind, pk):
+    """
+    Return the buffered values of a document before saving it directly, and
+    clear the buffer once the surrounding transaction commits, so an older
+    buffered copy isn't flushed over that save. A rolled-back save keeps the
+    buffer, and autosaves that land meanwhile are kept for the next flush.
+    """
+    redis = get_redis()
+    locks = []
+    try:
+        for lock in (_lock_document(redis, kind, pk), _lock_flush(redis, kind)):
+            if lock is None:
+                return None
+            locks.append(lock)
+        raw = redis.hgetall(_doc_key(kind, pk))
+    except Exception as e:
+        print(f"Failed to take autosave of {kind} {pk}: {str(e)}")
+        return None
+    finally:
+        for lock in locks:
+            _release(lock)
+    rev = raw[b"rev"].decode() if raw else ""
+    transaction.on_commit(lambda: _clear(kind, pk, rev))
+    return _decode(raw)
+
+
+def _clear(kind, pk, rev):
+    try:
+        get_redis().eval(CLEAR_FLUSHED, 2, _doc_key(kind, pk), _dirty_key(kind), rev, str(pk))
+    except Exception as e:
+        print(f"Failed to clear autosave of {kind} {pk}: {str(e)}")
+
+
+def _flush_batch(redis, kind, write, members):
+    pipe = redis.pipeline()
+    for member in members:
+        pipe.hgetall(_doc_key(kind, member))
+    docs = {}
+    revs = {}
+    for member, raw in zip(members, pipe.execute()):
+        if raw:
+            revs[member] = raw[b"rev"].decode()
+            docs[int(member)] = _decode(raw)
+    if docs:
+        write(docs)
+
+    # Members without a buffer are dropped from the dirty set as well
+    keys = [_doc_key(kind, member) for member in members]
+    redis.eval(
+        CLEAR_FLUSHED,
+        len(keys) + 1,
+        *keys,
+        _dirty_key(kind),
+        *[revs.get(member, "") for member in members],
+        *members,
+    )
+    return len(docs)
+
+
+def flush(kind, write, pks=None):
+    """
+    Write buffered documents of ``kind`` (all dirty ones, or just ``pks``) with
+    ``write({pk: fields})`` and clear their buffers. Returns the documents written.
+    """
+    redis = get_redis()
+    if pks is not None:
+        members = [str(pk) for pk in pks]
+    else:
+        members = dirty(kind)
+
+    written = 0
+    batch_size = settings.AUTOSAVE_FLUSH_BATCH_SIZE
+    for start in range(0, len(members), batch_size):
+        lock = _lock_flush(redis, kind)
+        if lock is None:
+            break  # Another flush is running; the rest stays dirty
+        try:
+            written += _flush_batch(redis, kind, write, members[start:start + batch_size])
+        finally:
+            _release(lock)
+    return written
@@ -0,0 +1,174 @@
+"""
+Two-tier caching: a bounded in-process LRU in front of the shared Redis
+cache (Django's default cache).
+
+Values that never change under their key (e.g. keyed by a content hash) can
+stay in the in-process tier until evicted. Values that are invalidated
+(``delete``) should be given a short ``local_timeout``: a deletion reaches
+Redis and the current process at once, and other processes once their local
+copy expires, so a hot value still costs at most one Redis read per process
+every ``local_timeout`` seconds.
+
+Misses are computed once (single flight): threads of a process wait for the
+one computing the value, and processes wait for the one holding the fill
+lock in Redis, so a miss under load costs one computation instead of one
+per request. Redis being unavailable only costs recomputing the value.
+"""
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+_MISSING = object()
+# How long a process computing a value keeps others waiting, at most
+FILL_LOCK_TIMEOUT = 10
+FILL_WAIT = 3
+FILL_POLL_INTERVAL = 0.02
+FLIGHT_LOCK_STRIPES = 64
+
+
+class LocalLRU:
+    """
+    Thread-safe in-process LRU holding at most ``max_entries`` values, for
+    ``ttl`` seconds each if given
+    """
+
+    def __init__(self, max_entries, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key: (expires at or None, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TwoTierCache:
+    """
+    Values under ``<prefix>:<key>`` kept in Redis for ``timeout`` seconds and
+    in a LocalLRU of ``max_local_entries`` for ``local_timeout`` seconds (or
+    until evicted)
+    """
+
+    def __init__(self, prefix, max_local_entries, timeout, local_timeout=None):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.local = LocalLRU(max_local_entries, ttl=local_timeout)
+        self._flight_locks = [threading.Lock() for _ in range(FLIGHT_LOCK_STRIPES)]
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key):
+        """The cached value, or None"""
+        key = self._key(key)
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        try:
+            value = cache.get(key)
+        except Exception as e:
+            print(f"Failed to read cache key {key}: {str(e)}")
+            return None
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        key = self._key(key)
+        self.local.set(key, value)
+        try:
+            cache.set(key, value, self.timeout)
+        except Exception as e:
+            print(f"Failed to write cache key {key}: {str(e)}")
+
+    def delete_many(self, keys):
+        """Invalidate ``keys`` in Redis and in this process"""
+        keys = [self._key(key) for key in keys]
+        for key in keys:
+            self.local.delete(key)
+        try:
+            cache.delete_many(keys)
+        except Exception as e:
+            print(f"Failed to delete cache keys {keys[:5]}: {str(e)}")
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def get_or_set(self, key, compute):
+        """The cached value, computing and caching it once on a miss"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        full_key = self._key(key)
+        stripe = zlib.crc32(full_key.encode()) % FLIGHT_LOCK_STRIPES
+        with self._flight_locks[stripe]:
+            # A thread holding the lock before may have filled it
+            value = self.local.get(full_key)
+            if value is not None:
+                return value
+            return self._fill(key, compute)
+
+    def _fill(self, key, compute):
+        full_key = self._key(key)
+        lock_key = f"{full_key}:fill"
+        try:
+            leader = cache.add(lock_key, 1, FILL_LOCK_TIMEOUT)
+        except Exception as e:
+            print(f"Failed to take fill lock {lock_key}: {str(e)}")
+            leader = True
+        if not leader:
+            # Another process is computing the value; take its result, or
+            # compute it here if it gives up or takes too long
+            deadline = time.monotonic() + FILL_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(FILL_POLL_INTERVAL)
+                try:
+                    found = cache.get_many([full_key, lock_key])
+                except Exception:
+                    break
+                if full_key in found:
+                    self.local.set(full_key, found[full_key])
+                    return found[full_key]
+                if lock_key not in found:
+                    break
+        try:
+            value = compute()
+            self.set(key, value)
+            return value
+        finally:
+            if leader:
+                try:
+                    cache.delete(lock_key)
+                except Exception as e:
+                    print(f"Failed to release fill lock {lock_key}: {str(e)}")
@@ -0,0 +1,40 @@
+"""
+Google Cloud Tasks helpers shared by the article and page embedding pipelines.
+"""
+import base64
+import json
+
+from django.conf import settings
+from google.cloud import tasks_v2
+
+
+def create_embedding_task(payload):
+    """
+    Queue ``payload`` for the embedding worker (TASK_ENDPOINT_URL) and return
+    the created task's name. Raises on API errors.
+    """
+    client = tasks_v2.CloudTasksClient()
+
+    # Construct the fully qualified queue name
+    parent = client.queue_path(
+        settings.GOOGLE_CLOUD_PROJECT, settings.CLOUD_TASKS_LOCATION, settings.CLOUD_TASKS_QUEUE
+    )
+
+    headers = {
+        'Content-Type': 'application/json',
+        'User-Agent': 'Google-Cloud-Tasks-Embedding',
+    }
+    if getattr(settings, 'CLOUD_TASKS_AUTH_TOKEN', None):
+        headers['Authorization'] = f'Bearer {settings.CLOUD_TASKS_AUTH_TOKEN}'
+
+    # Create the task with base64 encoded body
+    task = {
+        'http_request': {
+            'http_method': tasks_v2.HttpMethod.POST,
+            'url': settings.TASK_ENDPOINT_URL,
+            'headers': headers,
+            'body': base64.b64encode(json.dumps(payload).encode('utf-8')),
+        }
+    }
+    response = client.create_task(request={'parent': parent, 'task': task})
+    return response.name
@@ -0,0 +1,133 @@
+"""
+Sparse integer order keys.
+
+Siblings are numbered ``GAP, 2 * GAP, 3 * GAP, ...`` so an item can be moved
+between two neighbours by giving it the midpoint of their keys, which writes
+only the moved row. When two neighbours end up adjacent (after ~10 inserts in
+the same spot) the sibling list is renumbered once and the move retried. The
+keys stay within a 32-bit integer so they fit PositiveIntegerField and a
+GraphQL Int.
+
+The renumbering helpers take an optional ``extra`` callable returning more
+field values to write on every renumbered row (e.g. a change stamp); it is
+only called when some row actually changes.
+"""
+from django.db import transaction
+from django.db.models import F, Max, Window
+from django.db.models.functions import RowNumber
+
+GAP = 1024
+MAX_KEY = 2 ** 31 - 1
+
+
+def key_between(before, after):
+    """A key strictly between two neighbouring keys (None = open end), or None if there's no room."""
+    low = before if before is not None else 0
+    if after is None:
+        key = low + GAP
+        return key if key <= MAX_KEY else None
+    if after - low < 2:
+        return None
+    return (low + after) // 2
+
+
+def rebalance(siblings, field, extra=None):
+    """Renumber a sibling queryset to GAP, 2 * GAP, ... in its current order. Returns the rows written."""
+    with transaction.atomic():
+        items = list(siblings.select_for_update().order_by(field, "pk").only("pk", field))
+        changed = []
+        for position, item in enumerate(items, start=1):
+            if getattr(item, field) != position * GAP:
+                setattr(item, field, position * GAP)
+                changed.append(item)
+        if not changed:
+            return 0
+        values = extra() if extra else {}
+        for item in changed:
+            for name, value in values.items():
+                setattr(item, name, value)
+        siblings.model.objects.bulk_update(changed, [field, *values], batch_size=1000)
+    return len(changed)
+
+
+def append_key(siblings, field, extra=None):
+    """Key for a new item placed after every sibling."""
+    last = siblings.aggregate(last=Max(field))["last"]
+    key = key_between(last, None)
+    if key is None:
+        rebalance(siblings, field, extra)
+        key = key_between(siblings.aggregate(last=Max(field))["last"], None)
+    return key
+
+
+def _key_after(siblings, field, target_key):
+    following = siblings.filter(**{f"{field}__gt": target_key}) if target_key is not None else siblings
+    next_key = following.order_by(field).values_list(field, flat=True).first()
+    return key_between(target_key, next_key)
+
+
+def _key_before(siblings, field, target_key):
+    previous = (
+        siblings.filter(**{f"{field}__lt": target_key})
+        .order_by(f"-{field}")
+        .values_list(field, flat=True)
+        .first()
+    )
+    return key_between(previous, target_key)
+
+
+def move_key(siblings, field, after_id=None, before_id=None, extra=None):
+    """
+    Key placing an item right after the sibling ``after_id``, right before
+    ``before_id``, or first when neither is given. ``siblings`` must exclude
+    the item being moved. Raises ``siblings.model.DoesNotExist`` for an unknown
+    target.
+    """
+    for _ in range(2):
+        if before_id is not None:
+            target = siblings.values_list(field, flat=True).get(pk=before_id)
+            key = _key_before(siblings, field, target)
+        elif after_id is not None:
+            target = siblings.values_list(field, flat=True).get(pk=after_id)
+            key = _key_after(siblings, field, target)
+        else:
+            key = _key_after(siblings, field, None)
+        if key is not None:
+            return key
+        # Neighbours are adjacent: make room once and try again
+        rebalance(siblings, field, extra)
+    raise RuntimeError("Could not find room for the order key after rebalancing")
+
+
+def rebalance_all(queryset, field, partition_by, batch_size=1000, extra=None):
+    """
+    Renumber every sibling group of ``queryset`` (grouped by ``partition_by``
+    fields) in one pass, writing only rows whose key changes. Returns the rows
+    written.
+    """
+    ranked = queryset.annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F(name) for name in partition_by],
+            order_by=[F(field).asc(), F("pk").asc()],
+        )
+    ).values_list("pk", field, "position")
+
+    model = queryset.model
+    written = 0
+    batch = []
+    values = None
+    with transaction.atomic():
+        for pk, key, position in ranked.iterator(chunk_size=batch_size):
+            if key != position * GAP:
+                if values is None:
+                    values = extra() if extra else {}
+                batch.append(model(pk=pk, **{field: position * GAP}, **values))
+            if len(batch) >= batch_size:
+                model.objects.bulk_update(batch, [field, *values])
+                written += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, [field, *values])
+            written += len(batch)
+    return written
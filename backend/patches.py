@@ -0,0 +1,145 @@
+"""
+Patch-based content updates.
+
+Editors that autosave every few seconds send only what changed since the
+content they last saw, identified by its ``content_hash``. A patch is either
+a list of text operations or a unified diff:
+
+* text ops walk the base text from the start: ``{"retain": n}`` keeps the
+  next n characters, ``{"insert": "..."}`` inserts text and ``{"delete": n}``
+  removes the next n characters; whatever follows the last op is kept.
+  Lengths count Unicode code points (Python string indices).
+* a unified diff (``diff -u`` / ``git diff`` hunks) is applied strictly: the
+  context and removed lines must match the base exactly.
+
+The patch is rejected with ``PatchConflict`` when the base hash doesn't match
+the stored content, and the client resends against the current content (or
+falls back to sending the full content).
+"""
+import hashlib
+import re
+
+
+class PatchError(ValueError):
+    pass
+
+
+class PatchConflict(PatchError):
+    def __init__(self, current_hash):
+        super().__init__("Content has changed since the base revision")
+        self.current_hash = current_hash
+
+
+def content_hash(text):
+    """SHA-256 hex digest identifying a revision of some content"""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def apply_ops(text, ops):
+    """Apply retain/insert/delete operations to ``text``"""
+    parts = []
+    position = 0
+    for op in ops:
+        if len(op) != 1:
+            raise PatchError("Each operation must have exactly one of retain, insert or delete")
+        (kind, value), = op.items()
+        if kind == "insert":
+            if not isinstance(value, str):
+                raise PatchError("insert takes a string")
+            parts.append(value)
+            continue
+        if kind not in ("retain", "delete"):
+            raise PatchError(f"Unknown operation '{kind}'")
+        if not isinstance(value, int) or value < 0:
+            raise PatchError(f"{kind} takes a non-negative count")
+        if position + value > len(text):
+            raise PatchError(f"{kind} {value} runs past the end of the content")
+        if kind == "retain":
+            parts.append(text[position:position + value])
+        position += value
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+# Lines with their "\n"; unlike str.splitlines() this doesn't split on \r,
+# form feeds or Unicode line separators, matching diff tools
+LINE = re.compile(r"[^\n]*\n|[^\n]+")
+
+
+def apply_unified_diff(text, diff):
+    """Apply the hunks of a unified diff to ``text``"""
+    source = LINE.findall(text)
+    lines = LINE.findall(diff)
+    result = []
+    position = 0  # Next source line to copy
+    i = 0
+    hunks = 0
+    while i < len(lines):
+        match = HUNK_HEADER.match(lines[i])
+        if not match:
+            # File headers (---/+++, diff --git, index ...) and anything between hunks
+            i += 1
+            continue
+        hunks += 1
+        start = int(match.group(1))
+        old_count = int(match.group(2)) if match.group(2) is not None else 1
+        # A hunk removing from an empty range starts after the given line
+        start = start - 1 if old_count else start
+        if start < position or start > len(source):
+            raise PatchError(f"Hunk {hunks} is out of order or past the end of the content")
+        result.extend(source[position:start])
+        position = start
+        previous = None  # Marker of the previous line in the hunk
+        i += 1
+
+        while i < len(lines) and not lines[i].startswith("@@"):
+            line = lines[i]
+            marker, body = line[:1], line[1:]
+            if marker == "\\":
+                # "\ No newline at end of file" applies to the previous line
+                if previous in ("+", " "):
+                    result[-1] = result[-1].rstrip("\n")
+                i += 1
+                continue
+            if marker in (" ", "-"):
+                expected = source[position] if position < len(source) else None
+                if expected is None or expected.rstrip("\n") != body.rstrip("\n"):
+                    raise PatchError(f"Hunk {hunks} does not match the content at line {position + 1}")
+                if marker == " ":
+                    result.append(expected)
+                position += 1
+            elif marker == "+":
+                result.append(body if body.endswith("\n") else body + "\n")
+            elif line.strip() == "":
+                # Some tools strip the trailing space of empty context lines
+                expected = source[position] if position < len(source) else None
+                if expected is None or expected != "\n":
+                    raise PatchError(f"Hunk {hunks} does not match the content at line {position + 1}")
+                result.append(expected)
+                position += 1
+            else:
+                break
+            previous = marker if marker in ("+", "-") else " "
+            i += 1
+
+    if not hunks:
+        raise PatchError("The diff has no hunks")
+    result.extend(source[position:])
+    return "".join(result)
+
+
+def apply_patch(text, base_hash, ops=None, unified_diff=None):
+    """
+    Apply text ops or a unified diff to ``text`` if it is the revision the
+    patch was made against. Returns the new text; raises PatchConflict on a
+    base mismatch and PatchError on a malformed patch.
+    """
+    text = text or ""
+    if content_hash(text) != base_hash:
+        raise PatchConflict(content_hash(text))
+    if (ops is None) == (unified_diff is None):
+        raise PatchError("Provide either ops or a unified diff")
+    if ops is not None:
+        return apply_ops(text, ops)
+    return apply_unified_diff(text, unified_diff)
@@ -0,0 +1,151 @@
+"""
+Reading metadata of Markdown content: the heading outline (table of
+contents), word count and estimated reading time.
+
+The outline comes from the same Python-Markdown parse that renders the
+content (see backend.rendering), which gives every heading the anchor listed
+for it, so the two never disagree about what is a heading.
+
+Models inheriting ReadingMetadata store these in columns, recomputed only
+when their content is written, so readers get them without anyone parsing
+the Markdown on every view. Existing rows are filled in by the
+backfill_page_metadata and backfill_article_metadata commands.
+"""
+import html
+import math
+import re
+import threading
+
+import markdown
+from django.conf import settings
+from django.db import models
+from django.utils.text import slugify
+from markdown.extensions import Extension
+from markdown.extensions.toc import render_inner_html, strip_tags
+from markdown.treeprocessors import Treeprocessor
+
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables", "sane_lists"]
+HEADINGS = {f"h{level}" for level in range(1, 7)}
+# Links and images count by their text, not their URL
+INLINE_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+WIKI_LINK = re.compile(r"\[\[([^\[\]|\n]+)(?:\|([^\[\]\n]*))?\]\]")
+EMPHASIS = re.compile(r"[*_`~]+")
+WORD = re.compile(r"\w+(?:['’.-]\w+)*")
+MAX_TOC_ENTRIES = 200
+
+_parsers = threading.local()
+
+
+def plain_text(text):
+    """Markdown inline text without link targets and emphasis markers"""
+    text = WIKI_LINK.sub(lambda match: match.group(2) or match.group(1), text)
+    text = INLINE_LINK.sub(r"\1", text)
+    return EMPHASIS.sub("", text).strip()
+
+
+def heading_anchor(text, taken):
+    """Anchor of a heading, made unique with the ``taken`` counts ({anchor: uses}), which it updates"""
+    base = slugify(text, allow_unicode=True) or "section"
+    count = taken.get(base, 0)
+    taken[base] = count + 1
+    return f"{base}-{count}" if count else base
+
+
+class _HeadingAnchors(Treeprocessor):
+    # Gives the headings unique anchors in document order and collects the
+    # top-level ones (not those in blockquotes or lists) as the outline.
+    # Runs after the inline patterns (priority 20), taking the text from the
+    # rendered heading, whose raw text still holds placeholders for entities
+    # and inline HTML
+    def run(self, root):
+        toc = []
+        taken = {}
+        top_level = set(map(id, root))
+        for element in root.iter():
+            if element.tag not in HEADINGS:
+                continue
+            text = plain_text(html.unescape(strip_tags(render_inner_html(element, self.md))))
+            if not text:
+                continue
+            anchor = heading_anchor(text, taken)
+            element.set("id", anchor)
+            if id(element) in top_level and len(toc) < MAX_TOC_ENTRIES:
+                toc.append({"level": int(element.tag[1]), "text": text, "anchor": anchor})
+        self.md.heading_toc = toc
+
+
+class _HeadingAnchorsExtension(Extension):
+    def extendMarkdown(self, md):
+        md.treeprocessors.register(_HeadingAnchors(md), "heading_anchors", 5)
+
+
+def convert(content):
+    """
+    ``(html, toc)`` of Markdown ``content``: unsanitized HTML whose headings
+    carry the anchors of the table of contents ``[{level, text, anchor}]``
+    """
+    # Markdown instances aren't thread-safe, but can be reset and reused
+    parser = getattr(_parsers, "markdown", None)
+    if parser is None:
+        parser = markdown.Markdown(extensions=[*MARKDOWN_EXTENSIONS, _HeadingAnchorsExtension()])
+        _parsers.markdown = parser
+    parser.reset()
+    parser.heading_toc = []
+    return parser.convert(content or ""), parser.heading_toc
+
+
+def table_of_contents(content):
+    """``[{level, text, anchor}]`` of the top-level headings in ``content``, with unique anchors"""
+    if not content:
+        return []
+    return convert(content)[1]
+
+
+def word_count(content):
+    return len(WORD.findall(plain_text(content or "")))
+
+
+def reading_time(words):
+    """Estimated minutes to read ``words`` words (at least one for any text)"""
+    return math.ceil(words / settings.READING_WORDS_PER_MINUTE) if words else 0
+
+
+class ReadingMetadata(models.Model):
+    """
+    Base for a model with Markdown ``content`` whose outline, word count and
+    reading time are stored; saves call ``update_reading_metadata`` when the
+    content changes.
+    """
+    toc = models.JSONField(default=list, blank=True)  # [{level, text, anchor}]
+    word_count = models.PositiveIntegerField(default=0)
+    reading_time = models.PositiveIntegerField(default=0)  # Minutes
+
+    READING_FIELDS = ('toc', 'word_count', 'reading_time')
+
+    class Meta:
+        abstract = True
+
+    def update_reading_metadata(self):
+        self.toc = table_of_contents(self.content)
+        self.word_count = word_count(self.content)
+        self.reading_time = reading_time(self.word_count)
+
+
+def backfill(queryset, batch_size=500):
+    """
+    Recompute the reading metadata of every row of ``queryset``, streaming
+    the content over a server-side cursor and writing it in batches.
+    Returns the rows updated.
+    """
+    model = queryset.model
+    updated = 0
+    batch = []
+    for row in queryset.only('pk', 'content').order_by('pk').iterator(chunk_size=batch_size):
+        row.update_reading_metadata()
+        batch.append(row)
+        if len(batch) >= batch_size:
+            updated += model.objects.bulk_update(batch, model.READING_FIELDS)
+            batch = []
+    if batch:
+        updated += model.objects.bulk_update(batch, model.READING_FIELDS)
+    return updated
@@ -0,0 +1,59 @@
+"""
+Server-side Markdown rendering.
+
+``render_html`` turns Markdown into sanitized HTML whose headings carry the
+anchors of the stored table of contents, both taken from one parse (see
+backend.reading.convert). Results are cached by content hash and renderer
+version in the two-tier cache (see backend.cache), so a hot document is
+parsed once and then served from process memory, and articles are rendered
+when published rather than on their first read.
+"""
+from importlib.metadata import version
+
+import markdown
+import nh3
+from django.conf import settings
+
+from backend.cache import TwoTierCache
+from backend.patches import content_hash
+from backend.reading import HEADINGS, convert
+
+# Bump whenever the same Markdown should render differently; library
+# upgrades change the version by themselves
+RENDERER_VERSION = f"3-{markdown.__version__}-{version('nh3')}"
+ALLOWED_ATTRIBUTES = {
+    **nh3.ALLOWED_ATTRIBUTES,
+    **{tag: {"id"} for tag in HEADINGS},
+    "code": {"class"},  # Fenced code language, e.g. language-python
+}
+
+_cache = TwoTierCache(
+    "markdown:html", settings.MARKDOWN_RENDER_LOCAL_ENTRIES, settings.MARKDOWN_RENDER_CACHE_TIMEOUT
+)
+
+
+def _keep_attribute(element, attribute, value):
+    if attribute == "class" and not value.startswith("language-"):
+        return None
+    return value
+
+
+def render_markdown(text):
+    """Sanitized HTML of Markdown ``text``, rendered now"""
+    rendered, _ = convert(text)
+    return nh3.clean(rendered, attributes=ALLOWED_ATTRIBUTES, attribute_filter=_keep_attribute)
+
+
+def render_html(text):
+    """Sanitized HTML of Markdown ``text``, from the cache when it was rendered before"""
+    if not text:
+        return ""
+    return _cache.get_or_set(f"{RENDERER_VERSION}:{content_hash(text)}", lambda: render_markdown(text))
+
+
+def prerender(text):
+    """Render ``text`` into the cache ahead of its first read"""
+    try:
+        render_html(text)
+    except Exception as e:
+        print(f"Failed to prerender content: {str(e)}")
@@ -0,0 +1,142 @@
+"""
+Stale-while-revalidate caching of GraphQL resolvers.
+
+``cached_field`` caches what a resolver returns for ``ttl`` seconds. For
+``stale`` more seconds the old value is still served while a background
+thread recomputes it, so a field that tolerates some staleness is only
+computed on the request path when nothing is cached at all, and then once
+(see backend.cache). Only one process refreshes a value at a time.
+
+Values are keyed by the field, the object it is resolved on, its arguments
+and, for ``scope=VIEWER``, the requesting user. Resolvers returning model
+instances whose deferred columns depend on the selection (see
+backend.selection) pass their ``heavy_fields`` so each selection gets its
+own entry. Querysets are evaluated before they are cached, and each request gets its
+own copies of cached model instances.
+"""
+import copy
+import functools
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Model, QuerySet
+from strawberry.types import Info
+
+from backend.cache import TwoTierCache
+from backend.selection import unselected
+
+PUBLIC = "public"
+VIEWER = "viewer"
+# A refresh taking longer than this may be started again by another process
+REFRESH_LOCK_TIMEOUT = 30
+
+_executor = None
+_executor_lock = threading.Lock()
+_refreshing = set()  # Keys this process is refreshing
+_refreshing_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RESOLVER_CACHE_REFRESH_WORKERS, thread_name_prefix="resolver-cache"
+            )
+    return _executor
+
+
+def _cache_key(root, args, kwargs, scope, heavy_fields):
+    info = next((value for value in (*args, *kwargs.values()) if isinstance(value, Info)), None)
+    parts = [repr(getattr(root, "pk", None))]
+    parts.extend(repr(value) for value in args if not isinstance(value, Info))
+    parts.extend(f"{name}={value!r}" for name, value in sorted(kwargs.items()) if not isinstance(value, Info))
+    if scope == VIEWER:
+        user = info.context.request.user
+        parts.append(f"user={user.pk if user.is_authenticated else ''}")
+    if heavy_fields:
+        parts.append(f"defer={sorted(unselected(info, heavy_fields))}")
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def _refresh(store, key, compute, lock_key):
+    close_old_connections()
+    try:
+        store.set(key, compute())
+    except Exception as e:
+        print(f"Failed to refresh {lock_key}: {str(e)}")
+    finally:
+        close_old_connections()
+        with _refreshing_lock:
+            _refreshing.discard(lock_key)
+        try:
+            cache.delete(lock_key)
+        except Exception:
+            pass
+
+
+def _refresh_later(store, key, compute):
+    lock_key = f"{store.prefix}:{key}:refresh"
+    with _refreshing_lock:
+        if lock_key in _refreshing:
+            return
+        _refreshing.add(lock_key)
+    try:
+        claimed = cache.add(lock_key, 1, REFRESH_LOCK_TIMEOUT)
+    except Exception as e:
+        print(f"Failed to take refresh lock {lock_key}: {str(e)}")
+        claimed = False
+    if not claimed:
+        with _refreshing_lock:
+            _refreshing.discard(lock_key)
+        return
+    _get_executor().submit(_refresh, store, key, compute, lock_key)
+
+
+def _private_copy(value):
+    # Cached instances are shared by every request of the process, and
+    # resolvers write to them (e.g. the related objects they load)
+    if isinstance(value, Model):
+        return copy.copy(value)
+    if isinstance(value, list):
+        return [copy.copy(item) if isinstance(item, Model) else item for item in value]
+    return value
+
+
+def cached_field(ttl, stale=0, scope=PUBLIC, heavy_fields=None):
+    """
+    Decorate a resolver (below ``@strawberry.field``) to serve its result
+    from the cache for ``ttl`` seconds, and stale for ``stale`` more seconds
+    while it is refreshed in the background
+    """
+
+    def decorator(resolver):
+        store = TwoTierCache(
+            f"resolver:{resolver.__module__}.{resolver.__qualname__}",
+            settings.RESOLVER_CACHE_LOCAL_ENTRIES,
+            ttl + stale,
+            local_timeout=ttl,
+        )
+
+        @functools.wraps(resolver)
+        def wrapper(root, *args, **kwargs):
+            def compute():
+                value = resolver(root, *args, **kwargs)
+                if isinstance(value, QuerySet):
+                    value = list(value)
+                return time.time() + ttl, value
+
+            key = _cache_key(root, args, kwargs, scope, heavy_fields)
+            fresh_until, value = store.get_or_set(key, compute)
+            if fresh_until <= time.time():
+                _refresh_later(store, key, compute)
+            return _private_copy(value)
+
+        return wrapper
+
+    return decorator
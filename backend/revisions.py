@@ -0,0 +1,288 @@
+"""
+Compressed revision history.
+
+Each revision of a document's content is stored either as a keyframe (the
+zlib-compressed full text) or as a delta (zlib-compressed retain/insert/
+delete ops, see backend.patches) against the previous revision. A keyframe
+is written every REVISION_KEYFRAME_INTERVAL revisions, or sooner when a
+delta wouldn't be much smaller, so rebuilding any revision applies at most
+that many deltas to one keyframe. Listing revisions reads only their small
+metadata columns.
+
+``thin`` keeps every revision of the last day, then one per hour for a week,
+one per day for three months and one per week after that, re-encoding the
+revisions whose predecessor was removed, so storage grows roughly with the
+logarithm of a document's age rather than with its number of edits.
+"""
+import difflib
+import json
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from backend.patches import apply_ops, content_hash
+
+COMPRESSION_LEVEL = 6
+
+
+class Revision(models.Model):
+    """
+    Base for a concrete revision model, which adds a ForeignKey to the
+    revised document and names it in ``owner_field``.
+    """
+    number = models.PositiveIntegerField()
+    is_keyframe = models.BooleanField(default=False)
+    data = models.BinaryField()
+    size = models.PositiveIntegerField(default=0)  # Characters of the full text
+    content_hash = models.CharField(max_length=64)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    owner_field = None
+
+    class Meta:
+        abstract = True
+        ordering = ['number']
+
+    # Columns needed to list revisions without their data
+    LIST_FIELDS = ('id', 'number', 'is_keyframe', 'size', 'content_hash', 'created_at')
+
+
+def _compress(value):
+    return zlib.compress(value.encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def _decompress(data):
+    return zlib.decompress(bytes(data)).decode("utf-8")
+
+
+def diff_ops(base, target):
+    """retain/insert/delete ops turning ``base`` into ``target`` (line-level matching)"""
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        removed = sum(len(line) for line in base_lines[i1:i2])
+        if tag == "equal":
+            if ops and "retain" in ops[-1]:
+                ops[-1]["retain"] += removed
+            else:
+                ops.append({"retain": removed})
+            continue
+        if removed:
+            ops.append({"delete": removed})
+        inserted = "".join(target_lines[j1:j2])
+        if inserted:
+            ops.append({"insert": inserted})
+    # A trailing retain is implied
+    if ops and "retain" in ops[-1]:
+        ops.pop()
+    return ops
+
+
+def _encode(previous_text, text, position):
+    """``(is_keyframe, data)`` for a revision at ``position`` since the last keyframe"""
+    keyframe = _compress(text)
+    if previous_text is None or position >= settings.REVISION_KEYFRAME_INTERVAL:
+        return True, keyframe
+    delta = zlib.compress(
+        json.dumps(diff_ops(previous_text, text), separators=(",", ":")).encode("utf-8"),
+        COMPRESSION_LEVEL,
+    )
+    # Deltas that save little aren't worth lengthening the chain for
+    if len(delta) * 2 > len(keyframe):
+        return True, keyframe
+    return False, delta
+
+
+def _decode(revision, previous_text):
+    if revision.is_keyframe:
+        return _decompress(revision.data)
+    return apply_ops(previous_text, json.loads(_decompress(revision.data)))
+
+
+def _owner_filter(model, owner_id):
+    return {f"{model.owner_field}_id": owner_id}
+
+
+def _chain(model, owner_id, number):
+    # The revisions from the last keyframe at or before ``number`` up to it
+    revisions = model.objects.filter(**_owner_filter(model, owner_id), number__lte=number)
+    start = revisions.filter(is_keyframe=True).aggregate(start=Max('number'))['start']
+    if start is None:
+        return []
+    return list(revisions.filter(number__gte=start).order_by('number'))
+
+
+def reconstruct(model, owner_id, number):
+    """Full text of a revision, or None if it doesn't exist"""
+    text = None
+    chain = _chain(model, owner_id, number)
+    if not chain or chain[-1].number != number:
+        return None
+    for revision in chain:
+        text = _decode(revision, text)
+    return text
+
+
+def record(model, owner_id, text):
+    """
+    Store ``text`` as the next revision of a document unless it is the
+    latest one already. Returns the new revision or None.
+    """
+    text = text or ""
+    digest = content_hash(text)
+    latest = model.objects.filter(**_owner_filter(model, owner_id)).order_by('-number').only(
+        'number', 'content_hash'
+    ).first()
+    if latest is not None and latest.content_hash == digest:
+        return None
+
+    previous_text = None
+    chain = _chain(model, owner_id, latest.number) if latest else []
+    for revision in chain:
+        previous_text = _decode(revision, previous_text)
+    is_keyframe, data = _encode(previous_text, text, len(chain))
+    try:
+        # A concurrent writer taking the same number only costs this revision
+        with transaction.atomic():
+            return model.objects.create(
+                **_owner_filter(model, owner_id),
+                number=latest.number + 1 if latest else 1,
+                is_keyframe=is_keyframe,
+                data=data,
+                size=len(text),
+                content_hash=digest,
+            )
+    except IntegrityError:
+        return None
+
+
+def record_many(model, texts):
+    """``record`` for several documents ({owner id: text})"""
+    return [revision for owner_id, text in texts.items() if (revision := record(model, owner_id, text))]
+
+
+def record_initial(model, texts):
+    """
+    First revisions of newly created documents ({owner id: text}) in one
+    batched insert, for bulk creation paths that bypass ``record``
+    """
+    revisions = [
+        model(
+            **_owner_filter(model, owner_id),
+            number=1,
+            is_keyframe=True,
+            data=_compress(text),
+            size=len(text),
+            content_hash=content_hash(text),
+        )
+        for owner_id, text in texts.items()
+        if text
+    ]
+    return model.objects.bulk_create(revisions, batch_size=500)
+
+
+def _metadata(model, owner_id):
+    return model.objects.filter(**_owner_filter(model, owner_id)).only(*model.LIST_FIELDS, model.owner_field)
+
+
+def list_revisions(model, owner_id, first=50, before=None):
+    """Revision metadata, newest first, without the stored data"""
+    revisions = _metadata(model, owner_id)
+    if before is not None:
+        revisions = revisions.filter(number__lt=before)
+    return list(revisions.order_by('-number')[:first])
+
+
+def get_revision(model, owner_id, number):
+    """Metadata of one revision, or None"""
+    return _metadata(model, owner_id).filter(number=number).first()
+
+
+def _bucket(created_at, now):
+    # Revisions sharing a bucket are thinned down to the newest one
+    age = now - created_at
+    if age <= timedelta(days=1):
+        return None  # Kept
+    if age <= timedelta(days=7):
+        return created_at.replace(minute=0, second=0, microsecond=0)
+    if age <= timedelta(days=90):
+        return created_at.date()
+    return tuple(created_at.isocalendar()[:2])
+
+
+def thin_document(model, owner_id, now=None):
+    """Apply the retention policy to one document's revisions. Returns the revisions deleted."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        revisions = list(
+            model.objects.select_for_update().filter(**_owner_filter(model, owner_id)).order_by('number')
+        )
+        newest = {}
+        for revision in revisions:
+            bucket = _bucket(revision.created_at, now)
+            if bucket is not None:
+                newest[bucket] = revision.number
+        keep = {revision.number for revision in revisions if _bucket(revision.created_at, now) is None}
+        keep.update(newest.values())
+        if revisions:
+            keep.add(revisions[-1].number)
+        if len(keep) == len(revisions):
+            return 0
+
+        # Rebuild every text, re-encoding kept revisions whose predecessor goes
+        text = None
+        previous_text = None  # Text of the previous kept revision
+        position = 0  # Deltas since the last keyframe among kept revisions
+        predecessor_removed = False
+        changed = []
+        removed = []
+        for revision in revisions:
+            text = _decode(revision, text)
+            if revision.number not in keep:
+                removed.append(revision.pk)
+                predecessor_removed = True
+                continue
+            if predecessor_removed and not revision.is_keyframe:
+                revision.is_keyframe, revision.data = _encode(previous_text, text, position + 1)
+                changed.append(revision)
+            position = 0 if revision.is_keyframe else position + 1
+            previous_text = text
+            predecessor_removed = False
+
+        model.objects.filter(pk__in=removed).delete()
+        model.objects.bulk_update(changed, ['is_keyframe', 'data'], batch_size=100)
+    return len(removed)
+
+
+def thin(model, batch_size=500):
+    """Thin the revisions of documents with more than one revision in a retention bucket"""
+    now = timezone.now()
+    table = model._meta.db_table
+    owner_column = model._meta.get_field(model.owner_field).column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT DISTINCT "{owner_column}" FROM (
+                SELECT "{owner_column}",
+                    CASE
+                        WHEN "created_at" > %(now)s - INTERVAL '7 days' THEN date_trunc('hour', "created_at")
+                        WHEN "created_at" > %(now)s - INTERVAL '90 days' THEN date_trunc('day', "created_at")
+                        ELSE date_trunc('week', "created_at")
+                    END AS bucket
+                FROM "{table}"
+                WHERE "created_at" < %(now)s - INTERVAL '1 day'
+                GROUP BY 1, 2
+                HAVING COUNT(*) > 1
+            ) crowded
+            LIMIT %(limit)s
+            """,
+            {"now": now, "limit": batch_size},
+        )
+        owner_ids = [row[0] for row in cursor.fetchall()]
+    return sum(thin_document(model, owner_id, now) for owner_id in owner_ids)
@@ -0,0 +1,40 @@
+"""
+Selection-set aware column loading for GraphQL list resolvers.
+
+List resolvers return querysets that would otherwise ``SELECT *``. With
+``defer_unselected`` they skip heavy columns (page and article content,
+article embeddings) unless a field in the client's selection needs them.
+"""
+from strawberry.types.nodes import SelectedField
+
+
+def _fields(selections):
+    # Flatten fragment spreads and inline fragments
+    for selection in selections:
+        if isinstance(selection, SelectedField):
+            yield selection
+        else:
+            yield from _fields(selection.selections)
+
+
+def selected_names(info, path=()):
+    """
+    GraphQL names of the fields selected on the current field's result, or on
+    the nested field reached by following ``path`` (e.g. ``("articles",)``).
+    """
+    current = [sub for field in _fields(info.selected_fields) for sub in _fields(field.selections)]
+    for name in path:
+        current = [sub for field in current if field.name == name for sub in _fields(field.selections)]
+    return {field.name for field in current}
+
+
+def unselected(info, heavy_fields, path=()):
+    """Model fields of ``heavy_fields`` ({model field: GraphQL fields that need it}) nobody selected."""
+    names = selected_names(info, path)
+    return [field for field, needed_by in heavy_fields.items() if not names.intersection(needed_by)]
+
+
+def defer_unselected(queryset, info, heavy_fields, path=()):
+    """Defer the heavy columns the selection set doesn't need."""
+    deferred = unselected(info, heavy_fields, path)
+    return queryset.defer(*deferred) if deferred else queryset
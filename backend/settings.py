@@ -61,10 +61,145 @@ GOOGLE_OAUTH2_CLIENT_SECRET = os.getenv("GOOGLE_OAUTH2_CLIENT_SECRET")
 #     "http://127.0.0.1:9000"
 # ]
 
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "backend",
+    }
+}
+
 # ---------------------CELERY Configuration-------------------------------
 CELERY_BROKER_URL = "redis://localhost:6379/0"
+# Periodic jobs, run with `celery -A backend beat`
+# Buffered autosaves of pages and drafts are written at most this often (see backend.autosave)
+AUTOSAVE_FLUSH_INTERVAL = int(os.getenv("AUTOSAVE_FLUSH_INTERVAL", "10"))
+AUTOSAVE_FLUSH_BATCH_SIZE = 500
+
+CELERY_BEAT_SCHEDULE = {
+    "update-trending-scores": {
+        "task": "articles.tasks.update_trending_scores",
+        "schedule": 15 * 60,
+    },
+    "flush-analytics-events": {
+        "task": "articles.tasks.flush_analytics_events",
+        "schedule": 60,
+    },
+    "maintain-analytics-partitions": {
+        "task": "articles.tasks.maintain_analytics_partitions",
+        "schedule": 24 * 60 * 60,
+    },
+    "flush-page-autosaves": {
+        "task": "notebook.tasks.flush_page_autosaves",
+        "schedule": AUTOSAVE_FLUSH_INTERVAL,
+    },
+    "flush-draft-autosaves": {
+        "task": "articles.tasks.flush_draft_autosaves",
+        "schedule": AUTOSAVE_FLUSH_INTERVAL,
+    },
+    "prune-page-tombstones": {
+        "task": "notebook.tasks.prune_page_tombstones",
+        "schedule": 24 * 60 * 60,
+    },
+    "request-page-embeddings": {
+        "task": "notebook.tasks.request_page_embeddings",
+        "schedule": 60,
+    },
+    "prune-notebook-exports": {
+        "task": "notebook.tasks.prune_notebook_exports",
+        "schedule": 24 * 60 * 60,
+    },
+    "thin-page-revisions": {
+        "task": "notebook.tasks.thin_page_revisions",
+        "schedule": 24 * 60 * 60,
+    },
+    "thin-draft-revisions": {
+        "task": "articles.tasks.thin_draft_revisions",
+        "schedule": 24 * 60 * 60,
+    },
+}
 # ------------------End of CELERY Configuration--------------------------
 
+# ---------------------Home feed Configuration----------------------------
+# Authors with more followers than this are merged into home feeds at read
+# time instead of being fanned out to every follower when they publish.
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv("FEED_FANOUT_MAX_FOLLOWERS", "10000"))
+FEED_FANOUT_BATCH_SIZE = 1000
+# Recent articles copied into a user's feed when they follow someone
+FEED_BACKFILL_ARTICLES = 20
+# ------------------End of Home feed Configuration------------------------
+
+# ---------------------Analytics Configuration----------------------------
+# Events are buffered in Redis and rolled up by the flush-analytics-events job
+ANALYTICS_FLUSH_BATCH_SIZE = 5000
+# Monthly partitions of the hourly rollup older than this are dropped
+ANALYTICS_HOURLY_RETENTION_MONTHS = 3
+# ------------------End of Analytics Configuration------------------------
+
+# ---------------------Notebook Configuration-----------------------------
+# Cached outlines are keyed by Notebook.outline_version, so this only bounds
+# how long stale versions linger in Redis.
+NOTEBOOK_OUTLINE_CACHE_TIMEOUT = 24 * 60 * 60
+# Deleted pages are reported to syncing clients for this long; clients that
+# haven't synced since then must sync from scratch
+NOTEBOOK_TOMBSTONE_RETENTION_DAYS = int(os.getenv("NOTEBOOK_TOMBSTONE_RETENTION_DAYS", "30"))
+# Background exports (and their archives) are deleted after this long
+NOTEBOOK_EXPORT_RETENTION_DAYS = 7
+# Limits of a single Markdown import (see notebook.importer)
+NOTEBOOK_IMPORT_MAX_PAGES = 10000
+NOTEBOOK_IMPORT_MAX_BYTES = 100 * 1024 * 1024
+# Edited pages are re-embedded once they've been left alone this long, or
+# at the latest PAGE_EMBEDDING_MAX_DELAY seconds after the first edit
+PAGE_EMBEDDING_DEBOUNCE = int(os.getenv("PAGE_EMBEDDING_DEBOUNCE", "120"))
+PAGE_EMBEDDING_MAX_DELAY = 15 * 60
+PAGE_EMBEDDING_BATCH_SIZE = 32  # Pages per embedding task
+PAGE_EMBEDDING_MAX_PAGES = 1024  # Pages requested per run
+PAGE_EMBEDDING_MAX_CHARS = 8000  # Text sent per page
+# Candidates the HNSW index returns before the notebook filter is applied
+PAGE_EMBEDDING_EF_SEARCH = 200
+# Embeds search queries synchronously: POST {"text"} -> {"embedding"}
+EMBEDDING_QUERY_URL = os.getenv("EMBEDDING_QUERY_URL")
+SEMANTIC_SEARCH_RATE_LIMIT = 30  # Query embeddings per user per minute
+# If set, the embedding worker must send it as a Bearer token with results
+EMBEDDING_CALLBACK_TOKEN = os.getenv("EMBEDDING_CALLBACK_TOKEN")
+# ------------------End of Notebook Configuration-------------------------
+
+# ---------------------Revisions Configuration----------------------------
+# Page and draft revisions are stored as deltas with a full keyframe at least
+# this often, bounding the deltas applied to rebuild one (see backend.revisions)
+REVISION_KEYFRAME_INTERVAL = 20
+# ------------------End of Revisions Configuration------------------------
+
+# ------------------Reading Metadata Configuration------------------------
+# Reading speed behind the readingTime of pages and articles (see backend.reading)
+READING_WORDS_PER_MINUTE = 230
+# ---------------End of Reading Metadata Configuration--------------------
+
+# ---------------------Render Cache Configuration-------------------------
+# Rendered Markdown (contentHtml) is kept in Redis this long and in an
+# in-process LRU of this many documents (see backend.rendering)
+MARKDOWN_RENDER_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+MARKDOWN_RENDER_LOCAL_ENTRIES = 256
+# ------------------End of Render Cache Configuration---------------------
+
+# ---------------------Article Cache Configuration------------------------
+# Articles read by the article query are cached in Redis this long, and in
+# each process (up to ARTICLE_CACHE_LOCAL_ENTRIES of them) this long, which
+# bounds how stale another process's copy can be (see articles.cache)
+ARTICLE_CACHE_TIMEOUT = 60 * 10
+ARTICLE_CACHE_LOCAL_TIMEOUT = 5
+ARTICLE_CACHE_LOCAL_ENTRIES = 512
+# ------------------End of Article Cache Configuration--------------------
+
+# ---------------------Resolver Cache Configuration-----------------------
+# Threads per process refreshing stale cached resolver results, and results
+# each process keeps in memory (see backend.resolver_cache)
+RESOLVER_CACHE_REFRESH_WORKERS = 4
+RESOLVER_CACHE_LOCAL_ENTRIES = 1024
+# ------------------End of Resolver Cache Configuration-------------------
+
 ALLOWED_HOSTS = ["*"]
 
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
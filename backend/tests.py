@@ -0,0 +1,192 @@
+from django.test import SimpleTestCase, override_settings
+
+from backend import ordering
+from backend.patches import (
+    PatchConflict,
+    PatchError,
+    apply_ops,
+    apply_patch,
+    apply_unified_diff,
+    content_hash,
+)
+from backend.reading import heading_anchor, plain_text, reading_time, table_of_contents, word_count
+from backend.rendering import render_markdown
+from backend.revisions import _decode, _encode, diff_ops
+
+
+class ApplyOpsTests(SimpleTestCase):
+    def test_retain_insert_delete(self):
+        self.assertEqual(apply_ops("hello world", [{"retain": 6}, {"delete": 5}, {"insert": "there"}]), "hello there")
+
+    def test_text_after_the_last_op_is_kept(self):
+        self.assertEqual(apply_ops("abc", [{"insert": ">"}]), ">abc")
+
+    def test_counts_code_points(self):
+        self.assertEqual(apply_ops("héllo ☃!", [{"retain": 6}, {"delete": 1}, {"insert": "☀"}]), "héllo ☀!")
+
+    def test_rejects_malformed_ops(self):
+        for ops in (
+            [{"retain": 1, "insert": "x"}],
+            [{"move": 1}],
+            [{"retain": -1}],
+            [{"delete": "1"}],
+            [{"insert": 1}],
+            [{"retain": 4}],
+        ):
+            with self.subTest(ops=ops), self.assertRaises(PatchError):
+                apply_ops("abc", ops)
+
+
+class ApplyUnifiedDiffTests(SimpleTestCase):
+    BASE = "one\ntwo\nthree\nfour\n"
+
+    def test_applies_hunks(self):
+        diff = "--- a\n+++ b\n@@ -1,3 +1,3 @@\n one\n-two\n+TWO\n three\n"
+        self.assertEqual(apply_unified_diff(self.BASE, diff), "one\nTWO\nthree\nfour\n")
+
+    def test_insert_into_empty_range(self):
+        diff = "@@ -2,0 +3 @@\n+two and a half\n"
+        self.assertEqual(apply_unified_diff(self.BASE, diff), "one\ntwo\ntwo and a half\nthree\nfour\n")
+
+    def test_no_newline_at_end_of_file(self):
+        diff = "@@ -4 +4 @@\n-four\n+FOUR\n\\ No newline at end of file\n"
+        self.assertEqual(apply_unified_diff(self.BASE, diff), "one\ntwo\nthree\nFOUR")
+
+    def test_rejects_mismatched_context(self):
+        with self.assertRaises(PatchError):
+            apply_unified_diff(self.BASE, "@@ -1,2 +1,2 @@\n one\n-deux\n+TWO\n")
+
+    def test_rejects_diff_without_hunks(self):
+        with self.assertRaises(PatchError):
+            apply_unified_diff(self.BASE, "--- a\n+++ b\n")
+
+
+class ApplyPatchTests(SimpleTestCase):
+    def test_checks_the_base_hash(self):
+        with self.assertRaises(PatchConflict) as raised:
+            apply_patch("current", content_hash("older"), ops=[])
+        self.assertEqual(raised.exception.current_hash, content_hash("current"))
+
+    def test_takes_exactly_one_kind_of_patch(self):
+        for kwargs in ({}, {"ops": [], "unified_diff": "@@ -1 +1 @@\n"}):
+            with self.subTest(kwargs=kwargs), self.assertRaises(PatchError):
+                apply_patch("", content_hash(""), **kwargs)
+
+    def test_missing_content_is_empty(self):
+        self.assertEqual(apply_patch(None, content_hash(""), ops=[{"insert": "x"}]), "x")
+
+
+class RevisionDeltaTests(SimpleTestCase):
+    TEXTS = [
+        "",
+        "# Title\n\nFirst paragraph.\n",
+        "# Title\n\nFirst paragraph, edited.\n\nSecond paragraph.\n",
+        "Second paragraph.\n",
+        "no trailing newline",
+        "unicode ☃ line\r\nwindows line\n",
+    ]
+
+    def test_diff_ops_round_trip(self):
+        for base in self.TEXTS:
+            for target in self.TEXTS:
+                with self.subTest(base=base, target=target):
+                    self.assertEqual(apply_ops(base, diff_ops(base, target)), target)
+
+    def test_identical_texts_need_no_ops(self):
+        self.assertEqual(diff_ops("same\n", "same\n"), [])
+
+    @override_settings(REVISION_KEYFRAME_INTERVAL=10)
+    def test_encoded_revisions_decode_to_their_text(self):
+        base = "".join(f"line {n} of a long page\n" for n in range(200))
+        text = base + "one more line\n"
+        is_keyframe, data = _encode(base, text, 1)
+        self.assertFalse(is_keyframe)
+        revision = type("Revision", (), {"is_keyframe": is_keyframe, "data": data})
+        self.assertEqual(_decode(revision, base), text)
+
+    @override_settings(REVISION_KEYFRAME_INTERVAL=10)
+    def test_first_and_interval_revisions_are_keyframes(self):
+        self.assertTrue(_encode(None, "text\n", 0)[0])
+        base = "".join(f"line {n} of a long page\n" for n in range(200))
+        self.assertTrue(_encode(base, base + "one more line\n", 10)[0])
+
+
+class ReadingTests(SimpleTestCase):
+    def test_table_of_contents(self):
+        content = (
+            "# Intro\n\ntext\n\n"
+            "Setext\n======\n\n"
+            "## [Linked](http://example.com) *bold*\n\n"
+            "```\n# not a heading\n```\n\n"
+            "### Closed ###\n"
+        )
+        self.assertEqual(table_of_contents(content), [
+            {"level": 1, "text": "Intro", "anchor": "intro"},
+            {"level": 1, "text": "Setext", "anchor": "setext"},
+            {"level": 2, "text": "Linked bold", "anchor": "linked-bold"},
+            {"level": 3, "text": "Closed", "anchor": "closed"},
+        ])
+
+    def test_duplicate_headings_get_unique_anchors(self):
+        anchors = [entry["anchor"] for entry in table_of_contents("# A\n\n# A\n\n# A\n")]
+        self.assertEqual(anchors, ["a", "a-1", "a-2"])
+
+    def test_heading_anchor_counts_uses(self):
+        taken = {}
+        self.assertEqual([heading_anchor("Setup", taken) for _ in range(2)], ["setup", "setup-1"])
+        self.assertEqual(heading_anchor("!!!", taken), "section")
+
+    def test_plain_text(self):
+        self.assertEqual(plain_text("See [[Page|the page]] and [docs](http://x) **now**"), "See the page and docs now")
+
+    def test_word_count_and_reading_time(self):
+        self.assertEqual(word_count("It's [a link](http://example.com/long/url) and `code`."), 5)
+        with self.settings(READING_WORDS_PER_MINUTE=100):
+            self.assertEqual(reading_time(0), 0)
+            self.assertEqual(reading_time(1), 1)
+            self.assertEqual(reading_time(201), 3)
+
+
+class HeadingAnchorTests(SimpleTestCase):
+    def assertAnchorsMatch(self, content, toc):
+        self.assertEqual(table_of_contents(content), toc)
+        rendered = render_markdown(content)
+        for entry in toc:
+            self.assertIn(f'<h{entry["level"]} id="{entry["anchor"]}">', rendered)
+        return rendered
+
+    def test_heading_without_space(self):
+        self.assertAnchorsMatch("#tag\n\n# Real\n", [
+            {"level": 1, "text": "tag", "anchor": "tag"},
+            {"level": 1, "text": "Real", "anchor": "real"},
+        ])
+
+    def test_quoted_heading_is_not_listed(self):
+        rendered = self.assertAnchorsMatch("# A\n\n> # Quoted\n\n# A\n", [
+            {"level": 1, "text": "A", "anchor": "a"},
+            {"level": 1, "text": "A", "anchor": "a-1"},
+        ])
+        self.assertIn('<h1 id="quoted">Quoted</h1>', rendered)
+
+    def test_dashes_after_a_paragraph_are_a_rule(self):
+        rendered = self.assertAnchorsMatch("Para\nline two\n---\n\n## Next\n", [
+            {"level": 2, "text": "Next", "anchor": "next"},
+        ])
+        self.assertNotIn('id="line-two"', rendered)
+
+    def test_entities_and_inline_html(self):
+        self.assertAnchorsMatch("# Fish &amp; <em>Chips</em>\n", [
+            {"level": 1, "text": "Fish & Chips", "anchor": "fish-chips"},
+        ])
+
+
+class OrderKeyTests(SimpleTestCase):
+    def test_key_between_neighbours(self):
+        self.assertEqual(ordering.key_between(None, None), ordering.GAP)
+        self.assertEqual(ordering.key_between(ordering.GAP, None), 2 * ordering.GAP)
+        self.assertEqual(ordering.key_between(None, ordering.GAP), ordering.GAP // 2)
+        self.assertEqual(ordering.key_between(10, 20), 15)
+
+    def test_no_room(self):
+        self.assertIsNone(ordering.key_between(10, 11))
+        self.assertIsNone(ordering.key_between(ordering.MAX_KEY, None))
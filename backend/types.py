@@ -0,0 +1,93 @@
+import strawberry
+from datetime import datetime
+from typing import List, Optional
+from graphql import GraphQLError
+
+from backend import revisions
+from backend.patches import PatchConflict, PatchError, apply_patch
+
+
+@strawberry.input
+class TextOpInput:
+    """One of retain (keep n characters), insert (text) or delete (n characters)"""
+    retain: Optional[int] = None
+    insert: Optional[str] = None
+    delete: Optional[int] = None
+
+    def to_op(self):
+        op = {
+            kind: value
+            for kind, value in (("retain", self.retain), ("insert", self.insert), ("delete", self.delete))
+            if value is not None
+        }
+        if len(op) != 1:
+            raise PatchError("Each operation must have exactly one of retain, insert or delete")
+        return op
+
+
+@strawberry.input
+class ContentPatchInput:
+    """Changes to content against the revision with ``base_hash`` (see backend.patches)"""
+    base_hash: str
+    ops: Optional[List[TextOpInput]] = None
+    unified_diff: Optional[str] = None
+
+    def apply(self, text):
+        """Return the patched text, raising CONFLICT if ``text`` isn't the base revision"""
+        try:
+            ops = [op.to_op() for op in self.ops] if self.ops is not None else None
+            return apply_patch(text, self.base_hash, ops=ops, unified_diff=self.unified_diff)
+        except PatchConflict as e:
+            raise GraphQLError(str(e), extensions={"code": "CONFLICT", "currentHash": e.current_hash})
+        except PatchError as e:
+            raise GraphQLError(f"Invalid content patch: {str(e)}", extensions={"code": "BAD_REQUEST"})
+
+
+@strawberry.type
+class RevisionType:
+    number: int
+    created_at: datetime
+    size: int  # Characters
+    content_hash: str
+    revision: strawberry.Private[object]
+
+    @classmethod
+    def from_revision(cls, revision):
+        return cls(
+            number=revision.number,
+            created_at=revision.created_at,
+            size=revision.size,
+            content_hash=revision.content_hash,
+            revision=revision,
+        )
+
+    @strawberry.field
+    def content(self) -> Optional[str]:
+        """The full text, rebuilt from the nearest keyframe"""
+        model = type(self.revision)
+        return revisions.reconstruct(model, getattr(self.revision, f"{model.owner_field}_id"), self.number)
+
+
+def revision_types(model, owner_id, first, before=None):
+    """Revision metadata of a document for a ``revisions`` field, newest first"""
+    return [
+        RevisionType.from_revision(revision)
+        for revision in revisions.list_revisions(model, owner_id, max(1, min(first, 100)), before)
+    ]
+
+
+def revision_type(model, owner_id, number):
+    revision = revisions.get_revision(model, owner_id, number)
+    return RevisionType.from_revision(revision) if revision else None
+
+
+@strawberry.type
+class TocEntryType:
+    """A heading of a document's table of contents (see backend.reading)"""
+    level: int  # 1 to 6
+    text: str
+    anchor: str  # Unique within the document
+
+
+def toc_entries(toc):
+    return [TocEntryType(level=entry["level"], text=entry["text"], anchor=entry["anchor"]) for entry in toc or []]
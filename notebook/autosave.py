@@ -0,0 +1,120 @@
+"""
+Buffered page autosaves (see backend.autosave).
+
+Content-only updates of a page are kept in the autosave buffer and written
+by the flush-page-autosaves job; renames, moves and reorders are saved
+directly after taking whatever is buffered for the page.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from backend import autosave
+from backend.revisions import record_many as record_revisions
+from notebook.embeddings import mark_stale as mark_embeddings_stale
+from notebook.links import update_links
+from notebook.models import Notebook, Page, PageRevision
+
+PAGE = "page"
+
+
+def buffered_content(page):
+    """The page's latest content, including an unflushed autosave (looked up once per instance)"""
+    if not getattr(page, '_autosave_overlaid', False):
+        autosave.overlay(PAGE, page, ['content'])
+        page._autosave_overlaid = True
+    return page.content
+
+
+def buffer_content(page, content=None, patch=None):
+    """
+    Buffer a content autosave, either the full ``content`` or a ``patch``
+    (ContentPatchInput) applied to the latest content. Updates
+    ``page.content`` and returns True, or returns False if the buffer is
+    unavailable and the page must be saved directly.
+    """
+    if patch is None:
+        if not autosave.save(PAGE, page.pk, content=content):
+            return False
+        page.content = content
+        page._autosave_overlaid = True
+        return True
+
+    fields = autosave.edit(
+        PAGE,
+        page.pk,
+        load=lambda: {"content": Page.objects.values_list('content', flat=True).get(pk=page.pk)},
+        change=lambda current: {"content": patch.apply(current["content"])},
+    )
+    if fields is None:
+        return False
+    page.content = fields["content"]
+    page._autosave_overlaid = True
+    return True
+
+
+def take_content(page):
+    """
+    Load the page's latest content onto the instance (locking its row) before
+    saving it directly, so neither a stale instance nor an older buffered
+    autosave overwrites newer content. Must run in a transaction.
+    """
+    page.content = Page.objects.select_for_update().values_list('content', flat=True).get(pk=page.pk)
+    buffered = autosave.take(PAGE, page.pk)
+    if buffered and "content" in buffered:
+        page.content = buffered["content"]
+    page._autosave_overlaid = True
+    return page.content
+
+
+def flush_page(page):
+    """Write the page's buffered autosave now, e.g. when the editor is closed"""
+    with transaction.atomic():
+        buffered = autosave.take(PAGE, page.pk)
+        if buffered and "content" in buffered:
+            page.content = buffered["content"]
+            page.save(update_fields=['content', 'updated_at'])
+    page._autosave_overlaid = True
+    return page
+
+
+def write_pages(docs):
+    """Write buffered page contents ({page id: fields}), one change sequence number per notebook"""
+    pages = list(Page.objects.filter(pk__in=docs).only('id', 'notebook_id').order_by('notebook_id'))
+    by_notebook = defaultdict(list)
+    for page in pages:
+        by_notebook[page.notebook_id].append(page)
+
+    now = timezone.now()
+    with transaction.atomic():
+        for notebook_id, group in by_notebook.items():
+            change_seq = Notebook.next_change_seq(notebook_id)
+            for page in group:
+                page.content = docs[page.pk]["content"]
+                page.update_reading_metadata()
+                page.updated_at = now
+                page.change_seq = change_seq
+        Page.objects.bulk_update(
+            pages, ['content', 'updated_at', 'change_seq', *Page.READING_FIELDS], batch_size=500
+        )
+        record_revisions(PageRevision, {page.pk: page.content for page in pages})
+        update_links(pages)
+        mark_embeddings_stale(pages)
+    return len(pages)
+
+
+def flush_pages():
+    """Write every buffered page autosave. Returns the pages written."""
+    return autosave.flush(PAGE, write_pages)
+
+
+def flush_notebook_pages(notebook_id):
+    """Write the buffered autosaves of one notebook's pages. Returns the pages written."""
+    dirty = autosave.dirty(PAGE)
+    if not dirty:
+        return 0
+    pks = list(Page.objects.filter(notebook_id=notebook_id, pk__in=dirty).values_list('pk', flat=True))
+    if not pks:
+        return 0
+    return autosave.flush(PAGE, write_pages, pks=pks)
@@ -0,0 +1,162 @@
+"""
+Deep copies of notebooks.
+
+A clone is a fixed number of statements whatever the size of the notebook:
+new ids for every page are drawn from the page id sequence into a temporary
+old id -> new id table, and pages, revisions, links and embeddings are then
+copied with one ``INSERT ... SELECT`` each, remapping page, parent and link
+target ids through that table. Nothing is loaded into Python, and the copied
+embeddings are reused since the text they embed is unchanged.
+
+Only the owner's own clones keep the edit history. Someone else's clone
+starts each page with one revision of its current content, as old revisions
+hold text the author deleted.
+
+The cover image is shared rather than copied: the clone references the same
+stored file, so deleting a cover only removes the file once no notebook uses
+it (see notebook.utils.delete_cover).
+"""
+from django.db import connection, transaction
+
+from backend.revisions import record_initial
+from notebook.autosave import flush_notebook_pages
+from notebook.models import Notebook, Page, PageEmbedding, PageLink, PageRevision
+
+MAP_TABLE = "notebook_clone_page_map"
+NAME_LENGTH = Notebook._meta.get_field('name').max_length
+REVISION_BATCH_SIZE = 500
+
+
+def _copy_rows(cursor, model, joins, where, overrides, params=()):
+    """
+    Copy rows of ``model`` with one INSERT ... SELECT over ``FROM <table> s
+    <joins> WHERE <where>``. ``overrides`` maps columns to ``(sql, params)``
+    replacing the copied value; the primary key is renumbered unless given.
+    """
+    columns = []
+    values = []
+    value_params = []
+    for field in model._meta.concrete_fields:
+        if field.generated:
+            continue
+        if field.column in overrides:
+            sql, override_params = overrides[field.column]
+            values.append(sql)
+            value_params.extend(override_params)
+        elif field.primary_key:
+            continue
+        else:
+            values.append(f's."{field.column}"')
+        columns.append(f'"{field.column}"')
+    table = model._meta.db_table
+    cursor.execute(
+        f'INSERT INTO "{table}" ({", ".join(columns)}) '
+        f'SELECT {", ".join(values)} FROM "{table}" s {joins} WHERE {where}',
+        [*value_params, *params],
+    )
+    return cursor.rowcount
+
+
+def _seed_revisions(notebook):
+    # Revisions are compressed in Python, so the current content is streamed
+    # through in batches
+    rows = Page.objects.filter(notebook_id=notebook.pk).values_list('id', 'content')
+    texts = {}
+    for page_id, content in rows.iterator(chunk_size=REVISION_BATCH_SIZE):
+        texts[page_id] = content
+        if len(texts) >= REVISION_BATCH_SIZE:
+            record_initial(PageRevision, texts)
+            texts = {}
+    record_initial(PageRevision, texts)
+
+
+def clone_notebook(source, user, name=None):
+    """
+    Copy ``source`` with all of its pages into a new notebook owned by
+    ``user``. Returns ``(notebook, pages copied)``.
+    """
+    # Buffered autosaves would otherwise be missing from the copy
+    flush_notebook_pages(source.pk)
+    page_table = Page._meta.db_table
+    with transaction.atomic():
+        notebook = Notebook(
+            name=(name or f"{source.name} (copy)")[:NAME_LENGTH],
+            overview=source.overview,
+            user=user,
+            # The same stored file, not a new upload
+            cover=source.cover.name or None,
+        )
+        notebook.save()
+        change_seq = Notebook.next_change_seq(notebook.pk)
+
+        with connection.cursor() as cursor:
+            # Page writes allocate a change_seq on the notebook row, so this
+            # holds them off until the copy is complete and consistent
+            cursor.execute(
+                f'SELECT 1 FROM "{Notebook._meta.db_table}" WHERE "id" = %s FOR SHARE', [source.pk]
+            )
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE "{MAP_TABLE}" '
+                '("old_id" bigint PRIMARY KEY, "new_id" bigint NOT NULL) ON COMMIT DROP'
+            )
+            cursor.execute(
+                f'INSERT INTO "{MAP_TABLE}" ("old_id", "new_id") '
+                f"SELECT \"id\", nextval(pg_get_serial_sequence('\"{page_table}\"', 'id')) "
+                f'FROM "{page_table}" WHERE "notebook_id" = %s',
+                [source.pk],
+            )
+            pages = cursor.rowcount
+            # Temporary tables have no statistics until analyzed
+            cursor.execute(f'ANALYZE "{MAP_TABLE}"')
+
+            # Parent pages are inserted alongside their children; the foreign
+            # key is only checked at commit
+            _copy_rows(
+                cursor, Page,
+                f'JOIN "{MAP_TABLE}" m ON m."old_id" = s."id" '
+                f'LEFT JOIN "{MAP_TABLE}" pm ON pm."old_id" = s."parent_id"',
+                's."notebook_id" = %s',
+                {
+                    'id': ('m."new_id"', []),
+                    'notebook_id': ('%s', [notebook.pk]),
+                    'parent_id': ('pm."new_id"', []),
+                    'change_seq': ('%s', [change_seq]),
+                    'created_at': ('NOW()', []),
+                    'updated_at': ('NOW()', []),
+                },
+                [source.pk],
+            )
+            if source.user_id == user.pk:
+                _copy_rows(
+                    cursor, PageRevision,
+                    f'JOIN "{MAP_TABLE}" m ON m."old_id" = s."page_id"',
+                    'TRUE',
+                    {'page_id': ('m."new_id"', [])},
+                )
+            _copy_rows(
+                cursor, PageLink,
+                f'JOIN "{MAP_TABLE}" m ON m."old_id" = s."source_id" '
+                f'LEFT JOIN "{MAP_TABLE}" tm ON tm."old_id" = s."target_page_id"',
+                's."notebook_id" = %s',
+                {
+                    'source_id': ('m."new_id"', []),
+                    'notebook_id': ('%s', [notebook.pk]),
+                    'target_page_id': ('tm."new_id"', []),
+                },
+                [source.pk],
+            )
+            _copy_rows(
+                cursor, PageEmbedding,
+                f'JOIN "{MAP_TABLE}" m ON m."old_id" = s."page_id"',
+                's."notebook_id" = %s',
+                {
+                    'page_id': ('m."new_id"', []),
+                    'notebook_id': ('%s', [notebook.pk]),
+                },
+                [source.pk],
+            )
+            cursor.execute(f'DROP TABLE "{MAP_TABLE}"')
+        if source.user_id != user.pk:
+            _seed_revisions(notebook)
+    notebook.change_seq = change_seq
+    return notebook, pages
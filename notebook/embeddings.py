@@ -0,0 +1,239 @@
+"""
+Page embeddings for semantic search.
+
+Pages autosave every few seconds, so edits don't request embeddings
+directly. Page.save (and the autosave flush) only mark the page's
+PageEmbedding row stale. The request-page-embeddings job picks up stale
+pages once they've been left alone for PAGE_EMBEDDING_DEBOUNCE seconds (or
+PAGE_EMBEDDING_MAX_DELAY seconds after the first edit, for pages that are
+edited continuously) and queues them for the embedding worker in batches of
+PAGE_EMBEDDING_BATCH_SIZE pages per Cloud Task. The worker posts the vectors
+back to the save-embeddings view.
+
+Vectors are searched through an HNSW index with a notebook filter. The index
+returns PAGE_EMBEDDING_EF_SEARCH candidates before the filter applies, so
+when that leaves too few hits (a notebook with few pages in a large table)
+the search is repeated exactly over the notebook's pages.
+"""
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from pgvector.django import CosineDistance
+
+from backend.cloud_tasks import create_embedding_task
+from backend.redis_client import get_redis
+from backend.patches import content_hash
+from notebook.models import Page, PageEmbedding
+
+DIMENSIONS = 768
+
+
+class EmbeddingUnavailable(Exception):
+    pass
+
+
+def mark_stale(pages):
+    """Flag the embeddings of ``pages`` for a refresh (one statement)"""
+    rows = [(page.pk, page.notebook_id) for page in pages if page.pk]
+    if not rows:
+        return 0
+    now = timezone.now()
+    table = PageEmbedding._meta.db_table
+    values = ", ".join(["(%s, %s, %s, %s, true, '', '')"] * len(rows))
+    params = [value for page_id, notebook_id in rows for value in (page_id, notebook_id, now, now)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO "{table}" AS e '
+            '("page_id", "notebook_id", "stale_since", "changed_at", "stale", "embedded_hash", "requested_hash") '
+            f'VALUES {values} '
+            'ON CONFLICT ("page_id") DO UPDATE SET '
+            '"changed_at" = EXCLUDED."changed_at", '
+            '"stale_since" = CASE WHEN e."stale" THEN e."stale_since" ELSE EXCLUDED."stale_since" END, '
+            '"stale" = true',
+            params,
+        )
+        return cursor.rowcount
+
+
+def mark_missing(pages):
+    """Flag the pages of a queryset that have no embedding row yet (one statement)"""
+    ids_sql, params = pages.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO "{PageEmbedding._meta.db_table}" '
+            '("page_id", "notebook_id", "stale_since", "changed_at", "stale", "embedded_hash", "requested_hash") '
+            f'SELECT "id", "notebook_id", NOW(), NOW(), true, %s, %s FROM "{Page._meta.db_table}" '
+            f'WHERE "id" IN ({ids_sql}) '
+            'ON CONFLICT ("page_id") DO NOTHING',
+            ['', '', *params],
+        )
+        return cursor.rowcount
+
+
+def _embedding_text(page):
+    return page.get_embedding_text()[:settings.PAGE_EMBEDDING_MAX_CHARS]
+
+
+def request_stale_embeddings():
+    """
+    Queue embedding tasks for the stale pages that are due. Returns the
+    number of pages requested.
+    """
+    now = timezone.now()
+    due = Q(changed_at__lt=now - timedelta(seconds=settings.PAGE_EMBEDDING_DEBOUNCE)) | Q(
+        stale_since__lt=now - timedelta(seconds=settings.PAGE_EMBEDDING_MAX_DELAY)
+    )
+    with transaction.atomic():
+        # Rows locked by a concurrent run are left to it; edits made meanwhile
+        # wait for the lock and mark the page stale again
+        rows = {
+            row.page_id: row
+            for row in PageEmbedding.objects.select_for_update(skip_locked=True)
+            .filter(due, stale=True)
+            .order_by('stale_since')
+            .only('page_id', 'embedded_hash')[:settings.PAGE_EMBEDDING_MAX_PAGES]
+        }
+        if not rows:
+            return 0
+
+        pending = []
+        unchanged = []
+        for page in Page.objects.filter(pk__in=rows).only('id', 'title', 'content').order_by('id'):
+            row = rows[page.pk]
+            text = _embedding_text(page)
+            digest = content_hash(text)
+            row.stale = False
+            if digest == row.embedded_hash:
+                # e.g. an edit that was undone
+                unchanged.append(row)
+                continue
+            row.requested_hash = digest
+            row.requested_at = now
+            pending.append((row, {'page_id': str(page.pk), 'content_hash': digest, 'text': text}))
+        PageEmbedding.objects.bulk_update(unchanged, ['stale'], batch_size=500)
+        # Committed before any task is queued, so the worker's results always
+        # find the hash they were requested for
+        PageEmbedding.objects.bulk_update(
+            [row for row, _ in pending], ['stale', 'requested_hash', 'requested_at'], batch_size=500
+        )
+
+    requested = 0
+    batch_size = settings.PAGE_EMBEDDING_BATCH_SIZE
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        payload = {
+            'task_type': 'page_embedding_generation',
+            'timestamp': datetime.now().isoformat(),
+            'page_embedding_requests': [request for _, request in batch],
+            'normalize': True,
+            'dimensions': DIMENSIONS,
+        }
+        try:
+            task_name = create_embedding_task(payload)
+        except Exception as e:
+            # The remaining pages are stale again for the next run
+            print(f"Failed to create page embedding task: {str(e)}")
+            PageEmbedding.objects.filter(
+                page_id__in=[row.page_id for row, _ in pending[start:]], stale=False
+            ).update(stale=True)
+            break
+        print(f"Page embedding task created: {task_name}")
+        requested += len(batch)
+    return requested
+
+
+def save_embeddings(results):
+    """
+    Store vectors posted by the embedding worker ([{page_id, content_hash,
+    embedding}]). Results for anything but the latest requested text are
+    ignored. Returns the number stored.
+    """
+    results = {int(result['page_id']): result for result in results}
+    rows = list(PageEmbedding.objects.filter(page_id__in=results).only('page_id', 'requested_hash'))
+    stored = []
+    for row in rows:
+        result = results[row.page_id]
+        if result['content_hash'] != row.requested_hash or len(result['embedding']) != DIMENSIONS:
+            continue
+        row.embedding = result['embedding']
+        row.embedded_hash = result['content_hash']
+        stored.append(row)
+    PageEmbedding.objects.bulk_update(stored, ['embedding', 'embedded_hash'], batch_size=100)
+    return len(stored)
+
+
+def allow_query(user_id):
+    """
+    Count a query embedding against the user's SEMANTIC_SEARCH_RATE_LIMIT per
+    minute. Returns False once it is used up.
+    """
+    key = f"embedding:queries:{user_id}:{int(time.time() // 60)}"
+    try:
+        pipe = get_redis().pipeline()
+        pipe.incr(key)
+        pipe.expire(key, 60)
+        count = pipe.execute()[0]
+    except Exception as e:
+        print(f"Failed to count query embeddings of user {user_id}: {str(e)}")
+        return True
+    return count <= settings.SEMANTIC_SEARCH_RATE_LIMIT
+
+
+def embed_query(text):
+    """Embed a search query with the EMBEDDING_QUERY_URL service"""
+    import requests
+
+    if not settings.EMBEDDING_QUERY_URL:
+        raise EmbeddingUnavailable("Semantic search is not configured")
+    headers = {}
+    if getattr(settings, 'CLOUD_TASKS_AUTH_TOKEN', None):
+        headers['Authorization'] = f'Bearer {settings.CLOUD_TASKS_AUTH_TOKEN}'
+    try:
+        response = requests.post(
+            settings.EMBEDDING_QUERY_URL,
+            json={'text': text, 'normalize': True, 'dimensions': DIMENSIONS},
+            headers=headers,
+            timeout=10,
+        )
+        response.raise_for_status()
+        return response.json()['embedding']
+    except (requests.RequestException, ValueError, KeyError) as e:
+        print(f"Failed to embed search query: {str(e)}")
+        raise EmbeddingUnavailable("Semantic search is unavailable right now")
+
+
+def _nearest(notebook_id, vector, first, exclude_page_id):
+    embeddings = PageEmbedding.objects.filter(notebook_id=notebook_id, embedding__isnull=False)
+    if exclude_page_id is not None:
+        embeddings = embeddings.exclude(page_id=exclude_page_id)
+    return list(
+        embeddings.annotate(distance=CosineDistance('embedding', vector))
+        .order_by('distance')
+        .values_list('page_id', 'distance')[:first]
+    )
+
+
+def nearest_pages(notebook_id, vector, first=10, exclude_page_id=None, defer=()):
+    """``[(page, similarity)]`` for the notebook's pages closest to ``vector``, best first"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('hnsw.ef_search', %s, true)", [str(settings.PAGE_EMBEDDING_EF_SEARCH)])
+        hits = _nearest(notebook_id, vector, first, exclude_page_id)
+        if len(hits) < first:
+            # The filter may have discarded most index candidates
+            cursor.execute("SELECT set_config('enable_indexscan', 'off', true)")
+            hits = _nearest(notebook_id, vector, first, exclude_page_id)
+
+    pages = Page.objects.defer(*defer).in_bulk([page_id for page_id, _ in hits])
+    return [(pages[page_id], 1 - distance) for page_id, distance in hits if page_id in pages]
+
+
+def similar_pages(page, first=10, defer=()):
+    """Pages of the same notebook most similar to ``page`` (none until it has an embedding)"""
+    vector = PageEmbedding.objects.filter(page_id=page.pk).values_list('embedding', flat=True).first()
+    if vector is None:
+        return []
+    return nearest_pages(page.notebook_id, vector, first, exclude_page_id=page.pk, defer=defer)
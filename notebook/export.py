@@ -0,0 +1,121 @@
+"""
+Notebook export to a zip of Markdown files.
+
+The archive is written while it is sent: pages are read in path order with
+one query over a server-side cursor, and each page is compressed into the
+zip and yielded before the next row is fetched, so memory use doesn't grow
+with the size of the notebook. Each page becomes ``<path>.md`` (e.g.
+``guide/setup.md``) with its title in YAML front matter, which
+``notebook.importer`` reads back.
+
+Large notebooks can be exported in the background instead (NotebookExport
+and the export_notebook task); the archive is stored and linked.
+"""
+import json
+import secrets
+import tempfile
+import zipfile
+
+from django.core.files import File
+from django.utils import timezone
+
+from notebook.autosave import flush_notebook_pages
+from notebook.models import NotebookExport, Page
+
+ROWS_PER_FETCH = 100
+
+
+class _ChunkBuffer:
+    # Write-only file object collecting what ZipFile writes between yields
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def page_file_name(path):
+    return path.strip("/") + ".md"
+
+
+def render_page(title, content):
+    """Markdown file contents of a page"""
+    # A JSON string is a valid YAML scalar, whatever the title contains
+    return f"---\ntitle: {json.dumps(title, ensure_ascii=False)}\n---\n\n{content or ''}"
+
+
+def export_file_name(notebook):
+    return f"{notebook.slug}.zip"
+
+
+def stream_export(notebook):
+    """Yield the bytes of a zip with one Markdown file per page of ``notebook``"""
+    # Buffered autosaves would otherwise be missing from the export
+    flush_notebook_pages(notebook.pk)
+    buffer = _ChunkBuffer()
+    rows = Page.objects.filter(notebook_id=notebook.pk).order_by('path').values_list(
+        'path', 'title', 'content', 'updated_at'
+    )
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path, title, content, updated_at in rows.iterator(chunk_size=ROWS_PER_FETCH):
+            info = zipfile.ZipInfo(page_file_name(path), date_time=updated_at.timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, render_page(title, content))
+            yield buffer.take()
+    # The central directory
+    yield buffer.take()
+
+
+def run_export(export):
+    """Write a NotebookExport's archive to storage"""
+    export.status = NotebookExport.RUNNING
+    export.save(update_fields=['status'])
+    try:
+        with tempfile.TemporaryFile() as archive:
+            for chunk in stream_export(export.notebook):
+                archive.write(chunk)
+            archive.seek(0)
+            # An unguessable name, as media files are publicly readable
+            name = f"{secrets.token_urlsafe(16)}/{export_file_name(export.notebook)}"
+            export.file.save(name, File(archive), save=False)
+        export.status = NotebookExport.DONE
+    except Exception as e:
+        print(f"Failed to export notebook {export.notebook_id}: {str(e)}")
+        export.status = NotebookExport.FAILED
+        export.error = str(e)
+    export.finished_at = timezone.now()
+    export.save(update_fields=['status', 'file', 'error', 'finished_at'])
+    return export
+
+
+def enqueue_export(export):
+    """Queue the export task; marks the export failed if the broker is down"""
+    from notebook.tasks import export_notebook
+
+    try:
+        export_notebook.delay(export.id)
+    except Exception as e:
+        print(f"Failed to queue export {export.id}: {str(e)}")
+        export.status = NotebookExport.FAILED
+        export.error = "Could not start the export"
+        export.save(update_fields=['status', 'error'])
+
+
+def prune_exports(older_than):
+    """Delete exports created before ``older_than`` along with their archives"""
+    deleted = 0
+    for export in NotebookExport.objects.filter(created_at__lt=older_than).iterator():
+        if export.file:
+            export.file.delete(save=False)
+        export.delete()
+        deleted += 1
+    return deleted
@@ -0,0 +1,154 @@
+"""
+Set-based operations on page subtrees.
+
+A subtree is every page whose materialized path starts with the root's path,
+so deleting or moving one is a handful of statements over the
+(notebook, path) index regardless of its size, instead of Django's cascade
+collector loading and deleting descendants level by level.
+"""
+from django.db import connection, models, transaction
+from django.db.models import Exists, F, OuterRef, ProtectedError, Q, Value
+from django.db.models.deletion import Collector
+from django.db.models.functions import Concat, Substr
+
+from notebook.links import resolve_titles
+from notebook.models import Notebook, Page, PageTombstone
+
+
+def subtree(page):
+    """The page and all of its descendants"""
+    return Page.objects.filter(notebook_id=page.notebook_id).filter(
+        Q(pk=page.pk) | Q(path__startswith=page.path + "/")
+    )
+
+
+def refresh_has_children(page_ids, change_seq):
+    """
+    Recompute has_children for the given pages in one statement, stamping
+    the ones that changed with ``change_seq``
+    """
+    page_ids = [page_id for page_id in page_ids if page_id is not None]
+    if not page_ids:
+        return 0
+    has_children = Exists(Page.objects.filter(parent_id=OuterRef('pk')))
+    return Page.objects.filter(pk__in=page_ids).exclude(has_children=has_children).update(
+        has_children=has_children, change_seq=change_seq
+    )
+
+
+def reroot_descendants(page, old_path, old_depth):
+    """Rewrite the paths below ``page`` after it moved from ``old_path``. Returns the rows updated."""
+    return Page.objects.filter(
+        notebook_id=page.notebook_id, path__startswith=old_path + "/"
+    ).update(
+        path=Concat(Value(page.path), Substr('path', len(old_path) + 1)),
+        depth=F('depth') + (page.depth - old_depth),
+        change_seq=page.change_seq,
+    )
+
+
+def _delete_dependents(pages):
+    """Apply on_delete for rows of other models pointing at ``pages`` without loading them."""
+    for relation in Page._meta.related_objects:
+        if relation.related_model is Page:
+            continue  # The subtree already contains every child
+        if relation.many_to_many:
+            through = relation.through
+            column = next(
+                f.column for f in through._meta.fields
+                if f.is_relation and f.related_model is Page
+            )
+            table = through._meta.db_table
+            action = models.CASCADE
+        else:
+            column = relation.field.column
+            table = relation.related_model._meta.db_table
+            action = relation.on_delete
+
+        if action is models.DO_NOTHING:
+            continue
+        if (action is models.CASCADE and not relation.related_model._meta.related_objects) or (
+            action is models.SET_NULL
+        ):
+            ids_sql, params = pages.order_by().values('pk').query.sql_with_params()
+            with connection.cursor() as cursor:
+                if action is models.CASCADE:
+                    cursor.execute(f'DELETE FROM "{table}" WHERE "{column}" IN ({ids_sql})', params)
+                else:
+                    cursor.execute(f'UPDATE "{table}" SET "{column}" = NULL WHERE "{column}" IN ({ids_sql})', params)
+            continue
+
+        dependents = relation.related_model._base_manager.filter(
+            **{f"{relation.field.name}__in": pages.order_by().values('pk')}
+        )
+        if action is models.PROTECT or action is models.RESTRICT:
+            if dependents.exists():
+                raise ProtectedError(
+                    f"Cannot delete pages referenced through a protected foreign key: "
+                    f"'{relation.related_model.__name__}.{relation.field.name}'",
+                    set(dependents),
+                )
+        elif action is models.CASCADE:
+            # Dependents with dependents of their own go through the collector
+            dependents.delete()
+        else:
+            # SET_DEFAULT, SET(...) and custom handlers schedule their work on a collector
+            collector = Collector(using=dependents.db, origin=pages)
+            action(collector, relation.field, dependents, dependents.db)
+            collector.delete()
+
+
+def delete_pages(pages, change_seq=None):
+    """
+    Delete a queryset of pages (whole subtrees) with set-based SQL, leaving
+    tombstones stamped with ``change_seq`` if given. Returns the pages deleted.
+    """
+    with transaction.atomic():
+        _delete_dependents(pages)
+        ids_sql, params = pages.order_by().values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            if change_seq is not None:
+                cursor.execute(
+                    f'INSERT INTO "{PageTombstone._meta.db_table}" '
+                    '("notebook_id", "page_id", "path", "change_seq", "deleted_at") '
+                    f'SELECT "notebook_id", "id", "path", %s, NOW() FROM "{Page._meta.db_table}" '
+                    f'WHERE "id" IN ({ids_sql})',
+                    [change_seq, *params],
+                )
+            cursor.execute(f'DELETE FROM "{Page._meta.db_table}" WHERE "id" IN ({ids_sql})', params)
+            return cursor.rowcount
+
+
+def delete_subtree(page):
+    """Delete a page with all of its descendants. Returns the pages deleted."""
+    with transaction.atomic():
+        change_seq = Notebook.next_change_seq(page.notebook_id)
+        pages = subtree(page)
+        titles = set(pages.values_list('title', flat=True))
+        deleted = delete_pages(pages, change_seq)
+        refresh_has_children([page.parent_id], change_seq)
+        Notebook.bump_outline_version(page.notebook_id)
+        # Links to the deleted pages fall back to other pages with their titles, if any
+        resolve_titles(page.notebook_id, titles)
+    return deleted
+
+
+def delete_notebook_pages(notebook):
+    """Delete every page of a notebook. Returns the pages deleted."""
+    return delete_pages(Page.objects.filter(notebook_id=notebook.pk))
+
+
+def move_subtree(page, new_parent, insert_after_page_id=None, insert_before_page_id=None):
+    """
+    Move a page with everything below it under ``new_parent`` (None for the
+    root), optionally positioned next to a new sibling. Returns the pages
+    updated.
+    """
+    with transaction.atomic():
+        page.parent = new_parent
+        positioned = insert_before_page_id is not None or insert_after_page_id is not None
+        if positioned:
+            # One save places and reroots the page
+            page.index = page.position_index(after_id=insert_after_page_id, before_id=insert_before_page_id)
+        page.save(keep_index=positioned)
+    return 1 + page.rerooted_count
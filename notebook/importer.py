@@ -0,0 +1,229 @@
+"""
+Bulk import of a notebook from Markdown files.
+
+Accepts a zip archive or a folder tree of ``.md`` files, e.g. one written by
+``notebook.export``: ``guide.md`` becomes a page and ``guide/setup.md`` its
+child. A folder without a matching file becomes an empty page named after
+the folder. The title comes from a ``title:`` line in YAML front matter,
+or else from the file name.
+
+Page.save costs several queries per page (order key, slug check, parent
+update, change stamp, ...). The importer instead computes slugs, paths,
+order keys, has_children and reading metadata in memory and inserts the
+tree one level at a time with ``bulk_create`` (parents first, for their
+ids) in a single transaction, stamping every page with one change sequence
+number. Revisions, links and embedding flags are then written in batches
+too.
+"""
+import json
+import os
+import re
+import time
+import zipfile
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.text import slugify
+
+from backend import ordering
+from backend.revisions import record_initial
+from notebook.embeddings import mark_missing
+from notebook.hierarchy import refresh_has_children
+from notebook.links import resolve_titles, update_links
+from notebook.models import Notebook, Page, PageRevision
+
+MARKDOWN_EXTENSIONS = ('.md', '.markdown', '.txt')
+FRONT_MATTER = re.compile(r"\A---\r?\n(.*?)\r?\n---\r?\n?", re.S)
+TITLE_LINE = re.compile(r"^title:\s*(.+?)\s*$", re.M)
+TITLE_LENGTH = Page._meta.get_field('title').max_length
+
+
+class NotebookImportError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    pages: int
+    seconds: float
+
+    @property
+    def pages_per_second(self):
+        return self.pages / self.seconds if self.seconds else float(self.pages)
+
+
+@dataclass
+class _Node:
+    name: str  # File or folder name without the extension
+    title: str = ""
+    content: str = ""
+    children: dict = field(default_factory=dict)
+    page: Page = None
+
+
+def _parse_markdown(text):
+    # (title from the front matter or None, content without it)
+    match = FRONT_MATTER.match(text)
+    if not match:
+        return None, text
+    title = TITLE_LINE.search(match.group(1))
+    content = text[match.end():].lstrip("\r\n")
+    if not title:
+        return None, content
+    value = title.group(1)
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        # Exports write titles as JSON strings (see notebook.export)
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = value[1:-1]
+    elif len(value) >= 2 and value[0] == value[-1] == "'":
+        value = value[1:-1].replace("''", "'")
+    return value, content
+
+
+def _hidden(parts):
+    return any(part.startswith(".") or part == "__MACOSX" for part in parts)
+
+
+class _Tree:
+    def __init__(self):
+        self.root = _Node(name="")
+        self.size = 0
+        self.files = 0
+
+    def add(self, relative_path, read):
+        parts = [part for part in relative_path.replace("\\", "/").split("/") if part]
+        if not parts or _hidden(parts):
+            return
+        stem, extension = os.path.splitext(parts[-1])
+        if extension.lower() not in MARKDOWN_EXTENSIONS:
+            return
+        self.files += 1
+        if self.files > settings.NOTEBOOK_IMPORT_MAX_PAGES:
+            raise NotebookImportError(f"Imports are limited to {settings.NOTEBOOK_IMPORT_MAX_PAGES} pages")
+        data = read()
+        self.size += len(data)
+        if self.size > settings.NOTEBOOK_IMPORT_MAX_BYTES:
+            raise NotebookImportError("The archive is too large to import")
+
+        node = self.root
+        for folder in parts[:-1]:
+            node = node.children.setdefault(folder, _Node(name=folder))
+        node = node.children.setdefault(stem, _Node(name=stem))
+        title, node.content = _parse_markdown(data.decode("utf-8-sig", errors="replace"))
+        node.title = title or stem
+
+
+def read_zip(file):
+    """Parse a zip archive (path or file object) into a page tree"""
+    tree = _Tree()
+    try:
+        with zipfile.ZipFile(file) as archive:
+            # Reads are bounded by the declared sizes, so this also stops zip bombs
+            if sum(info.file_size for info in archive.infolist()) > settings.NOTEBOOK_IMPORT_MAX_BYTES:
+                raise NotebookImportError("The archive is too large to import")
+            for info in archive.infolist():
+                if not info.is_dir():
+                    tree.add(info.filename, lambda info=info: archive.read(info))
+    except zipfile.BadZipFile:
+        raise NotebookImportError("The file is not a zip archive")
+    return tree
+
+
+def read_folder(path):
+    """Parse a folder tree of Markdown files into a page tree"""
+    tree = _Tree()
+    for directory, folders, files in os.walk(path):
+        folders.sort()
+        for name in sorted(files):
+            full_path = os.path.join(directory, name)
+
+            def read(full_path=full_path):
+                with open(full_path, "rb") as file:
+                    return file.read()
+
+            tree.add(os.path.relpath(full_path, path), read)
+    return tree
+
+
+def _unique_slug(title, taken):
+    base = slugify(title)[:200] or "untitled"
+    slug = base
+    suffix = 2
+    while slug in taken:
+        slug = f"{base}-{suffix}"
+        suffix += 1
+    taken.add(slug)
+    return slug
+
+
+def import_tree(tree, notebook, parent=None):
+    """
+    Insert a parsed page tree into ``notebook``, under ``parent`` or at the
+    root after the existing pages. Returns an ImportResult.
+    """
+    if not tree.root.children:
+        raise NotebookImportError("No Markdown files found")
+    started = time.monotonic()
+    siblings = Page.objects.filter(notebook_id=notebook.pk, parent=parent)
+    created = []
+    with transaction.atomic():
+        change_seq = Notebook.next_change_seq(notebook.pk)
+
+        # Top-level pages go after the existing siblings
+        taken = set(siblings.values_list('slug', flat=True))
+        last_key = max(siblings.values_list('index', flat=True), default=0)
+        if last_key + ordering.GAP * (len(tree.root.children) + 1) > ordering.MAX_KEY:
+            ordering.rebalance(siblings, 'index')
+            last_key = max(siblings.values_list('index', flat=True), default=0)
+
+        tree.root.page = parent
+        level = [(tree.root, last_key, taken)]
+        while level:
+            pages = []
+            next_level = []
+            for node, last_key, taken in level:
+                for position, name in enumerate(sorted(node.children), start=1):
+                    child = node.children[name]
+                    title = (child.title or child.name)[:TITLE_LENGTH]
+                    slug = _unique_slug(title, taken)
+                    child.page = Page(
+                        notebook_id=notebook.pk,
+                        parent=node.page,
+                        title=title,
+                        slug=slug,
+                        content=child.content,
+                        path=Page.build_path(node.page, slug),
+                        depth=node.page.depth + 1 if node.page else 0,
+                        index=last_key + position * ordering.GAP,
+                        has_children=bool(child.children),
+                        change_seq=change_seq,
+                    )
+                    child.page.update_reading_metadata()
+                    pages.append(child.page)
+                    next_level.append((child, 0, set()))
+            # Parents are inserted before their children, which need their ids
+            Page.objects.bulk_create(pages, batch_size=500)
+            created.extend(pages)
+            level = next_level
+
+        if parent is not None:
+            refresh_has_children([parent.pk], change_seq)
+        record_initial(PageRevision, {page.pk: page.content for page in created})
+        update_links([page for page in created if "[[" in page.content])
+        resolve_titles(notebook.pk, {page.title for page in created})
+        mark_missing(Page.objects.filter(pk__in=[page.pk for page in created]))
+        Notebook.bump_outline_version(notebook.pk)
+    return ImportResult(pages=len(created), seconds=time.monotonic() - started)
+
+
+def import_archive(file, notebook, parent=None):
+    """Import a zip archive (path or file object) into ``notebook``"""
+    return import_tree(read_zip(file), notebook, parent)
+
+
+def import_folder(path, notebook, parent=None):
+    """Import a folder tree of Markdown files into ``notebook``"""
+    return import_tree(read_folder(path), notebook, parent)
@@ -0,0 +1,160 @@
+"""
+Incremental index of links between pages.
+
+Page content can link to another page of the same notebook with
+``[[Page Title]]`` (or ``[[Page Title|label]]``) and to an article with
+``[[article:slug]]``. Instead of scanning content for backlinks, each save
+diffs the page's links against its PageLink rows and writes only the
+difference; backlinks and outgoing links are then one indexed query each.
+
+Links are matched case-insensitively on the title. A link to a title no
+page has yet is stored without a target and picked up when a page with that
+title is created or renamed, or an article with that slug is saved.
+"""
+import re
+from collections import defaultdict
+
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.functions import Lower
+
+from notebook.models import Page, PageLink
+
+LINK = re.compile(r"\[\[([^\[\]|\n]+)(?:\|[^\[\]\n]*)?\]\]")
+ARTICLE_PREFIX = "article:"
+MAX_KEY_LENGTH = PageLink._meta.get_field('target_key').max_length
+
+
+def link_key(target):
+    """Normalized form of a link target or page title"""
+    target = target.strip()
+    if target.lower().startswith(ARTICLE_PREFIX):
+        return ARTICLE_PREFIX + target[len(ARTICLE_PREFIX):].strip()
+    return target.lower()
+
+
+def parse_links(content):
+    """{key: text} of the links in ``content``, keeping the first spelling of each target"""
+    links = {}
+    for match in LINK.finditer(content or ""):
+        text = match.group(1).strip()
+        key = link_key(text)
+        if key and key != ARTICLE_PREFIX and len(key) <= MAX_KEY_LENGTH:
+            links.setdefault(key, text)
+    return links
+
+
+def _resolve(notebook_id, keys):
+    # {key: (page id, article id)} for the keys that have a target
+    from articles.models import Article
+
+    page_keys = [key for key in keys if not key.startswith(ARTICLE_PREFIX)]
+    slugs = {key[len(ARTICLE_PREFIX):]: key for key in keys if key.startswith(ARTICLE_PREFIX)}
+    targets = {}
+    if page_keys:
+        # Among pages sharing a title the oldest wins
+        pages = Page.objects.annotate(key=Lower('title')).filter(
+            notebook_id=notebook_id, key__in=page_keys
+        ).order_by('-id').values_list('key', 'id')
+        targets.update((key, (page_id, None)) for key, page_id in pages)
+    if slugs:
+        articles = Article.objects.filter(slug__in=slugs).values_list('slug', 'id')
+        targets.update((slugs[slug], (None, article_id)) for slug, article_id in articles)
+    return targets
+
+
+def update_links(pages):
+    """
+    Bring the PageLink rows of ``pages`` (with content loaded) in line with
+    their content. Returns the number of links added and removed.
+    """
+    pages = [page for page in pages if page.pk]
+    if not pages:
+        return 0
+    existing = defaultdict(set)
+    for source_id, key in PageLink.objects.filter(source__in=pages).values_list('source_id', 'target_key'):
+        existing[source_id].add(key)
+
+    removed = Q()
+    removed_count = 0
+    added = defaultdict(list)  # notebook id: [(page, key, text)]
+    for page in pages:
+        wanted = parse_links(page.content)
+        stale = existing[page.pk] - wanted.keys()
+        if stale:
+            removed |= Q(source_id=page.pk, target_key__in=stale)
+            removed_count += len(stale)
+        for key in wanted.keys() - existing[page.pk]:
+            added[page.notebook_id].append((page, key, wanted[key]))
+
+    if removed_count:
+        PageLink.objects.filter(removed).delete()
+    new_links = []
+    for notebook_id, links in added.items():
+        targets = _resolve(notebook_id, {key for _, key, _ in links})
+        for page, key, text in links:
+            page_id, article_id = targets.get(key, (None, None))
+            new_links.append(PageLink(
+                source_id=page.pk,
+                notebook_id=notebook_id,
+                target_key=key,
+                text=text[:MAX_KEY_LENGTH],
+                target_page_id=page_id,
+                target_article_id=article_id,
+            ))
+    PageLink.objects.bulk_create(new_links, batch_size=500, ignore_conflicts=True)
+    return removed_count + len(new_links)
+
+
+def relink_title(page, old_title=None):
+    """Point links at a page created or renamed from ``old_title`` (two statements at most)"""
+    if old_title is not None and link_key(old_title) != link_key(page.title):
+        # Links to the old title fall back to another page with it, if any
+        other = Page.objects.annotate(key=Lower('title')).filter(
+            notebook_id=page.notebook_id, key=OuterRef('target_key')
+        ).exclude(pk=page.pk).order_by('id').values('id')[:1]
+        PageLink.objects.filter(target_page=page).update(target_page=Subquery(other))
+    key = link_key(page.title)
+    if key.startswith(ARTICLE_PREFIX):
+        return
+    PageLink.objects.filter(notebook_id=page.notebook_id, target_key=key, target_page__isnull=True).update(
+        target_page=page
+    )
+
+
+def relink_titles(notebook_id, renamed):
+    """
+    Point links at pages of a notebook renamed in bulk, given ``(page,
+    old_title)`` pairs with the new titles saved (two statements)
+    """
+    moved = [page.pk for page, old_title in renamed if link_key(old_title) != link_key(page.title)]
+    if moved:
+        # Links to the old titles fall back to the oldest page still having them, if any
+        oldest = Page.objects.annotate(key=Lower('title')).filter(
+            notebook_id=notebook_id, key=OuterRef('target_key')
+        ).order_by('id').values('id')[:1]
+        PageLink.objects.filter(target_page__in=moved).update(target_page=Subquery(oldest))
+    return resolve_titles(notebook_id, [page.title for page, _ in renamed])
+
+
+def resolve_titles(notebook_id, titles):
+    """Point unresolved links at new pages with one of ``titles`` (one statement), e.g. after a bulk import"""
+    keys = {link_key(title) for title in titles} - {""}
+    keys = [key for key in keys if not key.startswith(ARTICLE_PREFIX)]
+    if not keys:
+        return 0
+    # Among pages sharing a title the oldest wins
+    oldest = Page.objects.annotate(key=Lower('title')).filter(
+        notebook_id=notebook_id, key=OuterRef('target_key')
+    ).order_by('id').values('id')[:1]
+    return PageLink.objects.filter(
+        notebook_id=notebook_id, target_key__in=keys, target_page__isnull=True
+    ).update(target_page=Subquery(oldest))
+
+
+def resolve_article(article):
+    """Point unresolved ``[[article:slug]]`` links at a new or renamed article (one statement)"""
+    if not article.slug:
+        return 0
+    return PageLink.objects.filter(
+        target_key=ARTICLE_PREFIX + article.slug, target_article__isnull=True
+    ).update(target_article=article)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from backend.reading import backfill
+from notebook.models import Page
+
+
+class Command(BaseCommand):
+    help = "Compute the table of contents, word count and reading time of existing pages (safe to re-run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notebook", help="Only update pages of the notebook with this slug")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        pages = Page.objects.all()
+        if options["notebook"]:
+            pages = pages.filter(notebook__slug=options["notebook"])
+
+        updated = backfill(pages, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Updated the reading metadata of {updated} pages"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from notebook.embeddings import mark_missing
+from notebook.models import Page
+
+
+class Command(BaseCommand):
+    help = "Queue embeddings for existing pages that don't have one (sent by the request-page-embeddings job)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notebook", help="Only pages of the notebook with this slug")
+
+    def handle(self, *args, **options):
+        pages = Page.objects.all()
+        if options["notebook"]:
+            pages = pages.filter(notebook__slug=options["notebook"])
+        marked = mark_missing(pages)
+        self.stdout.write(self.style.SUCCESS(f"Marked {marked} pages for embedding"))
@@ -0,0 +1,47 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from notebook.importer import NotebookImportError, import_archive, import_folder
+from notebook.models import Notebook
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Import a zip or folder tree of Markdown files as pages of a notebook"
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="A .zip archive or a folder")
+        parser.add_argument("--username", required=True, help="Owner of the notebook")
+        parser.add_argument("--notebook", help="Slug of an existing notebook to import into")
+        parser.add_argument("--name", help="Name of a new notebook (default: the source's name)")
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(username=options["username"])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' not found")
+
+        source = options["source"]
+        try:
+            # A new notebook isn't kept if the import fails
+            with transaction.atomic():
+                if options["notebook"]:
+                    notebook = Notebook.objects.filter(slug=options["notebook"], user=user).first()
+                    if notebook is None:
+                        raise CommandError(f"Notebook '{options['notebook']}' not found")
+                else:
+                    name = options["name"] or os.path.splitext(os.path.basename(source.rstrip("/")))[0]
+                    notebook = Notebook.objects.create(name=name, user=user)
+
+                if os.path.isdir(source):
+                    result = import_folder(source, notebook)
+                else:
+                    result = import_archive(source, notebook)
+        except (NotebookImportError, OSError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.pages} pages into {notebook.slug} in {result.seconds:.2f}s "
+            f"({result.pages_per_second:.0f} pages/s)"
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from notebook.links import update_links
+from notebook.models import Page
+
+
+class Command(BaseCommand):
+    help = "Build the [[...]] link index of existing pages (safe to re-run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notebook", help="Only index pages of the notebook with this slug")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        pages = Page.objects.filter(content__contains="[[").only("id", "notebook_id", "content").order_by("id")
+        if options["notebook"]:
+            pages = pages.filter(notebook__slug=options["notebook"])
+
+        changed = 0
+        batch = []
+        for page in pages.iterator(chunk_size=options["batch_size"]):
+            batch.append(page)
+            if len(batch) >= options["batch_size"]:
+                changed += update_links(batch)
+                batch = []
+        changed += update_links(batch)
+        self.stdout.write(self.style.SUCCESS(f"Added or removed {changed} page links"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from backend.ordering import rebalance_all
+from notebook.models import Notebook, Page
+
+
+class Command(BaseCommand):
+    help = "Renumber page indexes to evenly spaced keys within every parent"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notebook", help="Only rebalance the notebook with this slug")
+
+    def handle(self, *args, **options):
+        notebooks = Notebook.objects.all()
+        if options["notebook"]:
+            notebooks = notebooks.filter(slug=options["notebook"])
+
+        written = 0
+        for notebook_id in notebooks.values_list("id", flat=True).iterator():
+            # Renumbered pages are stamped with a new change sequence number
+            # so syncing clients pick up their indexes
+            with transaction.atomic():
+                notebook_written = rebalance_all(
+                    Page.objects.filter(notebook_id=notebook_id),
+                    "index",
+                    ["parent_id"],
+                    extra=lambda: {"change_seq": Notebook.next_change_seq(notebook_id)},
+                )
+                if notebook_written:
+                    # Indexes are part of cached outlines
+                    Notebook.bump_outline_version(notebook_id)
+            written += notebook_written
+        self.stdout.write(self.style.SUCCESS(f"Rebalanced {written} pages"))
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:37
+
+from django.db import migrations, models
+
+
+BACKFILL_PATHS = """
+WITH RECURSIVE tree AS (
+    SELECT id, '/' || slug AS path, 0 AS depth
+    FROM notebook_page
+    WHERE parent_id IS NULL
+    UNION ALL
+    SELECT child.id, tree.path || '/' || child.slug, tree.depth + 1
+    FROM notebook_page child
+    JOIN tree ON child.parent_id = tree.id
+)
+UPDATE notebook_page
+SET path = tree.path, depth = tree.depth
+FROM tree
+WHERE notebook_page.id = tree.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0004_page'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='path',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunSQL(BACKFILL_PATHS, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(fields=['notebook', 'path'], name='notebook_page_path_idx', opclasses=['int8_ops', 'text_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0005_page_materialized_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notebook',
+            name='outline_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:05
+
+from django.db import migrations
+
+
+# Spread existing sibling indexes to multiples of 1024 (backend.ordering.GAP)
+SPREAD_INDEXES = """
+UPDATE notebook_page
+SET index = ranked.position * 1024
+FROM (
+    SELECT id, row_number() OVER (PARTITION BY notebook_id, parent_id ORDER BY index, id) AS position
+    FROM notebook_page
+) AS ranked
+WHERE notebook_page.id = ranked.id AND notebook_page.index <> ranked.position * 1024;
+UPDATE notebook_notebook SET outline_version = outline_version + 1;
+"""
+
+COMPACT_INDEXES = """
+UPDATE notebook_page
+SET index = ranked.position
+FROM (
+    SELECT id, row_number() OVER (PARTITION BY notebook_id, parent_id ORDER BY index, id) AS position
+    FROM notebook_page
+) AS ranked
+WHERE notebook_page.id = ranked.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0006_notebook_outline_version'),
+    ]
+
+    operations = [
+        migrations.RunSQL(SPREAD_INDEXES, COMPACT_INDEXES),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Existing pages become version 1 of their notebook, so clients syncing from
+# version 0 receive them
+STAMP_EXISTING_PAGES = """
+UPDATE notebook_page SET change_seq = 1;
+UPDATE notebook_notebook n SET change_seq = 1
+WHERE EXISTS (SELECT 1 FROM notebook_page p WHERE p.notebook_id = n.id);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0007_sparse_page_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_id', models.BigIntegerField()),
+                ('path', models.TextField()),
+                ('change_seq', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notebook',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notebook',
+            name='sync_horizon',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(STAMP_EXISTING_PAGES, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(fields=['notebook', 'change_seq'], name='notebook_page_change_seq_idx'),
+        ),
+        migrations.AddField(
+            model_name='pagetombstone',
+            name='notebook',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to='notebook.notebook'),
+        ),
+        migrations.AddIndex(
+            model_name='pagetombstone',
+            index=models.Index(fields=['notebook', 'change_seq'], name='notebook_tombstone_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagetombstone',
+            index=models.Index(fields=['deleted_at'], name='notebook_tombstone_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:59
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0015_draft_revisions'),
+        ('notebook', '0009_page_revisions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_key', models.CharField(max_length=255)),
+                ('text', models.CharField(max_length=255)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(models.F('notebook'), django.db.models.functions.text.Lower('title'), name='notebook_page_title_idx'),
+        ),
+        migrations.AddField(
+            model_name='pagelink',
+            name='notebook',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_links', to='notebook.notebook'),
+        ),
+        migrations.AddField(
+            model_name='pagelink',
+            name='source',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_links', to='notebook.page'),
+        ),
+        migrations.AddField(
+            model_name='pagelink',
+            name='target_article',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='page_links', to='articles.article'),
+        ),
+        migrations.AddField(
+            model_name='pagelink',
+            name='target_page',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='incoming_links', to='notebook.page'),
+        ),
+        migrations.AddIndex(
+            model_name='pagelink',
+            index=models.Index(fields=['notebook', 'target_key'], name='notebook_page_link_key_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='pagelink',
+            constraint=models.UniqueConstraint(fields=('source', 'target_key'), name='notebook_page_link_uniq'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:05
+
+import django.db.models.deletion
+import pgvector.django.indexes
+import pgvector.django.vector
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0011_page_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageEmbedding',
+            fields=[
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='embedding', serialize=False, to='notebook.page')),
+                ('embedding', pgvector.django.vector.VectorField(dimensions=768, null=True)),
+                ('embedded_hash', models.CharField(blank=True, max_length=64)),
+                ('requested_hash', models.CharField(blank=True, max_length=64)),
+                ('stale', models.BooleanField(default=True)),
+                ('stale_since', models.DateTimeField(null=True)),
+                ('changed_at', models.DateTimeField(null=True)),
+                ('requested_at', models.DateTimeField(null=True)),
+                ('notebook', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_embeddings', to='notebook.notebook')),
+            ],
+            options={
+                'indexes': [pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['embedding'], m=16, name='notebook_page_embedding_idx', opclasses=['vector_cosine_ops']), models.Index(condition=models.Q(('stale', True)), fields=['stale_since'], name='notebook_embedding_stale_idx'), models.Index(fields=['notebook'], name='notebook_embedding_nb_idx')],
+            },
+        ),
+    ]
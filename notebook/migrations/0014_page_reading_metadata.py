@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0013_notebook_exports'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='toc',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0018_analytics_flush'),
+        ('notebook', '0014_page_reading_metadata'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pagelink',
+            index=models.Index(condition=models.Q(('target_article__isnull', True), ('target_key__startswith', 'article:')), fields=['target_key'], name='notebook_page_link_article_idx'),
+        ),
+    ]
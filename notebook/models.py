@@ -1,5 +1,13 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.db.models.functions import Left, Lower
+from pgvector.django import HnswIndex, VectorField
 from django.utils.text import slugify
+from backend import ordering
+from backend.reading import ReadingMetadata
+from backend.revisions import Revision, record as record_revision
 from users.models import CustomUser
 
 # Create your models here.
@@ -12,6 +20,34 @@ class Notebook(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     cover = models.ImageField(upload_to='notebook_covers/', blank=True, null=True)
+    # Bumped whenever pages are added, removed, moved, reordered or renamed;
+    # cached outlines are keyed by it (see notebook.outline)
+    outline_version = models.PositiveIntegerField(default=0)
+    # Incremented for every page write; each written page and tombstone is
+    # stamped with the new value so clients can sync changes since a version
+    # (see notebook.sync)
+    change_seq = models.PositiveBigIntegerField(default=0)
+    # Tombstones up to this change_seq have been pruned
+    sync_horizon = models.PositiveBigIntegerField(default=0)
+
+    @staticmethod
+    def bump_outline_version(notebook_id):
+        Notebook.objects.filter(pk=notebook_id).update(outline_version=F('outline_version') + 1)
+
+    @staticmethod
+    def next_change_seq(notebook_id):
+        """
+        Allocate the next change sequence number of a notebook. Must run in a
+        transaction: the notebook row stays locked until commit, so changes
+        become visible in sequence order.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE "{Notebook._meta.db_table}" SET "change_seq" = "change_seq" + 1 '
+                'WHERE "id" = %s RETURNING "change_seq"',
+                [notebook_id],
+            )
+            return cursor.fetchone()[0]
 
     def get_index_page(self):
         root_page = self.pages.filter(parent=None).first()
@@ -24,6 +60,14 @@ class Notebook(models.Model):
         if self.pk:
             self.slug = self.generate_unique_slug()
         
+        # Never write back possibly stale counters; they are only changed
+        # through bump_outline_version(), next_change_seq() and tombstone pruning
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in ('outline_version', 'change_seq', 'sync_horizon')
+            ]
+        
         # Call the parent save method
         super().save(*args, **kwargs)
         
@@ -32,6 +76,18 @@ class Notebook(models.Model):
             self.slug = self.generate_unique_slug()
             super().save(update_fields=['slug'])
     
+    def delete(self, *args, **kwargs):
+        # Remove the pages with set-based SQL first so the cascade collector
+        # doesn't load every page of a large notebook
+        from notebook.hierarchy import delete_notebook_pages
+
+        with transaction.atomic():
+            pages_deleted = delete_notebook_pages(self)
+            deleted, per_model = super().delete(*args, **kwargs)
+        if pages_deleted:
+            per_model[Page._meta.label] = pages_deleted
+        return deleted + pages_deleted, per_model
+
     def generate_unique_slug(self):
         slug = ""
         if self.name:
@@ -45,7 +101,13 @@ class Notebook(models.Model):
         return self.name
 
 
-class Page(models.Model):
+class PageManager(models.Manager):
+    def get_queryset(self):
+        # The search vector is only read by the database
+        return super().get_queryset().defer('search_vector')
+
+
+class Page(ReadingMetadata):
     slug = models.SlugField(max_length=255)
     title = models.CharField(max_length=255)
     content = models.TextField(blank=True)
@@ -55,81 +117,334 @@ class Page(models.Model):
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name="children")
     index = models.PositiveIntegerField(default=0)
     has_children = models.BooleanField(default=False)
+    # Materialized path of slugs from the root, e.g. "/guide/setup", kept in
+    # sync with ``parent`` and ``slug`` by save(). Root pages have depth 0.
+    path = models.TextField(default="", editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+    # Notebook.change_seq of the last write to this page
+    change_seq = models.PositiveBigIntegerField(default=0, editable=False)
+    # Maintained by Postgres on every write; titles rank above content
+    # (see notebook.search). Only the start of very long content is indexed,
+    # as a tsvector can't exceed 1MB.
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config='english')
+            + SearchVector(Left('content', 500_000), weight='B', config='english')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = PageManager()
 
     class Meta:
+        # Sparse order keys (see backend.ordering); a reorder rewrites only the moved page
         ordering = ['index']
-        unique_together = [['notebook', 'parent', 'index']]  # Ensure unique index within same parent
+        indexes = [
+            # text_pattern_ops serves both exact path lookups and prefix (subtree) scans
+            models.Index(
+                fields=['notebook', 'path'],
+                name='notebook_page_path_idx',
+                opclasses=['int8_ops', 'text_pattern_ops'],
+            ),
+            models.Index(fields=['notebook', 'change_seq'], name='notebook_page_change_seq_idx'),
+            # Resolves [[Title]] links (see notebook.links)
+            models.Index(F('notebook'), Lower('title'), name='notebook_page_title_idx'),
+            GinIndex(fields=['search_vector'], name='notebook_page_search_idx'),
+        ]
+
+    # Fields save() compares against their stored values
+    TRACKED_FIELDS = ('notebook_id', 'title', 'parent_id', 'path', 'depth', 'index')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_stored_values()
+        return instance
+
+    def _remember_stored_values(self):
+        # Snapshot used by save() instead of re-reading the row
+        loaded = self.__dict__
+        if all(name in loaded for name in self.TRACKED_FIELDS):
+            self._stored = Page(pk=self.pk, **{name: loaded[name] for name in self.TRACKED_FIELDS})
+        else:
+            self._stored = None
+        self._stored_content = loaded.get('content', self._stored_content_unknown)
+
+    _stored_content_unknown = object()
+
+    @staticmethod
+    def build_path(parent, slug):
+        return f"{parent.path if parent else ''}/{slug}"
+
+    def ancestors(self):
+        """Pages from the root down to this page's parent, in one query"""
+        parts = self.path.strip("/").split("/")[:-1]
+        prefixes = ["/" + "/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+        if not prefixes:
+            return Page.objects.none()
+        return Page.objects.filter(notebook_id=self.notebook_id, path__in=prefixes).order_by('depth')
+
+    def descendants(self):
+        """Every page below this one, at any depth"""
+        return Page.objects.filter(notebook_id=self.notebook_id, path__startswith=self.path + "/")
+
+    def is_descendant_of(self, page):
+        return self.notebook_id == page.notebook_id and self.path.startswith(page.path + "/")
     
-    def get_next_index(self):
-        """Get the next available index for this page's siblings"""
-        siblings = Page.objects.filter(notebook=self.notebook, parent=self.parent)
+    def get_siblings(self):
+        siblings = Page.objects.filter(notebook_id=self.notebook_id, parent_id=self.parent_id)
         if self.pk:
             siblings = siblings.exclude(pk=self.pk)
-        
-        max_index = siblings.aggregate(models.Max('index'))['index__max']
-        return (max_index or 0) + 1
+        return siblings
+
+    def _stamp_change(self):
+        # Siblings renumbered by ordering.rebalance are changes clients must sync
+        return {'change_seq': Notebook.next_change_seq(self.notebook_id)}
+
+    def get_next_index(self):
+        """Get the next available index for this page's siblings"""
+        return ordering.append_key(self.get_siblings(), 'index', extra=self._stamp_change)
     
+    def position_index(self, after_id=None, before_id=None):
+        """
+        Index placing this page among the siblings under its current parent
+        right after ``after_id``, right before ``before_id``, or first
+        """
+        try:
+            return ordering.move_key(
+                self.get_siblings(), 'index', after_id=after_id, before_id=before_id, extra=self._stamp_change
+            )
+        except Page.DoesNotExist:
+            raise ValueError("Target page not found in the same parent")
+
     def reorder_after(self, target_page_id=None):
         """Reorder this page to come after the target page, or at the beginning if target_page_id is None"""
-        if target_page_id:
-            try:
-                target_page = Page.objects.get(id=target_page_id, notebook=self.notebook, parent=self.parent)
-                new_index = target_page.index + 1
-            except Page.DoesNotExist:
-                raise ValueError("Target page not found in the same parent")
-        else:
-            new_index = 1
-        
-        # Shift existing pages to make room
-        Page.objects.filter(
-            notebook=self.notebook,
-            parent=self.parent,
-            index__gte=new_index
-        ).exclude(id=self.id).update(index=models.F('index') + 1)
-        
-        self.index = new_index
+        self.index = self.position_index(after_id=target_page_id)
         self.save()
     
     def reorder_before(self, target_page_id):
         """Reorder this page to come before the target page"""
-        try:
-            target_page = Page.objects.get(id=target_page_id, notebook=self.notebook, parent=self.parent)
-            new_index = target_page.index
-        except Page.DoesNotExist:
-            raise ValueError("Target page not found in the same parent")
-        
-        # Shift existing pages to make room
-        Page.objects.filter(
-            notebook=self.notebook,
-            parent=self.parent,
-            index__gte=new_index
-        ).exclude(id=self.id).update(index=models.F('index') + 1)
-        
-        self.index = new_index
+        self.index = self.position_index(before_id=target_page_id)
         self.save()
     
-    def save(self, *args, **kwargs):
-        if self.pk is None and self.parent is not None:
-            self.parent.has_children = True
-            self.parent.save()
+    def save(self, *args, keep_index=False, **kwargs):
+        """
+        ``keep_index`` keeps the index of a page moved to another parent
+        (e.g. set with position_index) instead of placing it last
+        """
         if self.pk is None and self.index == 0:  # Check if it's a new object
             self.index = self.get_next_index()
+        original = None
         if self.pk:
-            original = Page.objects.get(pk=self.pk)
+            original = getattr(self, '_stored', None)
+            if original is None:
+                original = Page.objects.only('notebook', 'title', 'parent', 'path', 'depth', 'index').get(pk=self.pk)
             if original.title != self.title:
                 self.slug = slugify(self.title)
+            if original.parent_id != self.parent_id and not keep_index:
+                # Moved pages go last among their new siblings
+                self.index = self.get_next_index()
         else:
             self.slug = slugify(self.title)
-            if Page.objects.filter(slug=self.slug, parent = self.parent).exists():
+
+        self.path = self.build_path(self.parent, self.slug)
+        self.depth = self.parent.depth + 1 if self.parent else 0
+        moved = original is not None and original.path != self.path
+        if original is None or moved:
+            siblings = Page.objects.filter(notebook_id=self.notebook_id, path=self.path)
+            if self.pk:
+                siblings = siblings.exclude(pk=self.pk)
+            if siblings.exists():
                 raise ValueError("A page with this slug already exists.")
-        super(Page, self).save(*args, **kwargs)
-    
+        if moved and self.parent_id and self.is_descendant_of(original):
+            raise ValueError("Cannot move a page under one of its own descendants.")
+
+        update_fields = kwargs.get('update_fields')
+        content_written = 'content' in self.__dict__ and (update_fields is None or 'content' in update_fields)
+        content_changed = content_written and self.content != getattr(
+            self, '_stored_content', self._stored_content_unknown
+        )
+        if content_changed:
+            self.update_reading_metadata()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *self.READING_FIELDS}
+
+        from notebook import embeddings, links
+        from notebook.hierarchy import refresh_has_children, reroot_descendants
+
+        with transaction.atomic():
+            self.change_seq = Notebook.next_change_seq(self.notebook_id)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq'}
+            super(Page, self).save(*args, **kwargs)
+            # Number of descendants whose path was rewritten by this save
+            self.rerooted_count = 0
+            if moved:
+                self.rerooted_count = reroot_descendants(self, original.path, original.depth)
+            if original is None or moved or original.title != self.title or original.index != self.index:
+                Notebook.bump_outline_version(self.notebook_id)
+            if original is None or original.parent_id != self.parent_id:
+                refresh_has_children(
+                    [original.parent_id if original else None, self.parent_id], self.change_seq
+                )
+                if self.parent is not None:
+                    self.parent.has_children = True
+            embedding_stale = False
+            if content_changed:
+                if self.content or original is not None:
+                    record_revision(PageRevision, self.pk, self.content)
+                    links.update_links([self])
+                    embedding_stale = True
+            if original is None or original.title != self.title:
+                links.relink_title(self, original.title if original else None)
+                embedding_stale = True
+            if embedding_stale:
+                embeddings.mark_stale([self])
+        self._remember_stored_values()
+
+    def get_embedding_text(self):
+        """Get the text that should be used for embedding generation."""
+        combined_text = f"Title: {self.title}\n\n" if self.title else ""
+        if self.content:
+            combined_text += f"Content: {self.content}"
+        return combined_text.strip()
+
     def delete(self, *args, **kwargs):
-        parent = self.parent
-        super(Page, self).delete(*args, **kwargs)
-        if parent:
-            parent.has_children = parent.children.exists()
-            parent.save(update_fields=['has_children'])
+        """Delete the page and its whole subtree with set-based SQL (see notebook.hierarchy)"""
+        from notebook.hierarchy import delete_subtree
+
+        deleted = delete_subtree(self)
+        return deleted, {self._meta.label: deleted}
     
     def __str__(self):
         return self.title
+
+
+class PageRevision(Revision):
+    """A stored version of a page's content (see backend.revisions)"""
+    page = models.ForeignKey(Page, on_delete=models.CASCADE, related_name="revisions")
+
+    owner_field = 'page'
+
+    class Meta(Revision.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['page', 'number'], name='notebook_page_revision_number_uniq'),
+        ]
+
+
+class PageTombstone(models.Model):
+    """Record of a deleted page, kept so syncing clients learn about the deletion"""
+    notebook = models.ForeignKey(Notebook, on_delete=models.CASCADE, related_name="tombstones")
+    page_id = models.BigIntegerField()
+    path = models.TextField()
+    change_seq = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['notebook', 'change_seq'], name='notebook_tombstone_seq_idx'),
+            models.Index(fields=['deleted_at'], name='notebook_tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.path} (deleted)"
+
+
+class PageLink(models.Model):
+    """
+    A ``[[Title]]`` or ``[[article:slug]]`` link in a page's content, kept in
+    sync by Page.save (see notebook.links). The target is resolved when the
+    link is written, when pages are created or renamed and when articles are
+    saved; links to pages that don't exist (yet) have no target.
+    """
+    source = models.ForeignKey(Page, on_delete=models.CASCADE, related_name="outgoing_links")
+    notebook = models.ForeignKey(Notebook, on_delete=models.CASCADE, related_name="page_links")
+    # Normalized target: the lowercased page title, or "article:<slug>"
+    target_key = models.CharField(max_length=255)
+    text = models.CharField(max_length=255)  # The target as first written
+    target_page = models.ForeignKey(
+        Page, on_delete=models.SET_NULL, null=True, blank=True, related_name="incoming_links"
+    )
+    target_article = models.ForeignKey(
+        "articles.Article", on_delete=models.SET_NULL, null=True, blank=True, related_name="page_links"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'target_key'], name='notebook_page_link_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['notebook', 'target_key'], name='notebook_page_link_key_idx'),
+            # Unresolved article links, looked up by slug when an article is saved
+            models.Index(
+                fields=['target_key'],
+                condition=models.Q(target_key__startswith='article:', target_article__isnull=True),
+                name='notebook_page_link_article_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.source_id} -> {self.text}"
+
+
+class PageEmbedding(models.Model):
+    """
+    Embedding of a page's title and content, kept apart from Page so page
+    reads never load vectors. Edits mark it stale and the
+    request-page-embeddings job refreshes stale embeddings in debounced
+    batches (see notebook.embeddings).
+    """
+    page = models.OneToOneField(Page, on_delete=models.CASCADE, primary_key=True, related_name="embedding")
+    notebook = models.ForeignKey(Notebook, on_delete=models.CASCADE, related_name="page_embeddings")
+    embedding = VectorField(dimensions=768, null=True)
+    # content_hash of the embedded text, and of the text last sent to the worker
+    embedded_hash = models.CharField(max_length=64, blank=True)
+    requested_hash = models.CharField(max_length=64, blank=True)
+    stale = models.BooleanField(default=True)
+    # First and latest edit since the embedding was last requested
+    stale_since = models.DateTimeField(null=True)
+    changed_at = models.DateTimeField(null=True)
+    requested_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            HnswIndex(
+                name='notebook_page_embedding_idx',
+                fields=['embedding'],
+                m=16,
+                ef_construction=64,
+                opclasses=['vector_cosine_ops'],
+            ),
+            models.Index(
+                fields=['stale_since'], name='notebook_embedding_stale_idx', condition=models.Q(stale=True)
+            ),
+            models.Index(fields=['notebook'], name='notebook_embedding_nb_idx'),
+        ]
+
+    def __str__(self):
+        return f"Embedding of page {self.page_id}"
+
+
+class NotebookExport(models.Model):
+    """A zip export of a notebook built in the background (see notebook.export)"""
+    PENDING = "PE"
+    RUNNING = "RU"
+    DONE = "DO"
+    FAILED = "FA"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+    notebook = models.ForeignKey(Notebook, on_delete=models.CASCADE, related_name="exports")
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    status = models.CharField(max_length=2, choices=STATUS_CHOICES, default=PENDING)
+    file = models.FileField(upload_to='notebook_exports/', blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Export of {self.notebook_id} ({self.get_status_display()})"
@@ -0,0 +1,239 @@
+"""
+Whole-notebook outline for sidebars.
+
+The outline is read with a single query that skips page content, assembled
+into a tree in one pass and cached under the notebook's ``outline_version``,
+which every structural change bumps, so stale entries are never served and
+don't need to be deleted. Batches of outline edits from the sidebar are
+applied by ``apply_outline_changes``.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from backend import ordering
+from notebook import embeddings, links
+from notebook.models import Notebook, Page
+
+
+def _cache_key(notebook, max_depth):
+    depth = "all" if max_depth is None else max_depth
+    return f"notebook:outline:{notebook.id}:{notebook.outline_version}:{depth}"
+
+
+def build_outline(notebook, max_depth=None):
+    """
+    Return the root pages as nested dicts (``children`` holding sub-pages),
+    siblings ordered by index.
+    """
+    qs = Page.objects.filter(notebook=notebook)
+    if max_depth is not None:
+        qs = qs.filter(depth__lte=max_depth)
+    rows = qs.order_by('index', 'id').values_list(
+        'id', 'parent_id', 'slug', 'title', 'index', 'path', 'depth', 'has_children'
+    )
+
+    nodes = {}
+    for id, parent_id, slug, title, index, path, depth, has_children in rows:
+        nodes[id] = {
+            "id": id,
+            "parent_id": parent_id,
+            "slug": slug,
+            "title": title,
+            "index": index,
+            "path": path,
+            "depth": depth,
+            "has_children": has_children,
+            "children": [],
+        }
+
+    # Rows come ordered by index, so appending keeps every sibling list sorted
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node["parent_id"])
+        if parent is not None:
+            parent["children"].append(node)
+        elif node["parent_id"] is None:
+            roots.append(node)
+    return roots
+
+
+def get_outline(notebook, max_depth=None):
+    key = _cache_key(notebook, max_depth)
+    try:
+        outline = cache.get(key)
+    except Exception as e:
+        print(f"Failed to read outline cache for notebook {notebook.id}: {str(e)}")
+        outline = None
+    if outline is not None:
+        return outline
+
+    outline = build_outline(notebook, max_depth)
+    try:
+        cache.set(key, outline, settings.NOTEBOOK_OUTLINE_CACHE_TIMEOUT)
+    except Exception as e:
+        print(f"Failed to cache outline for notebook {notebook.id}: {str(e)}")
+    return outline
+
+
+MAX_OUTLINE_OPS = 500
+
+
+class OutlineChangeError(ValueError):
+    pass
+
+
+def apply_outline_changes(notebook, ops):
+    """
+    Apply a batch of moves, renames and reorders to a notebook's page tree.
+
+    ``ops`` is a list of dicts with ``page_id`` and any of ``title``,
+    ``parent_id`` (present with None to move to the root), ``insert_after_page_id``
+    and ``insert_before_page_id``. Every op is validated against an in-memory
+    copy of the tree (loaded with one query, without content) and the changed
+    rows are written with a single bulk_update, all in one transaction.
+    Returns ``(outline_version, updated_pages)``; raises OutlineChangeError and
+    writes nothing if any op is invalid.
+    """
+    if len(ops) > MAX_OUTLINE_OPS:
+        raise OutlineChangeError(f"At most {MAX_OUTLINE_OPS} changes can be applied at once")
+
+    with transaction.atomic():
+        # Serializes structural changes to this notebook
+        locked = Notebook.objects.select_for_update().only('id', 'outline_version').get(pk=notebook.pk)
+        pages = {
+            page.id: page
+            for page in Page.objects.filter(notebook=locked).only(
+                'id', 'notebook_id', 'parent_id', 'slug', 'title', 'index', 'path', 'depth', 'has_children'
+            )
+        }
+        children = defaultdict(set)
+        for page in pages.values():
+            children[page.parent_id].add(page.id)
+
+        changed = set()
+        touched = set()  # Pages named by an op
+        reroot = set()  # Pages whose path must be recomputed with their subtree
+        old_parents = set()
+        old_titles = {}  # Renamed pages: title before the first rename
+
+        def get(page_id, label="Page"):
+            page = pages.get(int(page_id))
+            if page is None:
+                raise OutlineChangeError(f"{label} {page_id} not found in this notebook")
+            return page
+
+        def siblings(page):
+            return [pages[sibling_id] for sibling_id in children[page.parent_id] if sibling_id != page.id]
+
+        def renumber(nodes):
+            for position, node in enumerate(sorted(nodes, key=lambda n: (n.index, n.id)), start=1):
+                if node.index != position * ordering.GAP:
+                    node.index = position * ordering.GAP
+                    changed.add(node.id)
+
+        def place(page, after=None, before=None, append=False):
+            for _ in range(2):
+                others = siblings(page)
+                keys = sorted(node.index for node in others)
+                if append:
+                    key = ordering.key_between(keys[-1] if keys else None, None)
+                elif before is not None:
+                    lower = [k for k in keys if k < before.index]
+                    key = ordering.key_between(lower[-1] if lower else None, before.index)
+                else:
+                    low = after.index if after is not None else None
+                    higher = [k for k in keys if low is None or k > low]
+                    key = ordering.key_between(low, higher[0] if higher else None)
+                if key is not None:
+                    page.index = key
+                    changed.add(page.id)
+                    return
+                renumber(others)
+            raise OutlineChangeError("Could not find room to reorder the page")
+
+        for op in ops:
+            page = get(op["page_id"])
+            touched.add(page.id)
+
+            if "parent_id" in op and op["parent_id"] != page.parent_id:
+                parent = get(op["parent_id"], "Parent page") if op["parent_id"] is not None else None
+                ancestor = parent
+                while ancestor is not None:
+                    if ancestor.id == page.id:
+                        raise OutlineChangeError("Cannot move page: would create circular reference")
+                    ancestor = pages.get(ancestor.parent_id)
+                children[page.parent_id].discard(page.id)
+                old_parents.add(page.parent_id)
+                page.parent_id = parent.id if parent else None
+                children[page.parent_id].add(page.id)
+                place(page, append=True)
+                reroot.add(page.id)
+
+            if op.get("title") is not None and op["title"] != page.title:
+                old_titles.setdefault(page.id, page.title)
+                page.title = op["title"]
+                page.slug = slugify(op["title"])
+                changed.add(page.id)
+                reroot.add(page.id)
+
+            after_id, before_id = op.get("insert_after_page_id"), op.get("insert_before_page_id")
+            if after_id is not None and before_id is not None:
+                raise OutlineChangeError("Cannot specify both insert_after_page_id and insert_before_page_id")
+            if after_id is not None or before_id is not None:
+                target = get(after_id if after_id is not None else before_id, "Target page")
+                if target.parent_id != page.parent_id or target.id == page.id:
+                    raise OutlineChangeError("Target page not found in the same parent")
+                if after_id is not None:
+                    place(page, after=target)
+                else:
+                    place(page, before=target)
+
+        # Recompute materialized paths top-down for every re-rooted subtree
+        stack = sorted(reroot, key=lambda page_id: pages[page_id].depth, reverse=True)
+        while stack:
+            page = pages[stack.pop()]
+            parent = pages.get(page.parent_id)
+            path = Page.build_path(parent, page.slug)
+            depth = parent.depth + 1 if parent else 0
+            if path != page.path or depth != page.depth:
+                page.path, page.depth = path, depth
+                changed.add(page.id)
+                stack.extend(children[page.id])
+
+        by_path = defaultdict(list)
+        for page in pages.values():
+            by_path[page.path].append(page.id)
+        for page_id in changed:
+            if len(by_path[pages[page_id].path]) > 1:
+                raise OutlineChangeError(f"A page with the path '{pages[page_id].path}' already exists")
+
+        for parent_id in old_parents | {pages[page_id].parent_id for page_id in reroot}:
+            parent = pages.get(parent_id)
+            if parent is not None and parent.has_children != bool(children[parent_id]):
+                parent.has_children = bool(children[parent_id])
+                changed.add(parent.id)
+
+        if not changed:
+            return locked.outline_version, 0
+
+        change_seq = Notebook.next_change_seq(locked.pk)
+        for page_id in changed:
+            pages[page_id].change_seq = change_seq
+        Page.objects.bulk_update(
+            [pages[page_id] for page_id in changed],
+            ['parent', 'title', 'slug', 'index', 'path', 'depth', 'has_children', 'change_seq'],
+            batch_size=1000,
+        )
+        Page.objects.filter(id__in=touched & changed).update(updated_at=timezone.now())
+        renamed = [(pages[page_id], title) for page_id, title in old_titles.items() if pages[page_id].title != title]
+        if renamed:
+            links.relink_titles(locked.pk, renamed)
+            # Titles are part of the embedded text
+            embeddings.mark_stale([page for page, _ in renamed])
+        Notebook.bump_outline_version(locked.pk)
+    return locked.outline_version + 1, len(changed)
@@ -2,11 +2,36 @@ import strawberry
 from typing import List, Optional, Union, Annotated
 from strawberry.types import Info
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from graphql import GraphQLError
 
 from notebook.models import Notebook, Page
-from notebook.types import NotebookType, PageType
+from notebook.types import (
+    NotebookType,
+    PageType,
+    NotebookOutline,
+    OutlineNode,
+    OutlineChangeInput,
+    OutlineChangeResult,
+    NotebookChanges,
+    PageTombstoneType,
+    PageSearchConnection,
+    PageSearchHit,
+    SimilarPage,
+)
+from notebook.outline import OutlineChangeError, apply_outline_changes, get_outline
+from notebook.hierarchy import move_subtree
+from notebook.clone import clone_notebook
+from notebook.sync import MAX_SYNC_CHANGES, changes_since
+from notebook.search import MAX_SEARCH_RESULTS, search_pages
+from notebook.embeddings import EmbeddingUnavailable, allow_query, embed_query, nearest_pages, similar_pages
+from notebook import autosave as page_autosave
+from notebook.types.page import PAGE_HEAVY_FIELDS
+from backend.resolver_cache import cached_field
+from backend.selection import defer_unselected, unselected
+from backend.types import ContentPatchInput
 from notebook.enums import NotebookSortBy
+from notebook.utils import get_page_by_path
 
 
 @strawberry.type
@@ -34,11 +59,25 @@ class NotebookList:
 class NotebookDeleteSuccess:
     success: bool
     message: str
+    affected_rows: Optional[int] = None  # Pages removed
+
+
+@strawberry.type
+class NotebookCloneSuccess:
+    notebook: NotebookType
+    affected_rows: int  # Pages copied
+
+
+@strawberry.type
+class PageMoveSuccess:
+    page: PageType
+    affected_rows: int  # The page plus every descendant whose path changed
 
 
 @strawberry.type
 class NotebookQuery:
     @strawberry.field
+    @cached_field(ttl=30, stale=5 * 60)
     def notebooks(
         self,
         info: Info,
@@ -144,8 +183,8 @@ class NotebookQuery:
             else:
                 filter_dict["parent"] = None  # Root pages
             
-            pages = Page.objects.filter(**filter_dict).order_by('index')[:limit]
-            return list(pages)
+            pages = Page.objects.filter(**filter_dict).order_by('index')
+            return list(defer_unselected(pages, info, PAGE_HEAVY_FIELDS)[:limit])
             
         except (Notebook.DoesNotExist, ValueError, IndexError):
             raise GraphQLError(f"Notebook with slug '{notebook_slug}' not found")
@@ -169,16 +208,8 @@ class NotebookQuery:
                 except Page.DoesNotExist:
                     raise GraphQLError(f"No pages found in notebook '{notebook_slug}'")
             
-            # Navigate to page using path
-            path_parts = [p for p in page_path.split("/") if p]
-            page = None
-            
-            for slug in path_parts:
-                page = Page.objects.get(
-                    notebook=notebook, 
-                    parent=page, 
-                    slug=slug
-                )
+            # Resolve the page with a single lookup on its materialized path
+            page = get_page_by_path(notebook, page_path)
             
             if page is None:
                 raise GraphQLError(f"Page not found at path '{page_path}'")
@@ -188,6 +219,59 @@ class NotebookQuery:
         except (Notebook.DoesNotExist, Page.DoesNotExist, ValueError, IndexError):
             raise GraphQLError(f"Page not found at path '{page_path}' in notebook '{notebook_slug}'")
 
+    @strawberry.field
+    def notebook_outline(
+        self,
+        info: Info,
+        slug: str,
+        max_depth: Optional[int] = None,
+    ) -> NotebookOutline:
+        """Get the whole page tree of a notebook (without content) in one round trip"""
+        try:
+            notebook_id = slug.split("-")[-1]
+            notebook = Notebook.objects.only('id', 'outline_version').get(id=notebook_id)
+        except (Notebook.DoesNotExist, ValueError, IndexError):
+            raise GraphQLError(f"Notebook with slug '{slug}' not found")
+        
+        outline = get_outline(notebook, max_depth)
+        return NotebookOutline(
+            version=notebook.outline_version,
+            pages=[OutlineNode.from_dict(node) for node in outline],
+        )
+
+    @strawberry.field
+    def notebook_changes(
+        self,
+        info: Info,
+        slug: str,
+        since_version: int = 0,
+        limit: int = MAX_SYNC_CHANGES,
+    ) -> NotebookChanges:
+        """Get the pages created, updated, moved or deleted since a version of the notebook"""
+        try:
+            notebook_id = slug.split("-")[-1]
+            notebook = Notebook.objects.only('id', 'change_seq', 'sync_horizon').get(id=notebook_id)
+        except (Notebook.DoesNotExist, ValueError, IndexError):
+            raise GraphQLError(f"Notebook with slug '{slug}' not found")
+
+        pages = defer_unselected(Page.objects.all(), info, PAGE_HEAVY_FIELDS, path=("pages",))
+        changes = changes_since(notebook, since_version, max(1, min(limit, MAX_SYNC_CHANGES)), pages)
+        return NotebookChanges(
+            version=changes.version,
+            pages=changes.pages,
+            deleted_pages=[
+                PageTombstoneType(
+                    page_id=tombstone.page_id,
+                    path=tombstone.path,
+                    change_seq=tombstone.change_seq,
+                    deleted_at=tombstone.deleted_at,
+                )
+                for tombstone in changes.tombstones
+            ],
+            has_more=changes.has_more,
+            full_resync_required=changes.full_resync_required,
+        )
+
     @strawberry.field
     def sidebar_pages(
         self,
@@ -202,7 +286,8 @@ class NotebookQuery:
             notebook = Notebook.objects.get(id=notebook_id)
             
             # Get all root pages
-            root_pages = list(Page.objects.filter(notebook=notebook, parent=None).order_by('index'))
+            root_pages = Page.objects.filter(notebook=notebook, parent=None).order_by('index')
+            root_pages = list(defer_unselected(root_pages, info, PAGE_HEAVY_FIELDS))
             
             # Return root pages - the nested structure comes from PageType's children field
             # The frontend can use the active_page_path to determine which pages to expand
@@ -211,6 +296,104 @@ class NotebookQuery:
         except (Notebook.DoesNotExist, ValueError, IndexError):
             raise GraphQLError(f"Notebook with slug '{notebook_slug}' not found")
 
+    @strawberry.field
+    def search_pages(
+        self,
+        info: Info,
+        query: str,
+        notebook_slug: Optional[str] = None,
+        first: int = 20,
+        after: Optional[str] = None,
+    ) -> PageSearchConnection:
+        """Full-text search of page titles and content, best match first (all of your notebooks without notebookSlug)"""
+        if notebook_slug:
+            try:
+                notebook_id = notebook_slug.split("-")[-1]
+                notebook = Notebook.objects.only('id').get(id=notebook_id)
+            except (Notebook.DoesNotExist, ValueError, IndexError):
+                raise GraphQLError(f"Notebook with slug '{notebook_slug}' not found")
+            pages = Page.objects.filter(notebook=notebook)
+        else:
+            user = info.context.request.user
+            if not user.is_authenticated:
+                raise GraphQLError("You must be logged in to search your notebooks", extensions={"code": "UNAUTHENTICATED"})
+            pages = Page.objects.filter(notebook__user=user)
+
+        if not query.strip():
+            return PageSearchConnection(hits=[], end_cursor=None, has_next_page=False)
+        try:
+            hits, end_cursor, has_next_page = search_pages(
+                pages,
+                query,
+                max(1, min(first, MAX_SEARCH_RESULTS)),
+                after,
+                defer=unselected(info, PAGE_HEAVY_FIELDS, path=("hits", "page")),
+            )
+        except ValueError as e:
+            raise GraphQLError(str(e), extensions={"code": "BAD_REQUEST"})
+        return PageSearchConnection(
+            hits=[PageSearchHit.from_page(page) for page in hits],
+            end_cursor=end_cursor,
+            has_next_page=has_next_page,
+        )
+
+
+    @strawberry.field
+    def similar_pages(
+        self, info: Info, notebook_slug: str, page_path: str, first: int = 10
+    ) -> List[SimilarPage]:
+        """Pages of the notebook whose embeddings are closest to the page's, best match first"""
+        try:
+            notebook_id = notebook_slug.split("-")[-1]
+            notebook = Notebook.objects.only('id').get(id=notebook_id)
+        except (Notebook.DoesNotExist, ValueError, IndexError):
+            raise GraphQLError(f"Notebook with slug '{notebook_slug}' not found")
+        if not page_path.strip("/"):
+            raise GraphQLError("A page path is required", extensions={"code": "BAD_REQUEST"})
+        try:
+            page = get_page_by_path(notebook, page_path)
+        except Page.DoesNotExist:
+            page = None
+        if page is None:
+            raise GraphQLError(f"Page not found at path '{page_path}'")
+
+        hits = similar_pages(
+            page,
+            max(1, min(first, MAX_SEARCH_RESULTS)),
+            defer=unselected(info, PAGE_HEAVY_FIELDS, path=("page",)),
+        )
+        return [SimilarPage(page=hit, path=hit.path, similarity=similarity) for hit, similarity in hits]
+
+    @strawberry.field
+    def semantic_search_pages(
+        self, info: Info, notebook_slug: str, query: str, first: int = 10
+    ) -> List[SimilarPage]:
+        """Pages of the notebook closest in meaning to the query, best match first"""
+        user = info.context.request.user
+        if not user.is_authenticated:
+            raise GraphQLError("You must be logged in to search by meaning", extensions={"code": "UNAUTHENTICATED"})
+        try:
+            notebook_id = notebook_slug.split("-")[-1]
+            notebook = Notebook.objects.only('id').get(id=notebook_id)
+        except (Notebook.DoesNotExist, ValueError, IndexError):
+            raise GraphQLError(f"Notebook with slug '{notebook_slug}' not found")
+        if not query.strip():
+            return []
+        if not allow_query(user.pk):
+            raise GraphQLError("Too many searches, try again in a minute", extensions={"code": "RATE_LIMITED"})
+
+        try:
+            vector = embed_query(query)
+        except EmbeddingUnavailable as e:
+            raise GraphQLError(str(e), extensions={"code": "UNAVAILABLE"})
+        hits = nearest_pages(
+            notebook.pk,
+            vector,
+            max(1, min(first, MAX_SEARCH_RESULTS)),
+            defer=unselected(info, PAGE_HEAVY_FIELDS, path=("page",)),
+        )
+        return [SimilarPage(page=hit, path=hit.path, similarity=similarity) for hit, similarity in hits]
+
 
 @strawberry.type
 class NotebookMutation:
@@ -289,14 +472,41 @@ class NotebookMutation:
             if notebook.user != info.context.request.user:
                 return NotebookPermissionError(message="You don't have permission to delete this notebook")
             
-            notebook.delete()
-            return NotebookDeleteSuccess(success=True, message="Notebook deleted successfully")
+            _, deleted = notebook.delete()
+            return NotebookDeleteSuccess(
+                success=True,
+                message="Notebook deleted successfully",
+                affected_rows=deleted.get(Page._meta.label, 0),
+            )
             
         except (Notebook.DoesNotExist, ValueError, IndexError):
             raise GraphQLError(f"Notebook with slug '{slug}' not found")
         except Exception as e:
             raise GraphQLError(f"Error deleting notebook: {str(e)}")
 
+    @strawberry.mutation
+    def clone_notebook(
+        self,
+        info: Info,
+        slug: str,
+        name: Optional[str] = None,
+    ) -> Union[NotebookCloneSuccess, NotebookAuthenticationError]:
+        """Copy a notebook with all of its pages into a new notebook of the current user"""
+        if not info.context.request.user.is_authenticated:
+            return NotebookAuthenticationError(message="You must be logged in to clone a notebook")
+        
+        try:
+            notebook_id = slug.split("-")[-1]
+            source = Notebook.objects.get(id=notebook_id)
+        except (Notebook.DoesNotExist, ValueError, IndexError):
+            raise GraphQLError(f"Notebook with slug '{slug}' not found")
+        
+        try:
+            notebook, pages = clone_notebook(source, info.context.request.user, name=name)
+        except Exception as e:
+            raise GraphQLError(f"Error cloning notebook: {str(e)}")
+        return NotebookCloneSuccess(notebook=notebook, affected_rows=pages)
+
     @strawberry.mutation
     def create_page(
         self,
@@ -320,24 +530,10 @@ class NotebookMutation:
             
             # Parse the path to determine parent
             # Path represents the parent location, e.g., "/" = root, "/parent-page" = under parent-page
-            parent = None
-            if path and path != "/":
-                # Remove leading/trailing slashes and split path
-                path_parts = [p for p in path.strip("/").split("/") if p]
-                
-                # Navigate through the entire path to find the parent
-                current_parent = None
-                for slug_part in path_parts:
-                    try:
-                        current_parent = Page.objects.get(
-                            notebook=notebook,
-                            slug=slug_part,
-                            parent=current_parent
-                        )
-                    except Page.DoesNotExist:
-                        raise GraphQLError(f"Parent page with slug '{slug_part}' not found in path '{path}'")
-                
-                parent = current_parent
+            try:
+                parent = get_page_by_path(notebook, path)
+            except Page.DoesNotExist:
+                raise GraphQLError(f"Parent page not found at path '{path}'")
             
             # Create the page
             page = Page.objects.create(
@@ -364,10 +560,17 @@ class NotebookMutation:
         insert_after_page_id: Optional[int] = None,
         insert_before_page_id: Optional[int] = None,
         parent_path: Optional[str] = None,
+        content_patch: Optional[ContentPatchInput] = None,
     ) -> Union[PageType, NotebookAuthenticationError, NotebookPermissionError]:
-        """Update an existing page using notebook slug and page path"""
+        """
+        Update an existing page using notebook slug and page path. Content is
+        either replaced with ``content`` or edited with ``content_patch``
+        against the revision the client last saw.
+        """
         if not info.context.request.user.is_authenticated:
             return NotebookAuthenticationError(message="You must be logged in to update a page")
+        if content is not None and content_patch is not None:
+            raise GraphQLError("Cannot specify both content and content_patch", extensions={"code": "BAD_REQUEST"})
         
         try:
             # Extract notebook ID from slug
@@ -378,56 +581,47 @@ class NotebookMutation:
             if notebook.user != info.context.request.user:
                 return NotebookPermissionError(message="You don't have permission to update this page")
             
-            # Navigate to the page using path
-            path_parts = [p for p in page_path.strip("/").split("/") if p]
-            current_page = None
-            
-            for slug_part in path_parts:
-                current_page = Page.objects.get(
-                    notebook=notebook,
-                    slug=slug_part,
-                    parent=current_page
-                )
+            # Resolve the page with a single lookup on its materialized path
+            current_page = get_page_by_path(notebook, page_path)
             
             if current_page is None:
                 raise GraphQLError(f"Page not found at path '{page_path}'")
             
             # Handle parent change if provided
             if parent_path is not None:
-                new_parent = None
-                if parent_path and parent_path != "/":
-                    # Navigate to the new parent page
-                    parent_parts = [p for p in parent_path.strip("/").split("/") if p]
-                    current_parent = None
-                    
-                    for slug_part in parent_parts:
-                        current_parent = Page.objects.get(
-                            notebook=notebook,
-                            slug=slug_part,
-                            parent=current_parent
-                        )
-                    
-                    new_parent = current_parent
+                new_parent = get_page_by_path(notebook, parent_path)
                 
-                # Check if the new parent would create a circular reference
-                if new_parent:
-                    # Check if the new parent is a descendant of the current page
-                    temp_parent = new_parent.parent
-                    while temp_parent:
-                        if temp_parent.id == current_page.id:
-                            raise GraphQLError("Cannot move page: would create circular reference")
-                        temp_parent = temp_parent.parent
+                # The new parent can't be the page itself or one of its descendants
+                if new_parent and (new_parent.id == current_page.id or new_parent.is_descendant_of(current_page)):
+                    raise GraphQLError("Cannot move page: would create circular reference")
                 
                 current_page.parent = new_parent
             
+            content_only = (
+                title is None and parent_path is None
+                and insert_after_page_id is None and insert_before_page_id is None
+            )
+            if content_only and (content is not None or content_patch is not None):
+                # Autosaves are coalesced in the buffer and written periodically
+                if page_autosave.buffer_content(current_page, content, content_patch):
+                    return current_page
+            
             # Update basic fields if provided
             if title is not None:
                 current_page.title = title
-            if content is not None:
-                current_page.content = content
             
             # Save basic changes first
-            current_page.save()
+            with transaction.atomic():
+                # Start from the latest content, including a buffered autosave
+                page_autosave.take_content(current_page)
+                if content_patch is not None:
+                    current_page.content = content_patch.apply(current_page.content)
+                elif content is not None:
+                    current_page.content = content
+                if content_only:
+                    current_page.save(update_fields=['content', 'updated_at'])
+                else:
+                    current_page.save()
             
             # Handle reordering - only one positioning method can be used
             if insert_after_page_id is not None and insert_before_page_id is not None:
@@ -448,9 +642,38 @@ class NotebookMutation:
             
         except (Notebook.DoesNotExist, Page.DoesNotExist):
             raise GraphQLError(f"Page not found at path '{page_path}' in notebook '{notebook_slug}'")
+        except GraphQLError:
+            raise
         except Exception as e:
             raise GraphQLError(f"Error updating page: {str(e)}")
 
+    @strawberry.mutation
+    def close_page(
+        self,
+        info: Info,
+        notebook_slug: str,
+        page_path: str,
+    ) -> Union[PageType, NotebookAuthenticationError, NotebookPermissionError]:
+        """Write a page's buffered autosave now, when its editor is closed"""
+        if not info.context.request.user.is_authenticated:
+            return NotebookAuthenticationError(message="You must be logged in to close a page")
+        
+        try:
+            notebook_id = notebook_slug.split("-")[-1]
+            notebook = Notebook.objects.get(id=notebook_id)
+            
+            if notebook.user != info.context.request.user:
+                return NotebookPermissionError(message="You don't have permission to update this page")
+            
+            current_page = get_page_by_path(notebook, page_path)
+            if current_page is None:
+                raise GraphQLError(f"Page not found at path '{page_path}'")
+            
+            return page_autosave.flush_page(current_page)
+            
+        except (Notebook.DoesNotExist, Page.DoesNotExist, ValueError):
+            raise GraphQLError(f"Page not found at path '{page_path}' in notebook '{notebook_slug}'")
+
     @strawberry.mutation
     def delete_page(
         self,
@@ -471,28 +694,62 @@ class NotebookMutation:
             if notebook.user != info.context.request.user:
                 return NotebookPermissionError(message="You don't have permission to delete this page")
             
-            # Navigate to the page using path
-            path_parts = [p for p in page_path.strip("/").split("/") if p]
-            current_page = None
-            
-            for slug_part in path_parts:
-                current_page = Page.objects.get(
-                    notebook=notebook,
-                    slug=slug_part,
-                    parent=current_page
-                )
+            # Resolve the page with a single lookup on its materialized path
+            current_page = get_page_by_path(notebook, page_path)
             
             if current_page is None:
                 raise GraphQLError(f"Page not found at path '{page_path}'")
             
-            current_page.delete()
-            return NotebookDeleteSuccess(success=True, message="Page deleted successfully")
+            deleted, _ = current_page.delete()
+            return NotebookDeleteSuccess(success=True, message="Page deleted successfully", affected_rows=deleted)
             
         except (Notebook.DoesNotExist, Page.DoesNotExist):
             raise GraphQLError(f"Page not found at path '{page_path}' in notebook '{notebook_slug}'")
         except Exception as e:
             raise GraphQLError(f"Error deleting page: {str(e)}")
 
+    @strawberry.mutation
+    def move_page(
+        self,
+        info: Info,
+        notebook_slug: str,
+        page_path: str,
+        parent_path: str,
+        insert_after_page_id: Optional[int] = None,
+        insert_before_page_id: Optional[int] = None,
+    ) -> Union[PageMoveSuccess, NotebookAuthenticationError, NotebookPermissionError]:
+        """Move a page and its whole subtree under another parent ("/" for the root)"""
+        if not info.context.request.user.is_authenticated:
+            return NotebookAuthenticationError(message="You must be logged in to move a page")
+        
+        if insert_after_page_id is not None and insert_before_page_id is not None:
+            raise GraphQLError("Cannot specify both insert_after_page_id and insert_before_page_id")
+        
+        try:
+            notebook_id = notebook_slug.split("-")[-1]
+            notebook = Notebook.objects.get(id=notebook_id)
+            
+            if notebook.user != info.context.request.user:
+                return NotebookPermissionError(message="You don't have permission to move this page")
+            
+            current_page = get_page_by_path(notebook, page_path)
+            if current_page is None:
+                raise GraphQLError(f"Page not found at path '{page_path}'")
+            new_parent = get_page_by_path(notebook, parent_path)
+            
+            affected_rows = move_subtree(
+                current_page,
+                new_parent,
+                insert_after_page_id=insert_after_page_id,
+                insert_before_page_id=insert_before_page_id,
+            )
+            return PageMoveSuccess(page=current_page, affected_rows=affected_rows)
+            
+        except (Notebook.DoesNotExist, Page.DoesNotExist):
+            raise GraphQLError(f"Page not found at path '{page_path}' in notebook '{notebook_slug}'")
+        except ValueError as e:
+            raise GraphQLError(f"Error moving page: {str(e)}")
+
     @strawberry.mutation
     def reorder_page(
         self,
@@ -515,16 +772,8 @@ class NotebookMutation:
             if notebook.user != info.context.request.user:
                 return NotebookPermissionError(message="You don't have permission to reorder this page")
             
-            # Navigate to the page using path
-            path_parts = [p for p in page_path.strip("/").split("/") if p]
-            current_page = None
-            
-            for slug_part in path_parts:
-                current_page = Page.objects.get(
-                    notebook=notebook,
-                    slug=slug_part,
-                    parent=current_page
-                )
+            # Resolve the page with a single lookup on its materialized path
+            current_page = get_page_by_path(notebook, page_path)
             
             if current_page is None:
                 raise GraphQLError(f"Page not found at path '{page_path}'")
@@ -554,6 +803,32 @@ class NotebookMutation:
         except Exception as e:
             raise GraphQLError(f"Error reordering page: {str(e)}")
 
+    @strawberry.mutation
+    def apply_outline_changes(
+        self,
+        info: Info,
+        notebook_slug: str,
+        ops: List[OutlineChangeInput],
+    ) -> Union[OutlineChangeResult, NotebookAuthenticationError, NotebookPermissionError]:
+        """Apply several page moves, renames and reorders atomically"""
+        if not info.context.request.user.is_authenticated:
+            return NotebookAuthenticationError(message="You must be logged in to rearrange pages")
+        
+        try:
+            notebook_id = notebook_slug.split("-")[-1]
+            notebook = Notebook.objects.get(id=notebook_id)
+        except (Notebook.DoesNotExist, ValueError, IndexError):
+            raise GraphQLError(f"Notebook with slug '{notebook_slug}' not found")
+        
+        if notebook.user != info.context.request.user:
+            return NotebookPermissionError(message="You don't have permission to rearrange pages in this notebook")
+        
+        try:
+            version, updated_pages = apply_outline_changes(notebook, [op.to_op() for op in ops])
+        except OutlineChangeError as e:
+            raise GraphQLError(str(e), extensions={"code": "BAD_REQUEST"})
+        return OutlineChangeResult(version=version, updated_pages=updated_pages)
+
 
 # Create the main schema components that can be imported
 notebook_queries = NotebookQuery
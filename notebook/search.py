@@ -0,0 +1,81 @@
+"""
+Full-text search over pages.
+
+Pages carry a stored ``search_vector`` (title weighted above content) with a
+GIN index, so a search is one indexed query ranked with ``ts_rank``. Queries
+use web search syntax: quoted phrases, ``or`` and ``-excluded`` words.
+Snippets are produced with ``ts_headline`` for the returned page of hits
+only. They are taken from the raw content, so matches are delimited with
+random sentinels and the snippet is HTML-escaped before the sentinels become
+``<mark>`` tags (see ``highlight``).
+"""
+import base64
+import html
+import secrets
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+from notebook.models import Page
+
+SEARCH_CONFIG = "english"
+MAX_SEARCH_RESULTS = 50
+# Content can't contain these, as they are unknown outside the process
+HEADLINE_START = f"hl{secrets.token_hex(8)}s"
+HEADLINE_STOP = f"hl{secrets.token_hex(8)}e"
+HEADLINE_OPTIONS = {
+    "start_sel": HEADLINE_START,
+    "stop_sel": HEADLINE_STOP,
+    "max_words": 35,
+    "min_words": 15,
+    "max_fragments": 2,
+}
+
+
+def highlight(headline):
+    """HTML of a ``ts_headline`` snippet, with the matches wrapped in <mark></mark>"""
+    escaped = html.escape(headline or "")
+    return escaped.replace(HEADLINE_START, "<mark>").replace(HEADLINE_STOP, "</mark>")
+
+
+def encode_cursor(rank, page_id):
+    return base64.urlsafe_b64encode(f"{rank!r}|{page_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        rank, page_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return float(rank), int(page_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid search cursor")
+
+
+def search_pages(pages, query, first=20, after=None, defer=()):
+    """
+    Return ``(pages, end_cursor, has_next_page)`` for the pages of the
+    ``pages`` queryset matching ``query``, best match first. Each page is
+    annotated with ``rank`` and a ``headline`` snippet. ``after`` is a cursor
+    returned by a previous call and ``defer`` names Page columns the caller
+    doesn't need.
+    """
+    search_query = SearchQuery(query, search_type="websearch", config=SEARCH_CONFIG)
+    hits = pages.filter(search_vector=search_query).annotate(
+        # ts_rank is a real: compared as one against the (double) cursor it
+        # would be widened and miss the boundary, so the cast is both what
+        # the cursor stores and what it is compared with
+        rank=Cast(SearchRank(F("search_vector"), search_query), FloatField()),
+    )
+    if after:
+        rank, page_id = decode_cursor(after)
+        hits = hits.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=page_id))
+    # Postgres computes the headlines after the sort and limit
+    hits = hits.annotate(
+        headline=SearchHeadline("content", search_query, config=SEARCH_CONFIG, **HEADLINE_OPTIONS),
+    ).order_by("-rank", "-id").defer(*defer)
+
+    hits = list(hits[: first + 1])
+    has_next_page = len(hits) > first
+    hits = hits[:first]
+    end_cursor = encode_cursor(hits[-1].rank, hits[-1].pk) if hits else None
+    return hits, end_cursor, has_next_page
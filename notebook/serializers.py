@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Notebook, Page
+from .autosave import buffered_content
 
 class NotebookFormSerializer(serializers.ModelSerializer):
     class Meta:
@@ -17,6 +18,11 @@ class PageSerializer(serializers.ModelSerializer):
         model = Page
         fields = ["id", "title", "content", "created_at", "updated_at", "notebook", "parent", "index", "has_children", "slug"]
 
+    def to_representation(self, instance):
+        # Include the latest buffered autosave
+        buffered_content(instance)
+        return super().to_representation(instance)
+
 
 class PageCreateFormSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from articles.models import Article
+from notebook.links import resolve_article
+
+
+# Page links waiting for an article (see notebook.links)
+
+@receiver(post_save, sender=Article)
+def article_saved(sender, instance, **kwargs):
+    resolve_article(instance)
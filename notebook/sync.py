@@ -0,0 +1,111 @@
+"""
+Incremental sync of a notebook's pages.
+
+Every page write takes the next value of ``Notebook.change_seq`` and stamps
+it on the pages it touched; deletions leave a ``PageTombstone`` with the
+same stamp. A client that last synced at version ``v`` fetches the pages and
+tombstones stamped after ``v`` over the (notebook, change_seq) indexes, so
+the payload is proportional to what changed rather than to the notebook.
+"""
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from notebook.models import Notebook, Page, PageTombstone
+
+MAX_SYNC_CHANGES = 1000
+
+
+@dataclass
+class Changes:
+    version: int
+    pages: list = field(default_factory=list)
+    tombstones: list = field(default_factory=list)
+    has_more: bool = False
+    full_resync_required: bool = False
+
+
+def changes_since(notebook, since, limit=MAX_SYNC_CHANGES, pages=None):
+    """
+    Pages written and tombstones left in ``notebook`` after version ``since``,
+    oldest first. At most about ``limit`` changes are returned, never splitting
+    the changes of one version; ``has_more`` tells the client to call again
+    with the returned version. A version of 0 returns every page. Clients
+    whose version is older than the pruned tombstones (or unknown) must sync
+    again from 0, which ``full_resync_required`` signals.
+
+    ``pages`` is an optional base queryset, e.g. with deferred columns.
+    """
+    current = notebook.change_seq
+    if since < 0 or since > current or 0 < since < notebook.sync_horizon:
+        return Changes(current, full_resync_required=True)
+
+    if pages is None:
+        pages = Page.objects.all()
+    pages = pages.filter(notebook_id=notebook.pk, change_seq__gt=since, change_seq__lte=current)
+    tombstones = PageTombstone.objects.filter(
+        notebook_id=notebook.pk, change_seq__gt=since, change_seq__lte=current
+    )
+    if since == 0:
+        # A client syncing from scratch has nothing to delete
+        tombstones = tombstones.none()
+
+    page_list = list(pages.order_by('change_seq', 'id')[:limit + 1])
+    tombstone_list = list(tombstones.order_by('change_seq', 'id')[:limit + 1])
+    changes = sorted(
+        [(page.change_seq, page) for page in page_list]
+        + [(tombstone.change_seq, tombstone) for tombstone in tombstone_list],
+        key=lambda change: change[0],
+    )
+    if len(changes) <= limit:
+        return Changes(current, page_list, tombstone_list)
+
+    # Stop before the first version that didn't fit; everything older fits,
+    # since each list holds its oldest limit + 1 changes
+    boundary = changes[limit][0]
+    if boundary > changes[0][0]:
+        return Changes(
+            boundary - 1,
+            [page for page in page_list if page.change_seq < boundary],
+            [tombstone for tombstone in tombstone_list if tombstone.change_seq < boundary],
+            has_more=True,
+        )
+    # A single version (e.g. a large subtree move) is never split
+    return Changes(
+        boundary,
+        list(pages.filter(change_seq=boundary).order_by('id')),
+        list(tombstones.filter(change_seq=boundary).order_by('id')),
+        has_more=boundary < current,
+    )
+
+
+def prune_tombstones(older_than=None):
+    """
+    Delete tombstones older than NOTEBOOK_TOMBSTONE_RETENTION_DAYS and advance
+    each affected notebook's sync horizon past them, in one statement.
+    Returns the tombstones deleted.
+    """
+    if older_than is None:
+        older_than = timezone.now() - timedelta(days=settings.NOTEBOOK_TOMBSTONE_RETENTION_DAYS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH pruned AS (
+                DELETE FROM "{PageTombstone._meta.db_table}" WHERE "deleted_at" < %s
+                RETURNING "notebook_id", "change_seq"
+            ), horizons AS (
+                SELECT "notebook_id", MAX("change_seq") AS "change_seq", COUNT(*) AS "pruned"
+                FROM pruned GROUP BY "notebook_id"
+            ), advanced AS (
+                UPDATE "{Notebook._meta.db_table}" AS n
+                SET "sync_horizon" = GREATEST(n."sync_horizon", h."change_seq")
+                FROM horizons h WHERE n."id" = h."notebook_id"
+            )
+            SELECT COALESCE(SUM("pruned"), 0) FROM horizons
+            """,
+            [older_than],
+        )
+        return cursor.fetchone()[0]
@@ -0,0 +1,59 @@
+from celery import shared_task
+
+
+@shared_task
+def prune_page_tombstones():
+    """Periodic job deleting expired page tombstones and advancing notebooks' sync horizons."""
+    from notebook.sync import prune_tombstones
+
+    return prune_tombstones()
+
+
+@shared_task
+def flush_page_autosaves():
+    """Periodic job writing buffered page autosaves to the database."""
+    from notebook.autosave import flush_pages
+
+    return flush_pages()
+
+
+@shared_task
+def thin_page_revisions():
+    """Periodic job thinning old page revisions down to the retention policy."""
+    from backend import revisions
+    from notebook.models import PageRevision
+
+    return revisions.thin(PageRevision)
+
+
+@shared_task
+def request_page_embeddings():
+    """Periodic job sending stale page embeddings to the embedding worker in batches."""
+    from notebook.embeddings import request_stale_embeddings
+
+    return request_stale_embeddings()
+
+
+@shared_task
+def export_notebook(export_id):
+    """Build a queued notebook export and store the archive."""
+    from notebook.export import run_export
+    from notebook.models import NotebookExport
+
+    export = NotebookExport.objects.select_related('notebook').filter(pk=export_id).first()
+    if export is None or export.status != NotebookExport.PENDING:
+        return None
+    return run_export(export).status
+
+
+@shared_task
+def prune_notebook_exports():
+    """Periodic job deleting expired notebook exports and their archives."""
+    from datetime import timedelta
+
+    from django.conf import settings
+    from django.utils import timezone
+
+    from notebook.export import prune_exports
+
+    return prune_exports(timezone.now() - timedelta(days=settings.NOTEBOOK_EXPORT_RETENTION_DAYS))
@@ -1,5 +1,9 @@
 # Import both types to make them available for forward references
 from .notebook import NotebookType
 from .page import PageType
+from .outline import NotebookOutline, OutlineNode, OutlineChangeInput, OutlineChangeResult
+from .sync import NotebookChanges, PageTombstoneType
+from .links import PageLinkType
+from .search import PageSearchConnection, PageSearchHit, SimilarPage
 
-__all__ = ['NotebookType', 'PageType']
\ No newline at end of file
+__all__ = ['NotebookType', 'PageType', 'NotebookOutline', 'OutlineNode', 'OutlineChangeInput', 'OutlineChangeResult', 'NotebookChanges', 'PageTombstoneType']
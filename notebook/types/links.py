@@ -0,0 +1,18 @@
+import strawberry
+from typing import Optional
+
+from articles.types.article import ArticleType
+from notebook.types.page import PageType
+
+
+@strawberry.type
+class PageLinkType:
+    # The target as written in the content, e.g. "Setup" or "article:my-post"
+    text: str
+    # The linked page or article; both are null while the target doesn't exist
+    page: Optional[PageType]
+    article: Optional[ArticleType]
+
+    @classmethod
+    def from_link(cls, link):
+        return cls(text=link.text, page=link.target_page, article=link.target_article)
@@ -8,6 +8,7 @@ from typing import List, Optional
 
 from users.types.user import UserType
 from notebook.models import Notebook
+from backend.selection import defer_unselected
 
 
 @strawberry_django.type(Notebook)
@@ -18,6 +19,7 @@ class NotebookType:
     overview: str | None
     created_at: str
     user: UserType
+    change_seq: int  # Current version for notebookChanges
 
     @strawberry.field
     def cover(self, info: Info) -> str:
@@ -41,7 +43,9 @@ class NotebookType:
     def root_pages(self, info: Info) -> List[LazyType["PageType", "notebook.types.page"]]:
         """Return root pages (no parent) ordered by index"""
         from notebook.models import Page
-        return list(Page.objects.filter(notebook=self, parent=None).order_by('index'))
+        from notebook.types.page import PAGE_HEAVY_FIELDS
+        root_pages = Page.objects.filter(notebook=self, parent=None).order_by('index')
+        return list(defer_unselected(root_pages, info, PAGE_HEAVY_FIELDS))
     
     @strawberry.field
     def index_page(self, info: Info) -> Optional[LazyType["PageType", "notebook.types.page"]]:
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import strawberry
+from typing import List, Optional
+
+
+@strawberry.type
+class OutlineNode:
+    id: strawberry.ID
+    parent_id: Optional[strawberry.ID]
+    slug: str
+    title: str
+    index: int
+    path: str
+    depth: int
+    has_children: bool
+    children: List[OutlineNode]
+
+    @classmethod
+    def from_dict(cls, node):
+        return cls(
+            id=node["id"],
+            parent_id=node["parent_id"],
+            slug=node["slug"],
+            title=node["title"],
+            index=node["index"],
+            path=node["path"],
+            depth=node["depth"],
+            has_children=node["has_children"],
+            children=[cls.from_dict(child) for child in node["children"]],
+        )
+
+
+@strawberry.type
+class NotebookOutline:
+    version: int
+    pages: List[OutlineNode]
+
+
+@strawberry.input
+class OutlineChangeInput:
+    page_id: int
+    title: Optional[str] = None
+    # Omit to keep the current parent, pass null to move the page to the root
+    parent_id: Optional[int] = strawberry.UNSET
+    insert_after_page_id: Optional[int] = None
+    insert_before_page_id: Optional[int] = None
+
+    def to_op(self):
+        op = {
+            "page_id": self.page_id,
+            "title": self.title,
+            "insert_after_page_id": self.insert_after_page_id,
+            "insert_before_page_id": self.insert_before_page_id,
+        }
+        if self.parent_id is not strawberry.UNSET:
+            op["parent_id"] = self.parent_id
+        return op
+
+
+@strawberry.type
+class OutlineChangeResult:
+    version: int
+    updated_pages: int
@@ -7,7 +7,38 @@ from strawberry.types import Info
 from typing import List, Optional
 
 from users.types.user import UserType
-from notebook.models import Page
+from notebook.models import Notebook, Page, PageRevision
+from notebook.autosave import buffered_content
+from backend.patches import content_hash
+from backend.rendering import render_html
+from backend.selection import defer_unselected, unselected
+from backend.types import RevisionType, TocEntryType, revision_type, revision_types, toc_entries
+
+# Columns list resolvers only load when one of these fields is selected
+# (see backend.selection)
+PAGE_HEAVY_FIELDS = {
+    "content": ("content", "contentHash", "contentHtml"),
+    "toc": ("toc",),
+}
+
+
+# Request attribute holding the ids of the viewer's notebooks
+_OWNED_NOTEBOOKS_ATTR = "_owned_notebook_ids"
+
+
+def _is_owner(page, info):
+    request = info.context.request
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    if Page.notebook.is_cached(page):
+        return page.notebook.user_id == user.pk
+    # Looked up once per request rather than once per page
+    owned = getattr(request, _OWNED_NOTEBOOKS_ATTR, None)
+    if owned is None:
+        owned = set(Notebook.objects.filter(user_id=user.pk).values_list('pk', flat=True))
+        setattr(request, _OWNED_NOTEBOOKS_ATTR, owned)
+    return page.notebook_id in owned
 
 
 @strawberry_django.type(Page)
@@ -15,11 +46,74 @@ class PageType:
     id: strawberry.ID
     slug: str
     title: str
-    content: str | None
     created_at: str
     updated_at: str
     index: int
     has_children: bool
+    path: str  # Full slug path, e.g. "/guide/setup"
+    depth: int
+    change_seq: int  # Notebook version of the last change to this page
+    word_count: int
+    reading_time: int  # Minutes
+
+    @strawberry.field
+    def content(self) -> str | None:
+        # Includes the latest buffered autosave (see notebook.autosave)
+        return buffered_content(self)
+
+    @strawberry.field
+    def content_hash(self) -> str:
+        """Base revision hash for contentPatch updates"""
+        return content_hash(buffered_content(self))
+
+    @strawberry.field
+    def content_html(self) -> str:
+        """The content rendered to sanitized HTML (cached by content hash)"""
+        return render_html(buffered_content(self))
+
+    @strawberry.field
+    def toc(self) -> List[TocEntryType]:
+        """Headings of the content, stored when it is saved"""
+        return toc_entries(self.toc)
+
+    @strawberry.field
+    def backlinks(self, info: Info) -> List[LazyType["PageType", "notebook.types.page"]]:
+        """Pages linking to this one with [[Title]]"""
+        pages = Page.objects.filter(outgoing_links__target_page=self.pk).order_by('title')
+        return list(defer_unselected(pages, info, PAGE_HEAVY_FIELDS))
+
+    @strawberry.field
+    def outgoing_links(self, info: Info) -> List[LazyType["PageLinkType", "notebook.types.links"]]:
+        """[[...]] links in this page's content, in one query with their targets"""
+        from articles.types.article import ARTICLE_HEAVY_FIELDS
+        from notebook.types.links import PageLinkType
+
+        deferred = [
+            *(f"target_page__{name}" for name in unselected(info, PAGE_HEAVY_FIELDS, ("page",))),
+            *(f"target_article__{name}" for name in unselected(info, ARTICLE_HEAVY_FIELDS, ("article",))),
+        ]
+        links = self.outgoing_links.select_related('target_page', 'target_article').order_by('id')
+        return [PageLinkType.from_link(link) for link in links.defer(*deferred)]
+
+    @strawberry.field
+    def revisions(self, info: Info, first: int = 50, before: Optional[int] = None) -> List[RevisionType]:
+        """
+        Saved revisions, newest first; page with ``before`` set to the last
+        number. Only the notebook owner sees them, as they keep deleted text.
+        """
+        if not _is_owner(self, info):
+            return []
+        return revision_types(PageRevision, self.pk, first, before)
+
+    @strawberry.field
+    def revision(self, info: Info, number: int) -> Optional[RevisionType]:
+        if not _is_owner(self, info):
+            return None
+        return revision_type(PageRevision, self.pk, number)
+
+    @strawberry.field
+    def parent_id(self) -> Optional[strawberry.ID]:
+        return self.parent_id
 
     @strawberry.field
     def notebook(self, info: Info) -> LazyType["NotebookType", "notebook.types.notebook"]:
@@ -32,30 +126,18 @@ class PageType:
     @strawberry.field
     def children(self, info: Info) -> List[LazyType["PageType", "notebook.types.page"]]:
         """Return child pages ordered by index"""
-        return list(self.children.all().order_by('index'))
+        return list(defer_unselected(self.children.all().order_by('index'), info, PAGE_HEAVY_FIELDS))
     
     @strawberry.field
     def siblings(self, info: Info) -> List[LazyType["PageType", "notebook.types.page"]]:
         """Return sibling pages (same parent) ordered by index"""
-        from notebook.models import Page
-        return list(Page.objects.filter(
-            notebook=self.notebook,
-            parent=self.parent
-        ).exclude(id=self.id).order_by('index'))
+        siblings = Page.objects.filter(
+            notebook_id=self.notebook_id,
+            parent_id=self.parent_id
+        ).exclude(id=self.id).order_by('index')
+        return list(defer_unselected(siblings, info, PAGE_HEAVY_FIELDS))
     
     @strawberry.field
-    def path(self, info: Info) -> str:
-        """Return the full path of this page"""
-        path_parts = []
-        current_page = self
-        
-        # Build path from current page up to root
-        while current_page:
-            path_parts.append(current_page.slug)
-            current_page = current_page.parent
-        
-        # Reverse to get root-to-leaf order
-        path_parts.reverse()
-        
-        # Join with slashes
-        return "/" + "/".join(path_parts) if path_parts else "/"
\ No newline at end of file
+    def ancestors(self, info: Info) -> List[LazyType["PageType", "notebook.types.page"]]:
+        """Return the pages from the root down to this page's parent (breadcrumbs)"""
+        return list(defer_unselected(self.ancestors(), info, PAGE_HEAVY_FIELDS))
@@ -0,0 +1,33 @@
+import strawberry
+from typing import List, Optional
+
+from notebook.search import highlight
+from notebook.types.page import PageType
+
+
+@strawberry.type
+class PageSearchHit:
+    page: PageType
+    path: str
+    rank: float
+    # Matching excerpt of the content as HTML, with the matches wrapped in <mark></mark>
+    headline: str
+
+    @classmethod
+    def from_page(cls, page):
+        return cls(page=page, path=page.path, rank=page.rank, headline=highlight(page.headline))
+
+
+@strawberry.type
+class PageSearchConnection:
+    hits: List[PageSearchHit]
+    end_cursor: Optional[str]
+    has_next_page: bool
+
+
+@strawberry.type
+class SimilarPage:
+    page: PageType
+    path: str
+    # Cosine similarity of the embeddings, up to 1
+    similarity: float
@@ -0,0 +1,26 @@
+import strawberry
+from datetime import datetime
+from typing import List
+
+from notebook.types.page import PageType
+
+
+@strawberry.type
+class PageTombstoneType:
+    page_id: strawberry.ID
+    path: str
+    change_seq: int
+    deleted_at: datetime
+
+
+@strawberry.type
+class NotebookChanges:
+    # Pass as sinceVersion on the next sync
+    version: int
+    # Created, updated or moved pages
+    pages: List[PageType]
+    deleted_pages: List[PageTombstoneType]
+    # More changes are available after version
+    has_more: bool
+    # The client's version is too old (or unknown): discard local state and sync from version 0
+    full_resync_required: bool
@@ -1,7 +1,19 @@
 from django.urls import path, include
-from .views import NoteBookPageView, manageNotebookCover
+from .views import (
+    NoteBookPageView,
+    exportNotebook,
+    importNotebookPages,
+    manageNotebookCover,
+    notebookExportStatus,
+    save_page_embeddings,
+)
 urlpatterns = [
     path('cover/<slug:slug>/', manageNotebookCover, name='manage-notebook-cover'),
+    path('save-embeddings/', save_page_embeddings, name='save-page-embeddings'),
+    path('exports/<int:export_id>/', notebookExportStatus, name='notebook-export-status'),
+    # Before the username routes, which would match these too
+    path('<slug:slug>/export/', exportNotebook, name='export-notebook'),
+    path('<slug:slug>/import/', importNotebookPages, name='import-notebook-pages'),
     path('<str:username>/<slug:slug>/<path:path>', NoteBookPageView.as_view()),
     path('<str:username>/<slug:slug>/', NoteBookPageView.as_view()),
     path('<str:username>/', NoteBookPageView.as_view()),
@@ -1,4 +1,4 @@
-from notebook.models import Notebook
+from notebook.models import Notebook, Page
 
 
 def get_notebook_from_slug(slug):
@@ -9,4 +9,37 @@ def get_notebook_from_slug(slug):
         notebook = Notebook.objects.get(slug=slug)
     except Notebook.DoesNotExist:
         return None
-    return notebook
\ No newline at end of file
+    return notebook
+
+
+def normalize_page_path(page_path):
+    """Turn "a/b/", "/a//b" etc. into the stored "/a/b" form ("" for the notebook root)."""
+    parts = [p for p in (page_path or "").split("/") if p]
+    return "/" + "/".join(parts) if parts else ""
+
+
+def get_page_by_path(notebook, page_path):
+    """
+    Resolve a slug path to a page with a single indexed lookup on
+    ``Page.path``. Returns None for the notebook root ("" or "/") and raises
+    Page.DoesNotExist when nothing lives at the path.
+    """
+    path = normalize_page_path(page_path)
+    if not path:
+        return None
+    page = Page.objects.filter(notebook=notebook, path=path).order_by('id').first()
+    if page is None:
+        raise Page.DoesNotExist(f"Page not found at path '{page_path}'")
+    return page
+
+
+def delete_cover(notebook):
+    """
+    Clear a notebook's cover, deleting the stored file unless a cloned
+    notebook still shares it (see notebook.clone)
+    """
+    name = notebook.cover.name
+    notebook.cover = None
+    notebook.save()
+    if name and not Notebook.objects.filter(cover=name).exists():
+        notebook.cover.storage.delete(name)
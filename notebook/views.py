@@ -6,25 +6,24 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import permission_classes
 from rest_framework.permissions import IsAuthenticated
-from .models import Notebook, Page
-from .utils import get_notebook_from_slug
+from .models import Notebook, NotebookExport, Page
+from .utils import delete_cover, get_notebook_from_slug, get_page_by_path
+from .autosave import take_content
+from .embeddings import save_embeddings
+from .export import enqueue_export, export_file_name, stream_export
+from .importer import NotebookImportError, import_archive
 
 from users.models import CustomUser as User
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db import transaction
+from django.conf import settings
+import hmac
+import json
 
 
 def getNotebookPage(notebook, page_path):
-    if page_path is None:
-        return None
-    path = page_path.split("/")
-    print(path)
-    page = None
-    for p in path:
-        if (p == ""):
-            continue
-        page = Page.objects.get(notebook=notebook, parent=page, slug=p)
-    return page
+    return get_page_by_path(notebook, page_path)
 
 
 class NoteBookPageView(APIView):
@@ -223,7 +222,10 @@ class NoteBookPageView(APIView):
                 page = self.get_page(username, slug, path)
                 serializer = PageUpdateFormSerializer(page, data=request.data, partial=True)
                 if serializer.is_valid():
-                    serializer.save()
+                    with transaction.atomic():
+                        # Start from the latest content, including a buffered autosave
+                        take_content(page)
+                        serializer.save()
                     return Response(serializer.data, status=status.HTTP_200_OK)
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             except Page.DoesNotExist:
@@ -411,11 +413,116 @@ def manageNotebookCover(request, slug):
     elif request.method == "DELETE":
         # Delete the cover
         if notebook.cover:
-            notebook.cover.delete(save=False)  # Delete file from storage
-            notebook.cover = None
-            notebook.save()
+            # Deletes the file from storage unless a clone shares it
+            delete_cover(notebook)
             return JsonResponse({"message": "Cover deleted successfully"}, status=200)
         else:
             return JsonResponse({"error": "No cover to delete"}, status=400)
     
-    return JsonResponse({"error": "Invalid request method."}, status=405)
\ No newline at end of file
+    return JsonResponse({"error": "Invalid request method."}, status=405)
+
+@csrf_exempt
+def save_page_embeddings(request):
+    """Results of a page embedding task, posted back by the embedding worker (see notebook.embeddings)"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    token = settings.EMBEDDING_CALLBACK_TOKEN
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return JsonResponse({"error": "Invalid token"}, status=401)
+
+    try:
+        results = json.loads(request.body)["embeddings"]
+        saved = save_embeddings(results)
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": "Expected embeddings: [{page_id, content_hash, embedding}]"}, status=400)
+    return JsonResponse({"message": "Embeddings saved successfully", "saved": saved}, status=200)
+
+
+def _export_data(export):
+    return {
+        "id": export.id,
+        "status": export.get_status_display().lower(),
+        "url": export.file.url if export.file else None,
+        "error": export.error or None,
+    }
+
+
+@csrf_exempt
+def exportNotebook(request, slug):
+    """
+    GET streams the notebook as a zip of Markdown files; POST builds it in
+    the background (for very large notebooks) and returns the export to poll.
+    """
+    if request.method not in ["GET", "POST"]:
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    user = request.user
+    if not user.is_authenticated:
+        return JsonResponse({"error": "User not authenticated"}, status=401)
+
+    notebook = get_notebook_from_slug(slug)
+    if notebook is None:
+        return JsonResponse({"error": "Notebook not found"}, status=404)
+    if notebook.user != user:
+        return JsonResponse({"error": "You are not the owner of this notebook"}, status=403)
+
+    if request.method == "POST":
+        export = NotebookExport.objects.create(notebook=notebook, user=user)
+        transaction.on_commit(lambda: enqueue_export(export))
+        return JsonResponse(_export_data(export), status=202)
+
+    response = StreamingHttpResponse(stream_export(notebook), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{export_file_name(notebook)}"'
+    return response
+
+
+def notebookExportStatus(request, export_id):
+    """Status of a background export, with a link to the archive once it's done"""
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "User not authenticated"}, status=401)
+
+    export = NotebookExport.objects.filter(pk=export_id, user=request.user).first()
+    if export is None:
+        return JsonResponse({"error": "Export not found"}, status=404)
+    return JsonResponse(_export_data(export), status=200)
+
+
+@csrf_exempt
+def importNotebookPages(request, slug):
+    """
+    Import a zip of Markdown files (``archive``) into the notebook, at the
+    root or under the page at ``parent`` (see notebook.importer)
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    user = request.user
+    if not user.is_authenticated:
+        return JsonResponse({"error": "User not authenticated"}, status=401)
+
+    notebook = get_notebook_from_slug(slug)
+    if notebook is None:
+        return JsonResponse({"error": "Notebook not found"}, status=404)
+    if notebook.user != user:
+        return JsonResponse({"error": "You are not the owner of this notebook"}, status=403)
+
+    if not request.FILES.get("archive"):
+        return JsonResponse({"error": "No archive provided"}, status=400)
+
+    try:
+        parent = get_page_by_path(notebook, request.POST.get("parent", ""))
+        result = import_archive(request.FILES["archive"], notebook, parent)
+    except Page.DoesNotExist:
+        return JsonResponse({"error": "Parent page not found"}, status=404)
+    except NotebookImportError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({
+        "message": "Pages imported successfully",
+        "pages": result.pages,
+        "seconds": round(result.seconds, 3),
+        "pages_per_second": round(result.pages_per_second, 1),
+    }, status=201)
@@ -0,0 +1,152 @@
+"""
+Follow graph lookups.
+
+Counts are read from the denormalized ``FollowStats`` table (see users.signals)
+instead of running ``COUNT(*)`` over ``Follow``, membership checks are batched,
+and follower/following lists are keyset-paginated without materializing
+``Follow`` rows in Python.
+
+Results are memoized on the current request so that resolving a list of
+``UserType`` objects does not issue one query per user and per field.
+"""
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from users.models import CustomUser, Follow, FollowStats
+
+_MEMO_ATTR = "_follow_graph_memo"
+
+
+def _memo(request):
+    if request is None:
+        return None
+    memo = getattr(request, _MEMO_ATTR, None)
+    if memo is None:
+        memo = {"following": {}, "counts": {}}
+        setattr(request, _MEMO_ATTR, memo)
+    return memo
+
+
+def toggle_follow(user, target):
+    """
+    Follow ``target`` if ``user`` doesn't follow them yet, otherwise unfollow.
+    Returns True when the user is now following the target.
+    """
+    with transaction.atomic():
+        follow, created = Follow.objects.get_or_create(user=user, following=target)
+        if not created:
+            follow.delete()
+    return created
+
+
+def adjust_counts(user_id, followers=0, following=0):
+    """Atomically add the given deltas to a user's counters (creating the row if needed)."""
+    if followers < 0 or following < 0:
+        # Decrements never create rows, which also keeps us from resurrecting
+        # the counters of a user that is being deleted.
+        FollowStats.objects.filter(user_id=user_id).update(
+            followers_count=Greatest(F("followers_count") + followers, 0),
+            following_count=Greatest(F("following_count") + following, 0),
+        )
+        return
+
+    table = FollowStats._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (user_id, followers_count, following_count)
+            VALUES (%s, GREATEST(%s, 0), GREATEST(%s, 0))
+            ON CONFLICT (user_id) DO UPDATE SET
+                followers_count = GREATEST({table}.followers_count + %s, 0),
+                following_count = GREATEST({table}.following_count + %s, 0)
+            """,
+            [user_id, followers, following, followers, following],
+        )
+
+
+def get_counts(user_ids, request=None):
+    """
+    Return ``{user_id: (followers_count, following_count)}`` for the given ids
+    in a single primary-key lookup.
+    """
+    memo = _memo(request)
+    user_ids = {int(user_id) for user_id in user_ids}
+    result = {}
+    missing = user_ids
+    if memo is not None:
+        result = {uid: memo["counts"][uid] for uid in user_ids if uid in memo["counts"]}
+        missing = user_ids - result.keys()
+
+    if missing:
+        rows = FollowStats.objects.filter(user_id__in=missing).values_list(
+            "user_id", "followers_count", "following_count"
+        )
+        fetched = {uid: (0, 0) for uid in missing}
+        fetched.update({uid: (followers, following) for uid, followers, following in rows})
+        result.update(fetched)
+        if memo is not None:
+            memo["counts"].update(fetched)
+    return result
+
+
+def is_following(viewer, user_ids, request=None):
+    """
+    Return ``{user_id: bool}`` telling whether ``viewer`` follows each of the
+    given users, using a single indexed membership query.
+    """
+    user_ids = {int(user_id) for user_id in user_ids}
+    if viewer is None or not viewer.is_authenticated:
+        return {uid: False for uid in user_ids}
+
+    memo = _memo(request)
+    result = {}
+    missing = user_ids
+    if memo is not None:
+        result = {uid: memo["following"][uid] for uid in user_ids if uid in memo["following"]}
+        missing = user_ids - result.keys()
+
+    if missing:
+        followed = set(
+            Follow.objects.filter(user=viewer, following_id__in=missing).values_list(
+                "following_id", flat=True
+            )
+        )
+        fetched = {uid: uid in followed for uid in missing}
+        result.update(fetched)
+        if memo is not None:
+            memo["following"].update(fetched)
+    return result
+
+
+def prime(request, users):
+    """Warm the request memo for a page of users so per-user fields don't query."""
+    if request is None or not users:
+        return
+    ids = [user.id for user in users]
+    get_counts(ids, request=request)
+    is_following(request.user, ids, request=request)
+
+
+def _page(relation, owner_field, user, number, last_id):
+    # ``relation`` is the reverse accessor on CustomUser that joins to the
+    # Follow rows we're listing and ``owner_field`` is the Follow column
+    # pointing at ``user``.
+    qs = CustomUser.objects.filter(**{f"{relation}__{owner_field}": user}).annotate(
+        follow_id=F(f"{relation}__id")
+    )
+    if last_id:
+        # The cursor is the Follow id of the last user on the previous page
+        # (their ``follow_id``), which stays valid if that user unfollows
+        qs = qs.filter(follow_id__lt=last_id)
+    return list(qs.order_by("-follow_id")[:number])
+
+
+def followers_page(user, number, last_id=None):
+    """Users following ``user``, newest first, after the one whose ``follow_id`` is ``last_id``."""
+    return _page("followers", "following", user, number, last_id)
+
+
+def following_page(user, number, last_id=None):
+    """Users ``user`` follows, newest first, after the one whose ``follow_id`` is ``last_id``."""
+    return _page("following", "user", user, number, last_id)
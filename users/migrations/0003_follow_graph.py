@@ -0,0 +1,51 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_follow_stats(apps, schema_editor):
+    Follow = apps.get_model('users', 'Follow')
+    FollowStats = apps.get_model('users', 'FollowStats')
+    from django.db.models import Count
+
+    stats = {}
+    for row in Follow.objects.values('following_id').annotate(n=Count('id')):
+        stats.setdefault(row['following_id'], [0, 0])[0] = row['n']
+    for row in Follow.objects.values('user_id').annotate(n=Count('id')):
+        stats.setdefault(row['user_id'], [0, 0])[1] = row['n']
+    FollowStats.objects.bulk_create(
+        [
+            FollowStats(user_id=user_id, followers_count=followers, following_count=following)
+            for user_id, (followers, following) in stats.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_registrationmethod_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['following', '-id'], name='users_follow_followers_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['user', '-id'], name='users_follow_following_idx'),
+        ),
+        migrations.RunPython(backfill_follow_stats, migrations.RunPython.noop),
+    ]
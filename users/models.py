@@ -65,7 +65,22 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ('user', 'following')
+        indexes = [
+            # Keyset pagination of follower / following lists (newest first)
+            models.Index(fields=['following', '-id'], name='users_follow_followers_idx'),
+            models.Index(fields=['user', '-id'], name='users_follow_following_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} follows {self.following.username}"
 
+
+class FollowStats(models.Model):
+    """Denormalized follower/following counters, kept in sync by users.signals."""
+    user = models.OneToOneField(CustomUser, primary_key=True, related_name='follow_stats', on_delete=models.CASCADE)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.followers_count} followers, {self.following_count} following"
+
@@ -1,7 +1,8 @@
 from django.conf import settings
 import strawberry
 from users.types.user import UserType, SelfUserType
-from users.models import CustomUser, Follow
+from users.models import CustomUser
+from users import follow_graph
 from strawberry.types import Info
 from typing import List, Optional
 from strawberry.file_uploads import Upload
@@ -88,15 +89,8 @@ class Mutation:
                 "You can't follow yourself", extensions={"code": "BAD_REQUEST"}
             )
 
-        # Check if the user is already following the user
-        follow, created = Follow.objects.get_or_create(
-            user=user, following=user_to_follow
-        )
-
-        if not created:
-            follow.delete()
-            return False  # Unfollowed the user
-        return True
+        # Follow, or unfollow if the user is already following the user
+        return follow_graph.toggle_follow(user, user_to_follow)
 
     @strawberry.mutation
     def logout(self, info: Info) -> bool:
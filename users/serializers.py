@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import CustomUser as User, EmailVerification, RegisterAccountTemp, Follow
+from .models import CustomUser as User, EmailVerification, RegisterAccountTemp
+from users import follow_graph
 from rest_framework.validators import UniqueValidator
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import authenticate
@@ -10,6 +11,7 @@ class UserSerializer(serializers.ModelSerializer):
     following_count = serializers.SerializerMethodField()
     is_following = serializers.SerializerMethodField()
     is_self = serializers.SerializerMethodField()
+    follow_id = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -22,18 +24,21 @@ class UserSerializer(serializers.ModelSerializer):
             "following_count",
             "is_following",
             "is_self",
+            "follow_id",
         ]
 
     def get_followers_count(self, obj):
-        return Follow.objects.filter(following=obj).count()
+        request = self.context.get("request", None)
+        return follow_graph.get_counts([obj.id], request=request)[obj.id][0]
 
     def get_following_count(self, obj):
-        return Follow.objects.filter(user=obj).count()
+        request = self.context.get("request", None)
+        return follow_graph.get_counts([obj.id], request=request)[obj.id][1]
 
     def get_is_following(self, obj):
         request = self.context.get("request", None)
         if request and request.user.is_authenticated:
-            return Follow.objects.filter(user=request.user, following=obj).exists()
+            return follow_graph.is_following(request.user, [obj.id], request=request)[obj.id]
         return False
 
     def get_is_self(self, obj):
@@ -42,6 +47,10 @@ class UserSerializer(serializers.ModelSerializer):
             return request.user == obj
         return False
 
+    def get_follow_id(self, obj):
+        # Paging cursor of users listed by FollowView
+        return getattr(obj, "follow_id", None)
+
 
 class GoogleAuthInputSerializer(serializers.Serializer):
     code = serializers.CharField(required=False)
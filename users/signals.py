@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import Follow
+from users import follow_graph
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        follow_graph.adjust_counts(instance.user_id, following=1)
+        follow_graph.adjust_counts(instance.following_id, followers=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    # Also fires for rows removed by a cascading user delete, which keeps the
+    # other side's counters correct.
+    follow_graph.adjust_counts(instance.user_id, following=-1)
+    follow_graph.adjust_counts(instance.following_id, followers=-1)
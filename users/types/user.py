@@ -1,12 +1,15 @@
 import strawberry
 import strawberry_django
 from articles.enums import ArticleSortBy
-from users.models import CustomUser, Follow
+from users.models import CustomUser
+from users import follow_graph
 from typing import List, Optional
 from strawberry import LazyType
 from strawberry.types import Info
 from django.contrib.auth.models import AnonymousUser
 from articles.models import UserArticlesVisitHistory, Collection, Article
+from backend.resolver_cache import cached_field
+from backend.selection import defer_unselected
 
 
 @strawberry_django.type(CustomUser)
@@ -29,44 +32,47 @@ class UserType:
         return ""
     @strawberry.field
     def followers_count(self, info: Info) -> int:
-        count = Follow.objects.filter(following=self).count()
-        return count
+        counts = follow_graph.get_counts([self.id], request=info.context.request)
+        return counts[self.id][0]
 
     @strawberry.field
     def following_count(self, info: Info) -> int:
-        count = Follow.objects.filter(user=self).count()
-        return count
+        counts = follow_graph.get_counts([self.id], request=info.context.request)
+        return counts[self.id][1]
     
     @strawberry.field
+    @cached_field(ttl=60, stale=10 * 60)
     def articles_count(self, info: Info) -> int:
         return Article.objects.filter(author=self, status=Article.PUBLISHED).count()
     
     @strawberry.field
+    @cached_field(ttl=60, stale=10 * 60)
     def collections_count(self, info: Info) -> int:
         return Collection.objects.filter(user=self).count()
 
+    @strawberry.field
+    def follow_id(self, info: Info) -> Optional[int]:
+        """Paging cursor of a user listed by ``followers`` or ``following``"""
+        return getattr(self, "follow_id", None)
+
     @strawberry.field
     def followers(self, info: Info, number: int , lastId: Optional[int]= None,) -> List["UserType"]:
-        if lastId:
-            followers = Follow.objects.filter(following=self, id__lt=lastId).order_by("-created_at")[:number]
-        else:
-            followers = Follow.objects.filter(following=self).order_by("-created_at")[:number]
-        return [follow.user for follow in followers]
+        """Followers newest first; ``lastId`` is the ``followId`` of the last user of the previous page."""
+        followers = follow_graph.followers_page(self, number, lastId)
+        follow_graph.prime(info.context.request, followers)
+        return followers
 
     @strawberry.field
     def following(self, info: Info, number: int, lastId: Optional[int] = None) -> List["UserType"]:
-        if lastId:
-            following = Follow.objects.filter(user=self, id__lt=lastId).order_by("-created_at")[:number]
-        else:
-            following = Follow.objects.filter(user=self).order_by("-created_at")[:number]
-        return [follow.following for follow in following]
+        """Followed users newest first; ``lastId`` is the ``followId`` of the last user of the previous page."""
+        following = follow_graph.following_page(self, number, lastId)
+        follow_graph.prime(info.context.request, following)
+        return following
 
     @strawberry.field
     def is_following(self, info: Info) -> bool:
-        currentUser = info.context.request.user
-        if isinstance(currentUser, AnonymousUser):
-            return False
-        return self.following.filter(user=info.context.request.user).exists()
+        request = info.context.request
+        return follow_graph.is_following(request.user, [self.id], request=request)[self.id]
 
     @strawberry.field
     def is_self(self, info: Info) -> bool:
@@ -84,16 +90,25 @@ class UserType:
         qs = Article.objects.filter(author=self, status=Article.PUBLISHED)
         if sort_by == ArticleSortBy.POPULAR:
             qs = qs.order_by("-views", "-created_at")
+        elif sort_by == ArticleSortBy.TRENDING:
+            from articles.trending import order_by_trending
+            qs = order_by_trending(qs)
         else:  # Default and 'recent'
             qs = qs.order_by("-created_at")
-        return qs
+        from articles.analytics import prime_readers
+        from articles.types.article import ARTICLE_HEAVY_FIELDS
+        articles = list(defer_unselected(qs, info, ARTICLE_HEAVY_FIELDS))  # Skip content unless selected
+        prime_readers(info.context.request, articles)
+        return articles
     @strawberry.field
+    @cached_field(ttl=30, stale=5 * 60)
     def collections(self, info: Info, number: int,  last_id: Optional[int] = None) -> List[LazyType["CollectionType", "articles.types.collection"]]: # type: ignore
         if last_id:
            return Collection.objects.filter(user=self, id__lt=last_id).order_by("-created_at")[:number]
         return Collection.objects.filter(user=self).order_by("-created_at")[:number]
     
     @strawberry.field
+    @cached_field(ttl=30, stale=5 * 60)
     def notebooks(self, info: Info) -> List[LazyType["NotebookType", "notebook.types.notebook"]]: # type: ignore
         from notebook.models import Notebook
         return list(Notebook.objects.filter(user=self).order_by("-created_at"))
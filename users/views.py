@@ -30,7 +30,8 @@ from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 from django.views.decorators.csrf import csrf_exempt
 
-from .models import RegisterAccountTemp, Follow
+from .models import RegisterAccountTemp
+from users import follow_graph
 
 
 TEMP_ID = "tempUser_id"
@@ -60,21 +61,34 @@ class FollowView(APIView):
         return []
 
     # Get All the followers of the user
+    # Optional ?number=&last_id= query params paginate by the follow_id of
+    # the last user seen
     def get(self, request, username):
         type = request.query_params.get("type")
+        try:
+            number = request.query_params.get("number")
+            number = int(number) if number else None
+            last_id = request.query_params.get("last_id")
+            last_id = int(last_id) if last_id else None
+        except ValueError:
+            return Response({"error": "number and last_id must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if number is not None and number < 0:
+            return Response({"error": "number can't be negative"}, status=status.HTTP_400_BAD_REQUEST)
         user = get_object_or_404(User, username=username)
         if type == "following":
-            following = Follow.objects.filter(user=user).select_related("following")
+            following = follow_graph.following_page(user, number, last_id)
+            follow_graph.prime(request, following)
             serializer = UserSerializer(
-                [follow.following for follow in following],
+                following,
                 many=True,
                 context={"request": request},
             )
             return Response(serializer.data, status=status.HTTP_200_OK)
         elif type == "followers":
-            followers = Follow.objects.filter(following=user).select_related("user")
+            followers = follow_graph.followers_page(user, number, last_id)
+            follow_graph.prime(request, followers)
             serializer = UserSerializer(
-                [follow.user for follow in followers],
+                followers,
                 many=True,
                 context={"request": request},
             )
@@ -92,14 +106,8 @@ class FollowView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Check if the user is already following the user
-        follow, created = Follow.objects.get_or_create(
-            user=request.user, following=user
-        )
-
-        # If the user is already following the user, then unfollow
-        if not created:
-            follow.delete()
+        # Follow, or unfollow if the user is already following the user
+        if not follow_graph.toggle_follow(request.user, user):
             return Response({"message": "Unfollowed"}, status=status.HTTP_200_OK)
 
         return Response({"message": "Followed"}, status=status.HTTP_200_OK)
@@ -184,20 +192,12 @@ class GetProfileFromUserName(APIView):
 
     def get(self, request, username):
         user = User.objects.get(username=username)
-        serializer = UserSerializer(user)
+        serializer = UserSerializer(user, context={"request": request})
         data = serializer.data
 
-        if not request.user.is_authenticated:
-            data["is_following"] = False
-        elif request.user != user:
-            try:
-                follow = Follow.objects.get(user=request.user, following=user)
-                data["is_following"] = True
-            except Follow.DoesNotExist:
-                data["is_following"] = False
-
-        data["followers"] = Follow.objects.filter(following=user).count()
-        data["following"] = Follow.objects.filter(user=user).count()
+        # The serializer already resolved these through the follow graph memo
+        data["followers"] = data["followers_count"]
+        data["following"] = data["following_count"]
         return Response(data, status=status.HTTP_200_OK)
 
 